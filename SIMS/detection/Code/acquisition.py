@@ -0,0 +1,296 @@
+import os, sys, time
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+path_faisceau = os.path.join(folder, "faisceau", "Code")
+for pth in [path_partie_verte, path_faisceau]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import partie_electroaimant # type: ignore
+from detecteur import detecteur
+
+
+class tampon_images :
+    def __init__(self, n_images : int, forme : tuple[int, ...], fichier : str = None, dtype = np.float32) -> None :
+        """
+        Stockage circulaire des images du détecteur : seules les n_images dernières sont conservées, la mémoire occupée
+        ne dépend donc pas de la durée de l'acquisition. Avec un fichier, les images sont écrites dans un np.memmap
+        (elles restent sur disque et seules les pages utilisées sont en mémoire).
+
+        Parameters
+        ----------
+        n_images : int
+            Nombre d'images conservées
+        forme : tuple of int
+            Forme d'une image (celle de detecteur.image)
+        fichier : str
+            Fichier du memmap (None pour garder les images en mémoire)
+        dtype : numpy.dtype
+            Type des valeurs stockées
+        """
+        if n_images <= 0 : raise ValueError("Le nombre d'images doit être strictement positif.")
+        self.n_images = int(n_images)
+        self.forme = tuple(forme)
+        self.fichier = fichier
+        if fichier is None :
+            self.images = np.zeros((self.n_images,) + self.forme, dtype=dtype)
+        else :
+            self.images = np.memmap(fichier, dtype=dtype, mode='w+', shape=(self.n_images,) + self.forme)
+        self.temps = np.full(self.n_images, np.nan)
+        self.n_ecrites = 0
+
+    def __len__(self) -> int :
+        return min(self.n_ecrites, self.n_images)
+
+    def ecrire(self, image : np.ndarray, temps : float) -> int :
+        """
+        Ecrit une image à la place de la plus ancienne
+
+        Returns
+        -------
+        int
+            Case utilisée
+        """
+        case = self.n_ecrites % self.n_images
+        self.images[case] = image
+        self.temps[case] = temps
+        self.n_ecrites += 1
+        return case
+
+    def dernieres(self, n : int = None) -> tuple[np.ndarray, np.ndarray] :
+        """
+        Les n dernières images (toutes celles conservées par défaut), de la plus ancienne à la plus récente
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            Dates (n,) et images (n, *forme) (copie)
+        """
+        n = len(self) if n is None else min(n, len(self))
+        cases = (self.n_ecrites - n + np.arange(n)) % self.n_images
+        return self.temps[cases], np.asarray(self.images[cases])
+
+    def vider(self) -> None :
+        """Ecrit sur disque les pages modifiées du memmap"""
+        if self.fichier is not None : self.images.flush()
+
+
+def iterer_acquisition(masses_charges_particules : list[tuple[float, float]], composition, Bz : float, x_detecteur : float, capteur : detecteur,
+                       tampon : tampon_images, courant : float, duree_image : float, source = 1e5, n_images : int = None,
+                       ions_simules_max : int = 1_000_000, graine : int = None) :
+    """
+    Acquisition résolue en temps : à chaque image, la composition du faisceau secondaire à cet instant traverse la partie
+    magnétique, les coups sont accumulés sur le détecteur, le temps mort et la saturation sont appliqués, et l'image
+    des coups mesurés est écrite dans le tampon
+
+    Parameters
+    ----------
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce
+    composition : callable or iterable
+        Fonction date (s) -> proportion de chaque espèce, ou suite de proportions (une par image) ;
+        flux de chaque espèce (ions/s) si courant est None
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    capteur : detecteur
+        Détecteur (ses compteurs sont remis à zéro à chaque image)
+    tampon : tampon_images
+        Stockage des images
+    courant : float
+        Courant du faisceau entrant dans la partie magnétique (A), None si la composition donne les flux
+    duree_image : float
+        Durée d'une image (s)
+    source : float or source.source_ions
+        Vitesse commune (m/s) : chaque espèce arrive en un seul point, seul le nombre d'ions de chaque espèce est tiré
+        (loi de Poisson) ; ou source d'ions : les vitesses sont tirées ion par ion
+    n_images : int
+        Nombre d'images (nécessaire si composition est une fonction, sinon jusqu'à la fin de la suite)
+    ions_simules_max : int
+        Nombre maximal d'ions simulés par image avec une source d'ions (chaque ion simulé représente alors plusieurs ions réels)
+    graine : int
+        Graine du générateur aléatoire
+
+    Yields
+    ------
+    dict
+        Métriques de l'image : 'indice', 'temps', 'ions_reels', 'ions_simules', 'coups_mesures', 'pertes',
+        'duree_calcul' (s), 'ions_par_seconde' (ions simulés par seconde de calcul)
+    """
+    rng = np.random.default_rng(graine)
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    masses_u, charges_e = masses_charges[:, 0], masses_charges[:, 1]
+    if callable(composition) :
+        if n_images is None : raise ValueError("n_images est nécessaire quand la composition est une fonction.")
+        flux = (composition((i + 0.5) * duree_image) for i in range(n_images))
+    else :
+        flux = iter(composition) if n_images is None else (p for p, _ in zip(composition, range(n_images)))
+
+    par_espece = np.isscalar(source)
+    if par_espece :
+        # Un point d'arrivée et une efficacité par espèce, calculés une fois
+        impacts = partie_electroaimant.calculer_faisceau(masses_u, charges_e, source, Bz, x_detecteur)
+        y_especes = impacts['y_detecteur']
+        efficacites = capteur.efficacite(masses_u, impacts['energie_impact'])
+    z = 0.0 if capteur.n_pixels_z > 1 else None
+
+    for indice, proportions in enumerate(flux) :
+        debut = time.perf_counter()
+        proportions = np.asarray(proportions, dtype=float)
+        total = proportions.sum()
+        proportions = proportions / total if total > 0 else proportions
+        if courant is None :
+            ions_attendus = total * duree_image
+        else :
+            ions_attendus = courant * duree_image / (constants.e * np.dot(proportions, np.abs(charges_e)))
+        capteur.reinitialiser()
+        if par_espece :
+            comptes = rng.poisson(ions_attendus * proportions)
+            ions_reels = ions_simules = int(comptes.sum())
+            capteur.ajouter(y_especes, z, comptes * efficacites)
+            ions_par_coup = 1.0
+        else :
+            ions_reels = int(rng.poisson(ions_attendus))
+            ions_simules = min(ions_reels, ions_simules_max)
+            especes = np.repeat(np.arange(len(masses_u)), rng.multinomial(ions_simules, proportions))
+            masses = masses_u[especes]
+            impacts = partie_electroaimant.calculer_faisceau(masses, charges_e[especes], source.tirer_vitesses(masses, rng), Bz, x_detecteur)
+            capteur.ajouter(impacts['y_detecteur'], z, capteur.efficacite(masses, impacts['energie_impact']))
+            ions_par_coup = ions_reels / max(ions_simules, 1)
+        mesure = capteur.mesurer(duree_image, ions_par_coup)
+        tampon.ecrire(mesure['comptes_mesures'], (indice + 0.5) * duree_image)
+        duree = time.perf_counter() - debut
+        yield {'indice' : indice, 'temps' : (indice + 0.5) * duree_image, 'ions_reels' : ions_reels, 'ions_simules' : ions_simules,
+               'coups_mesures' : float(mesure['comptes_mesures'].sum()), 'pertes' : mesure['pertes'], 'duree_calcul' : duree,
+               'ions_par_seconde' : ions_simules / duree if duree > 0 else np.inf}
+
+
+def simuler_acquisition(*args, **kwargs) -> dict :
+    """
+    Acquisition complète (voir iterer_acquisition pour les paramètres), en ne gardant que le bilan (mémoire constante)
+
+    Returns
+    -------
+    dict
+        'n_images', 'duree_calcul' (s), 'images_par_seconde', 'ions_par_seconde', 'duree_image_max' (s), 'pertes_max'
+    """
+    n_images, duree_calcul, ions, duree_image_max, pertes_max = 0, 0.0, 0, 0.0, 0.0
+    for metriques in iterer_acquisition(*args, **kwargs) :
+        n_images += 1
+        duree_calcul += metriques['duree_calcul']
+        ions += metriques['ions_simules']
+        duree_image_max = max(duree_image_max, metriques['duree_calcul'])
+        pertes_max = max(pertes_max, metriques['pertes'])
+    return {'n_images' : n_images, 'duree_calcul' : duree_calcul, 'images_par_seconde' : n_images / duree_calcul if duree_calcul > 0 else np.inf,
+            'ions_par_seconde' : ions / duree_calcul if duree_calcul > 0 else np.inf, 'duree_image_max' : duree_image_max, 'pertes_max' : pertes_max}
+
+
+def signaux(tampon : tampon_images, capteur : detecteur, positions, demi_largeur : int = 2) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Coups mesurés autour de positions données du détecteur (par exemple le point d'arrivée de chaque espèce), image par image
+
+    Parameters
+    ----------
+    tampon : tampon_images
+        Images de l'acquisition
+    capteur : detecteur
+        Détecteur ayant produit les images
+    positions : array_like
+        Positions le long du détecteur (m)
+    demi_largeur : int
+        Nombre de pixels comptés de part et d'autre de chaque position
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Dates (n_images,) et coups (n_images, n_positions), NaN pour une position hors des pixels
+    """
+    temps, images = tampon.dernieres()
+    return temps, comptes_autour(images, capteur, positions, demi_largeur)
+
+
+def comptes_autour(images : np.ndarray, capteur : detecteur, positions, demi_largeur : int = 2) -> np.ndarray :
+    """
+    Coups de chaque image autour de positions données du détecteur (voir signaux)
+
+    Parameters
+    ----------
+    images : numpy.ndarray
+        Images de forme (n_images, *capteur.image.shape)
+    capteur, positions, demi_largeur :
+        Voir signaux
+
+    Returns
+    -------
+    numpy.ndarray
+        Coups (n_images, n_positions), NaN pour une position hors des pixels
+    """
+    profils = images.reshape(len(images), -1, capteur.n_pixels).sum(axis=1)
+    cumul = np.concatenate((np.zeros((len(images), 1)), np.cumsum(profils, axis=1)), axis=1)
+    pixels = np.floor((np.asarray(positions, dtype=float) - capteur.y_min) * capteur.n_pixels / (capteur.y_max - capteur.y_min))
+    dedans = (pixels >= 0) & (pixels < capteur.n_pixels)
+    pixels = np.where(dedans, pixels, 0).astype(int)
+    bas, haut = np.clip(pixels - demi_largeur, 0, capteur.n_pixels), np.clip(pixels + demi_largeur + 1, 0, capteur.n_pixels)
+    return np.where(dedans, cumul[:, haut] - cumul[:, bas], np.nan)
+
+
+def tracer_acquisition(tampon : tampon_images, capteur : detecteur, create_plot : bool = True, ax = None) -> None :
+    """
+    Trace les images conservées : position le long du détecteur en abscisse, date en ordonnée, coups mesurés en couleur (échelle log)
+
+    Parameters
+    ----------
+    tampon : tampon_images
+        Images de l'acquisition
+    capteur : detecteur
+        Détecteur ayant produit les images
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (ax est alors nécessaire)
+    ax : matplotlib.axes.Axes
+        Axe sur lequel tracer (uniquement si create_plot = False)
+    """
+    if create_plot or ax is None : fig, ax = plt.subplots(figsize=(10, 6))
+    temps, images = tampon.dernieres()
+    if len(images) == 0 : return
+    profils = images.reshape(len(images), -1, capteur.n_pixels).sum(axis=1)
+    pas = temps[1] - temps[0] if len(temps) > 1 else 1.0
+    artiste = ax.imshow(np.ma.masked_less_equal(profils, 0), aspect='auto', origin='lower', cmap='inferno_r', norm='log',
+                        extent=(capteur.y_min * 1e3, capteur.y_max * 1e3, temps[0] - pas / 2, temps[-1] + pas / 2), interpolation='nearest')
+    ax.figure.colorbar(artiste, ax=ax, label="Coups mesurés par image")
+    ax.set_xlabel("Position le long du détecteur (mm)")
+    ax.set_ylabel("Temps (s)")
+    ax.set_title(f"Acquisition résolue en temps ({len(images)} dernières images sur {tampon.n_ecrites})")
+    if create_plot : plt.show()
+
+
+'''
+Exemple : interface entre deux couches (Si puis Al, avec une trace de 30Si) vue par une acquisition de 20000 images de 10 ms,
+dont seules les 2000 dernières sont conservées
+'''
+if __name__ == '__main__' :
+    especes = [(27, 1), (28, 1), (29, 1), (30, 1)]
+
+    def composition(t) :
+        f = 0.5 * (1 + np.tanh((t - 100) / 10)) # Fraction d'aluminium : interface vers t = 100 s
+        return [f, 0.92 * (1 - f), 0.05 * (1 - f), 0.03 * (1 - f) + 1e-4]
+
+    capteur = detecteur(0.0, 0.3, 2048)
+    tampon = tampon_images(2000, capteur.image.shape)
+    bilan = simuler_acquisition(especes, composition, 0.5, 0.1, capteur, tampon, courant=1e-13, duree_image=0.01, source=1.5e5, n_images=20000)
+    print(f"Vitesse commune : {bilan['images_par_seconde']:.0f} images/s, image la plus lente {bilan['duree_image_max'] * 1e3:.2f} ms, "
+          f"pertes max {bilan['pertes_max']:.2%}, tampon de {tampon.images.nbytes / 1e6:.1f} Mo")
+    temps, coups = signaux(tampon, capteur, partie_electroaimant.calculer_faisceau([27, 28], 1, 1.5e5, 0.5, 0.1)['y_detecteur'])
+    print(f"Dernière image : {coups[-1, 0]:.0f} coups Al+, {coups[-1, 1]:.0f} coups Si+")
+
+    import source as module_source # type: ignore
+    tampon_source = tampon_images(200, capteur.image.shape)
+    bilan = simuler_acquisition(especes, composition, 0.5, 0.1, capteur, tampon_source, courant=1e-12, duree_image=0.01,
+                                source=module_source.source_ions(1.5e5, loi_vitesse='gaussienne', dispersion_energie=2.0), n_images=200)
+    print(f"Source d'ions : {bilan['images_par_seconde']:.0f} images/s, {bilan['ions_par_seconde']:.3g} ions simulés/s")
+    tracer_acquisition(tampon, capteur)
@@ -0,0 +1,331 @@
+import os, sys, time
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+path_faisceau = os.path.join(folder, "faisceau", "Code")
+path_emission = os.path.join(folder, "emission_secondaire", "Code")
+for pth in [path_partie_verte, path_faisceau, path_emission]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import partie_electroaimant # type: ignore
+from ions import faisceau_ions # type: ignore
+
+
+MODELES_TEMPS_MORT = ('non_paralysable', 'paralysable')
+SEUIL_PERTES = 0.1 # Fraction de coups perdus au-delà de laquelle un pixel est considéré comme saturé
+
+
+class detecteur :
+    def __init__(self, y_min : float, y_max : float, n_pixels : int = 1024, z_min : float = -5e-3, z_max : float = 5e-3, n_pixels_z : int = 1,
+                 efficacite_max : float = 0.6, vitesse_seuil : float = 3e4, table_efficacite : tuple = None,
+                 temps_mort : float = 20e-9, modele_temps_mort : str = 'non_paralysable', taux_saturation : float = 1e6,
+                 taille_bloc : int = 65536) -> None :
+        """
+        Détecteur placé à l'abscisse du détecteur de la partie magnétique : matrice de pixels selon y (le long du détecteur)
+        et z (hors du plan), courbe d'efficacité, temps mort et saturation de chaque pixel.
+        Les coups sont accumulés lot par lot par np.bincount sur l'indice aplati du pixel.
+
+        Parameters
+        ----------
+        y_min, y_max : float
+            Etendue des pixels le long du détecteur (m)
+        n_pixels : int
+            Nombre de pixels selon y
+        z_min, z_max : float
+            Etendue des pixels hors du plan (m)
+        n_pixels_z : int
+            Nombre de pixels selon z (1 pour un détecteur linéaire)
+        efficacite_max : float
+            Efficacité aux grandes vitesses d'impact
+        vitesse_seuil : float
+            Vitesse d'impact caractéristique (m/s) : efficacite = efficacite_max (1 - exp(-(v / vitesse_seuil)²))
+        table_efficacite : tuple of array_like
+            (énergies en eV, efficacités) interpolées linéairement, à la place du modèle en vitesse
+        temps_mort : float
+            Temps mort de chaque pixel (s)
+        modele_temps_mort : str
+            'non_paralysable' (taux mesuré n / (1 + n tau)) ou 'paralysable' (n exp(-n tau))
+        taux_saturation : float
+            Taux de comptage maximal d'un pixel (coups/s), par exemple limité par la recharge des canaux d'une galette
+        taille_bloc : int
+            Nombre de coups traités à la fois (les tableaux intermédiaires restent en cache)
+        """
+        if modele_temps_mort not in MODELES_TEMPS_MORT : raise ValueError(f"Modèle de temps mort inconnu : {modele_temps_mort}")
+        if y_max <= y_min or z_max <= z_min : raise ValueError("L'étendue des pixels doit être non vide.")
+        self.y_min, self.y_max, self.n_pixels = float(y_min), float(y_max), int(n_pixels)
+        self.z_min, self.z_max, self.n_pixels_z = float(z_min), float(z_max), int(n_pixels_z)
+        self.efficacite_max = efficacite_max
+        self.vitesse_seuil = vitesse_seuil
+        self.table_efficacite = None if table_efficacite is None else tuple(np.asarray(t, dtype=float) for t in table_efficacite)
+        self.temps_mort = temps_mort
+        self.modele_temps_mort = modele_temps_mort
+        self.taux_saturation = taux_saturation
+        self.taille_bloc = int(taille_bloc)
+        # Pixels entourés d'une bordure (indice 0 et n + 1) qui reçoit les coups hors des pixels et ceux qui n'arrivent pas
+        self._comptes = np.zeros((self.n_pixels_z + 2) * (self.n_pixels + 2))
+        self._tampon = np.empty(self.taille_bloc)
+        self._indices = np.empty(self.taille_bloc, dtype=np.intp)
+        self._indices_z = np.empty(self.taille_bloc, dtype=np.intp)
+        self.n_coups = 0
+
+    def reinitialiser(self) -> None :
+        """Remet les compteurs à zéro"""
+        self._comptes[:] = 0
+        self.n_coups = 0
+
+    @property
+    def image(self) -> np.ndarray :
+        """Coups accumulés par pixel, de forme (n_pixels_z, n_pixels) (pondérés par l'efficacité si elle a été donnée)"""
+        return self._comptes.reshape(self.n_pixels_z + 2, self.n_pixels + 2)[1:-1, 1:-1]
+
+    @property
+    def hors_pixels(self) -> float :
+        """Coups tombés hors des pixels ou n'ayant pas atteint le détecteur"""
+        return float(self._comptes.sum() - self.image.sum())
+
+    @property
+    def positions_pixels(self) -> np.ndarray :
+        """Centre de chaque pixel selon y (m)"""
+        return self.y_min + (np.arange(self.n_pixels) + 0.5) * (self.y_max - self.y_min) / self.n_pixels
+
+    def efficacite(self, masses_u, energies) -> np.ndarray :
+        """
+        Probabilité de détection d'un ion
+
+        Parameters
+        ----------
+        masses_u : array_like
+            Masses (en u)
+        energies : array_like
+            Energies cinétiques à l'impact (en eV)
+
+        Returns
+        -------
+        numpy.ndarray
+            Efficacité de détection (0 pour les ions qui n'arrivent pas)
+        """
+        energies = np.asarray(energies, dtype=float)
+        if self.table_efficacite is not None :
+            efficacites = np.interp(energies, *self.table_efficacite)
+        else :
+            carres_vitesses = 2 * energies * constants.e / (np.asarray(masses_u, dtype=float) * constants.u)
+            efficacites = self.efficacite_max * -np.expm1(-carres_vitesses / self.vitesse_seuil ** 2)
+        return np.where(np.isfinite(energies), efficacites, 0.0)
+
+    def _indices_pixels(self, valeurs : np.ndarray, minimum : float, maximum : float, n : int, sortie : np.ndarray) -> None :
+        """Indice de pixel de chaque valeur, 0 en dessous (et pour NaN), n + 1 au-dessus"""
+        tampon = self._tampon[:len(valeurs)]
+        echelle = n / (maximum - minimum)
+        np.multiply(valeurs, echelle, out=tampon)
+        np.add(tampon, 1 - minimum * echelle, out=tampon)
+        np.fmax(tampon, 0, out=tampon) # fmax remplace aussi NaN par 0
+        np.fmin(tampon, n + 1, out=tampon)
+        np.copyto(sortie, tampon, casting='unsafe')
+
+    def ajouter(self, y, z = None, poids = None) -> None :
+        """
+        Ajoute un lot de coups
+
+        Parameters
+        ----------
+        y : array_like
+            Position de chaque coup le long du détecteur (m), NaN pour un ion qui n'arrive pas
+        z : array_like
+            Position hors du plan (m), ignorée pour un détecteur linéaire
+        poids : array_like
+            Poids de chaque coup, par exemple son efficacité de détection (1 par défaut)
+        """
+        y = np.asarray(y, dtype=float).ravel()
+        if self.n_pixels_z > 1 :
+            if z is None : raise ValueError("Les positions z sont nécessaires pour un détecteur à plusieurs lignes.")
+            z = np.broadcast_to(np.asarray(z, dtype=float), y.shape).ravel()
+        if poids is not None : poids = np.broadcast_to(np.asarray(poids, dtype=float), y.shape).ravel()
+        n_total = len(self._comptes)
+        for debut in range(0, len(y), self.taille_bloc) :
+            fin = min(debut + self.taille_bloc, len(y))
+            indices = self._indices[:fin - debut]
+            self._indices_pixels(y[debut:fin], self.y_min, self.y_max, self.n_pixels, indices)
+            if self.n_pixels_z > 1 :
+                indices_z = self._indices_z[:fin - debut]
+                self._indices_pixels(z[debut:fin], self.z_min, self.z_max, self.n_pixels_z, indices_z)
+                indices += indices_z * (self.n_pixels + 2)
+            else :
+                indices += self.n_pixels + 2 # Ligne unique
+            self._comptes += np.bincount(indices, None if poids is None else poids[debut:fin], minlength=n_total)
+        self.n_coups += len(y)
+
+    def mesurer(self, duree : float, ions_par_coup : float = 1.0) -> dict :
+        """
+        Applique le temps mort et la saturation aux coups accumulés
+
+        Parameters
+        ----------
+        duree : float
+            Durée d'acquisition représentée par les coups accumulés (s)
+        ions_par_coup : float
+            Nombre d'ions réels représentés par chaque coup simulé (voir ions_par_coup)
+
+        Returns
+        -------
+        dict
+            - 'taux_vrais', 'taux_mesures' : taux de comptage par pixel (coups/s)
+            - 'comptes_mesures' : coups mesurés par pixel pendant la durée
+            - 'pertes' : fraction des coups perdus sur tout le détecteur
+            - 'pertes_max' : fraction perdue sur le pixel le plus touché
+            - 'pixels_satures' : nombre de pixels perdant plus de SEUIL_PERTES de leurs coups
+        """
+        taux_vrais = self.image * (ions_par_coup / duree)
+        if self.modele_temps_mort == 'non_paralysable' :
+            taux_mesures = taux_vrais / (1 + taux_vrais * self.temps_mort)
+        else :
+            taux_mesures = taux_vrais * np.exp(-taux_vrais * self.temps_mort)
+        taux_mesures = np.minimum(taux_mesures, self.taux_saturation)
+        with np.errstate(invalid='ignore', divide='ignore') :
+            pertes_pixels = np.where(taux_vrais > 0, 1 - taux_mesures / taux_vrais, 0.0)
+            pertes = 1 - taux_mesures.sum() / taux_vrais.sum() if taux_vrais.sum() > 0 else 0.0
+        return {'taux_vrais' : taux_vrais, 'taux_mesures' : taux_mesures, 'comptes_mesures' : taux_mesures * duree,
+                'pertes' : float(pertes), 'pertes_max' : float(pertes_pixels.max()), 'pixels_satures' : int(np.count_nonzero(pertes_pixels > SEUIL_PERTES))}
+
+    def taux_limite(self, seuil_pertes : float = SEUIL_PERTES) -> float :
+        """Taux de comptage vrai d'un pixel (coups/s) pour lequel il perd la fraction seuil_pertes de ses coups"""
+        if self.modele_temps_mort == 'non_paralysable' :
+            taux = seuil_pertes / ((1 - seuil_pertes) * self.temps_mort)
+        else :
+            taux = -np.log1p(-seuil_pertes) / self.temps_mort
+        return min(taux, self.taux_saturation / (1 - seuil_pertes))
+
+    def courant_limite(self, n_ions_simules : int, charge_e : float = 1.0, seuil_pertes : float = SEUIL_PERTES) -> float :
+        """
+        Courant du faisceau (A) pour lequel le pixel le plus touché perd la fraction seuil_pertes de ses coups,
+        les coups accumulés provenant de n_ions_simules ions (la répartition sur les pixels ne dépend pas du courant)
+
+        Parameters
+        ----------
+        n_ions_simules : int
+            Nombre d'ions simulés ayant produit les coups accumulés
+        charge_e : float
+            Charge des ions du faisceau (en e)
+        seuil_pertes : float
+            Fraction de coups perdus tolérée
+        """
+        fraction_max = self.image.max() / n_ions_simules # Coups du pixel le plus touché par ion du faisceau
+        if fraction_max == 0 : return np.inf
+        return self.taux_limite(seuil_pertes) / fraction_max * abs(charge_e) * constants.e
+
+
+def ions_par_coup(courant : float, duree : float, n_ions_simules : int, charge_e : float = 1.0) -> float :
+    """
+    Nombre d'ions réels représentés par chaque ion simulé pour un faisceau de courant donné
+
+    Parameters
+    ----------
+    courant : float
+        Courant du faisceau (A)
+    duree : float
+        Durée d'acquisition (s)
+    n_ions_simules : int
+        Nombre d'ions simulés
+    charge_e : float
+        Charge des ions (en e)
+    """
+    return courant * duree / (abs(charge_e) * constants.e * n_ions_simules)
+
+
+def iterer_detection(lots, Bz : float, x_detecteur : float, capteur : detecteur) :
+    """
+    Fait passer des lots d'ions dans la partie magnétique et accumule leurs coups sur le détecteur, pondérés par l'efficacité
+
+    Parameters
+    ----------
+    lots : iterable of faisceau_ions
+        Lots d'ions à l'entrée du champ magnétique (par exemple ceux de emission.iterer_emission après la colonne d'extraction),
+        positions x mesurées depuis l'entrée du champ
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    capteur : detecteur
+        Détecteur où accumuler les coups
+
+    Yields
+    ------
+    detecteur
+        Le détecteur après chaque lot
+    """
+    for lot in lots :
+        vitesses = lot.vitesse
+        vitesses_plan = np.hypot(lot.vx, lot.vy)
+        y, _, temps_vol = partie_electroaimant.calculer_impacts_generaux(lot.mq, vitesses_plan, Bz, x_detecteur, lot.x, lot.angle)
+        energies = np.where(np.isfinite(y), 0.5 * lot.masses_u * constants.u * vitesses * vitesses / constants.e, np.nan)
+        capteur.ajouter(y, lot.z + lot.vz * temps_vol, capteur.efficacite(lot.masses_u, energies))
+        yield capteur
+
+
+def tracer_detecteur(capteur : detecteur, mesure : dict = None, create_plot : bool = True, ax = None) -> None :
+    """
+    Trace les coups par pixel (somme sur z) et, si une mesure est donnée, les coups mesurés après temps mort et saturation
+
+    Parameters
+    ----------
+    capteur : detecteur
+        Détecteur
+    mesure : dict
+        Résultat de detecteur.mesurer
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (ax est alors nécessaire)
+    ax : matplotlib.axes.Axes
+        Axe sur lequel tracer (uniquement si create_plot = False)
+    """
+    if create_plot or ax is None : fig, ax = plt.subplots(figsize=(10, 6))
+    positions = capteur.positions_pixels * 1e3
+    if mesure is None :
+        ax.step(positions, capteur.image.sum(axis=0), where='mid', color=plt.cm.viridis(0.3))
+        ax.set_ylabel("Coups par pixel")
+    else :
+        ax.step(positions, mesure['taux_vrais'].sum(axis=0), where='mid', color=plt.cm.viridis(0.3), label="Taux vrai")
+        ax.step(positions, mesure['taux_mesures'].sum(axis=0), where='mid', color=plt.cm.viridis(0.8), label="Taux mesuré")
+        ax.set_yscale('log')
+        ax.set_ylabel("Taux de comptage par pixel (coups/s)")
+        ax.legend()
+        ax.set_title(f"Pertes : {mesure['pertes']:.1%} (pixel le plus touché : {mesure['pertes_max']:.1%}), {mesure['pixels_satures']} pixels saturés")
+    ax.set_xlabel("Position le long du détecteur (mm)")
+    ax.grid(True, linestyle='--', alpha=0.6)
+    if create_plot : plt.show()
+
+
+'''
+Exemple : débit d'accumulation sur un détecteur de 2048 pixels, puis spectre de masse du silicium émis par l'échantillon
+et courant limite avant saturation
+'''
+if __name__ == '__main__' :
+    import emission # type: ignore
+
+    capteur = detecteur(0.0, 0.2, 2048)
+    rng = np.random.default_rng(0)
+    y = rng.uniform(-0.01, 0.21, 20_000_000)
+    capteur.ajouter(y[:1000]) # Premier appel hors mesure
+    capteur.reinitialiser()
+    t0 = time.perf_counter()
+    capteur.ajouter(y)
+    duree = time.perf_counter() - t0
+    print(f"Accumulation : {len(y) / duree:.3g} coups/s ({capteur.hors_pixels:.0f} coups hors des pixels)")
+    poids = rng.random(len(y))
+    t0 = time.perf_counter()
+    capteur.ajouter(y, poids=poids)
+    print(f"Accumulation pondérée : {len(y) / (time.perf_counter() - t0):.3g} coups/s")
+
+    # Ions secondaires Si+ (énergie des ions extraits : 4,5 keV) envoyés dans la partie magnétique
+    capteur = detecteur(0.0, 0.3, 2048)
+    n = 1_000_000
+    modele = emission.modele_emission([(28, 1), (29, 1), (30, 1)], probabilites=[0.92, 0.05, 0.03], rendement=1.0)
+    secondaires = modele.emettre(np.zeros(n), 0.5, 5000, 16, rng=rng)
+    secondaires.vy = np.sqrt(secondaires.vy ** 2 + 2 * 4500 * constants.e / (secondaires.masses_u * constants.u))
+    for _ in iterer_detection([secondaires], 0.5, 0.1, capteur) : pass
+    print(f"Courant limite (pertes de {SEUIL_PERTES:.0%} sur le pixel le plus touché) : {capteur.courant_limite(len(secondaires)) * 1e12:.3g} pA")
+    mesure = capteur.mesurer(1.0, ions_par_coup(1e-12, 1.0, len(secondaires)))
+    tracer_detecteur(capteur, mesure)
@@ -0,0 +1,253 @@
+import os, sys, time
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+from scipy.ndimage import gaussian_filter1d
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_faisceau = os.path.join(folder, "faisceau", "Code")
+for pth in [path_faisceau]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation
+
+
+class charge_surface :
+    def __init__(self, x_min : float, x_max : float, n_cellules : int = 400, epaisseur_isolant : float = 1e-6, permittivite_relative : float = 4.0,
+                 rendement_electrons : float = 1.0, constante_relaxation : float = np.inf, largeur_z : float = 1e-3) -> None :
+        """
+        Charge accumulée à la surface d'un échantillon isolant (couche d'épaisseur epaisseur_isolant posée sur la plaque y = 0) :
+        la densité surfacique de charge sigma, rangée par cellules selon x, élève le potentiel de la surface de
+        V = sigma epaisseur / (epsilon_0 epsilon_r), étalé latéralement sur une distance de l'ordre de l'épaisseur
+
+        Parameters
+        ----------
+        x_min, x_max : float
+            Etendue de la surface suivie (m)
+        n_cellules : int
+            Nombre de cellules selon x
+        epaisseur_isolant : float
+            Epaisseur de la couche isolante (m)
+        permittivite_relative : float
+            Permittivité relative de l'isolant
+        rendement_electrons : float
+            Electrons secondaires émis par ion primaire (chacun laisse une charge +e)
+        constante_relaxation : float
+            Temps de fuite de la charge (s), np.inf pour un isolant parfait
+        largeur_z : float
+            Largeur de la zone chargée hors du plan (m), pour passer de la charge par cellule à la densité surfacique
+        """
+        if x_max <= x_min or n_cellules <= 0 : raise ValueError("L'étendue et le nombre de cellules doivent être positifs.")
+        if epaisseur_isolant <= 0 or permittivite_relative <= 0 : raise ValueError("Epaisseur et permittivité doivent être positives.")
+        self.bords = np.linspace(x_min, x_max, n_cellules + 1)
+        self.centres = 0.5 * (self.bords[1:] + self.bords[:-1])
+        self.aire_cellule = (x_max - x_min) / n_cellules * largeur_z
+        self.epaisseur_isolant = epaisseur_isolant
+        self.permittivite_relative = permittivite_relative
+        self.rendement_electrons = rendement_electrons
+        self.constante_relaxation = constante_relaxation
+        self.sigma = np.zeros(n_cellules)
+        self._potentiels = np.zeros(n_cellules)
+
+    def reinitialiser(self) -> None :
+        """Surface déchargée"""
+        self.sigma[:] = 0
+        self._potentiels[:] = 0
+
+    @property
+    def potentiels(self) -> np.ndarray :
+        """Potentiel de la surface au centre de chaque cellule (V)"""
+        return self._potentiels
+
+    def _mettre_a_jour_potentiels(self) -> None :
+        etalement = self.epaisseur_isolant / (self.bords[1] - self.bords[0]) # En cellules
+        sigma = gaussian_filter1d(self.sigma, etalement, mode='constant') if etalement > 0.1 else self.sigma
+        self._potentiels = sigma * self.epaisseur_isolant / (constants.epsilon_0 * self.permittivite_relative)
+
+    def potentiel(self, x) -> np.ndarray :
+        """Potentiel de la surface aux abscisses x (V), 0 hors de la zone suivie et pour x non fini"""
+        x = np.asarray(x, dtype=float)
+        return np.where(np.isfinite(x), np.interp(x, self.centres, self._potentiels, left=0.0, right=0.0), 0.0)
+
+    def deposer(self, xs : np.ndarray, charges_e, ions_par_ion_simule : float = 1.0, duree : float = 0.0) -> None :
+        """
+        Ajoute la charge des ions primaires arrivés en xs (ions primaires et électrons secondaires émis), après la fuite pendant duree
+
+        Parameters
+        ----------
+        xs : numpy.ndarray
+            Points de contact (m), NaN sans contact
+        charges_e : array_like
+            Charge de chaque ion (en e, signée)
+        ions_par_ion_simule : float
+            Ions réels représentés par chaque ion simulé
+        duree : float
+            Durée écoulée depuis le dépôt précédent (s)
+        """
+        if np.isfinite(self.constante_relaxation) and duree > 0 : self.sigma *= np.exp(-duree / self.constante_relaxation)
+        charges = np.broadcast_to(np.asarray(charges_e, dtype=float), np.shape(xs)) + self.rendement_electrons
+        cellules = np.searchsorted(self.bords, xs, side='right') - 1
+        dedans = (cellules >= 0) & (cellules < len(self.sigma)) # NaN : searchsorted le range après le dernier bord
+        self.sigma += np.bincount(cellules[dedans], weights=charges[dedans], minlength=len(self.sigma)) \
+            * (ions_par_ion_simule * constants.e / self.aire_cellule)
+        self._mettre_a_jour_potentiels()
+
+
+def resoudre_contacts(mq, v0, angle, hauteur, E : float, surface : charge_surface, tolerance : float = 1e-9, n_iterations_max : int = 50,
+                      amortissement : float = 1.0) -> tuple[np.ndarray, dict] :
+    """
+    Points de contact cohérents avec la charge de surface : la surface étant au potentiel V(xs), la différence de potentiel vue
+    par un ion qui arrive en xs vaut potentiel + V(xs), d'où un champ effectif E + V(xs) / hauteur. On itère
+    g(xs) = calculer_impacts(E + V(xs) / hauteur) - xs = 0 par la méthode de la sécante, ion par ion mais vectorisée sur les ions
+    non convergés (un simple point fixe oscille quand le potentiel varie fortement sous le faisceau).
+    Un ion qui touchait l'échantillon sans charge et ne le touche plus (surface trop chargée : effet miroir) est compté comme réfléchi.
+
+    Parameters
+    ----------
+    mq, v0, angle, hauteur : float or array_like
+        Voir deviation.calculer_impacts (diffusés entre eux)
+    E : float
+        Champ électrique sans charge (en V/m)
+    surface : charge_surface
+        Charge de surface
+    tolerance : float
+        Résidu |g(xs)| en dessous duquel un ion est convergé (m)
+    n_iterations_max : int
+        Nombre maximal d'itérations
+    amortissement : float
+        Fraction de g appliquée au premier pas (point fixe amorti) et quand la sécante n'est pas définie
+
+    Returns
+    -------
+    tuple
+        - Points de contact (m), NaN sans contact
+        - Rapport de convergence : 'iterations', 'non_convergees', 'reflechies', 'residu_max' (m)
+    """
+    mq, v0, angle, hauteur = (np.asarray(a, dtype=float) for a in np.broadcast_arrays(mq, v0, angle, hauteur))
+    mq, v0, angle, hauteur = mq.ravel(), v0.ravel(), angle.ravel(), hauteur.ravel()
+    xs = deviation.calculer_impacts(mq, v0, angle, hauteur, E)[0]
+    touchaient = np.isfinite(xs) # Contact sans charge : les autres ions ne sont pas réfléchis par la surface
+    actifs = np.flatnonzero(touchaient)
+    x_precedents, g_precedents = np.full(len(actifs), np.nan), np.full(len(actifs), np.nan)
+    residu_max, iterations = 0.0, 0
+    for iterations in range(1, n_iterations_max + 1) :
+        if len(actifs) == 0 : break
+        x_actifs = xs[actifs]
+        g = deviation.calculer_impacts(mq[actifs], v0[actifs], angle[actifs], hauteur[actifs], E + surface.potentiel(x_actifs) / hauteur[actifs])[0] - x_actifs
+        with np.errstate(invalid='ignore', divide='ignore') :
+            secante = x_actifs - g * (x_actifs - x_precedents) / (g - g_precedents)
+            nouveaux = np.where(np.isfinite(secante), secante, x_actifs + amortissement * g) # Pas amorti à la première itération
+        xs[actifs] = nouveaux
+        corrections = np.abs(g)
+        fini = np.isfinite(corrections)
+        residu_max = float(corrections[fini].max()) if np.any(fini) else 0.0
+        garder = fini & (corrections > tolerance)
+        actifs, x_precedents, g_precedents = actifs[garder], x_actifs[garder], g[garder]
+    rapport = {'iterations' : iterations, 'non_convergees' : len(actifs), 'reflechies' : int(np.count_nonzero(touchaient & np.isnan(xs))),
+               'residu_max' : residu_max}
+    return xs, rapport
+
+
+def iterer_charge(source, masses_charges_primaires : list[tuple[float, float]], potentiel : float, surface : charge_surface, courant : float,
+                  duree_pas : float, n_pas : int, n_ions_par_pas : int = 100_000, proportions : list[float] = None, graine : int = None, **options) :
+    """
+    Dérive du faisceau primaire pendant que l'échantillon se charge : à chaque pas, un lot tiré depuis la source est résolu
+    de façon cohérente avec la charge actuelle (resoudre_contacts), puis sa charge est déposée
+
+    Parameters
+    ----------
+    source : source.source_ions
+        Source du faisceau primaire
+    masses_charges_primaires : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce primaire
+    potentiel : float
+        Différence de potentiel entre les plaques (en V), la distance entre plaques étant la hauteur nominale
+    surface : charge_surface
+        Charge de surface (modifiée en place)
+    courant : float
+        Courant primaire (A)
+    duree_pas : float
+        Durée d'un pas (s)
+    n_pas : int
+        Nombre de pas
+    n_ions_par_pas : int
+        Ions simulés par pas (chacun représente courant duree_pas / (e n_ions_par_pas) ions réels)
+    proportions : list of float
+        Proportion de chaque espèce (uniforme par défaut)
+    graine : int
+        Graine du générateur aléatoire
+    **options :
+        tolerance, n_iterations_max, amortissement de resoudre_contacts
+
+    Yields
+    ------
+    dict
+        'temps' (s), 'xs_moyen' et 'xs_ecart_type' (m), 'potentiel_max' (V), 'fraction_reflechie' et le rapport de convergence
+    """
+    rng = np.random.default_rng(graine)
+    primaires = np.asarray(masses_charges_primaires, dtype=float).reshape(-1, 2)
+    proportions = np.ones(len(primaires)) if proportions is None else np.asarray(proportions, dtype=float)
+    E = deviation.champ_electrique_v2(source.height, potentiel)
+    for pas in range(n_pas) :
+        especes = rng.choice(len(primaires), n_ions_par_pas, p=proportions / proportions.sum())
+        masses_u, charges_e = primaires[especes, 0], primaires[especes, 1]
+        v0, angles, hauteurs = source.echantillonner(masses_u, rng)
+        angles = np.where((angles > 0) & (angles < np.pi / 2) & (hauteurs > 0), angles, np.nan) # Tirages hors du domaine du modèle : perdus
+        mq = masses_u * constants.u / (charges_e * constants.e)
+        xs, rapport = resoudre_contacts(mq, v0, angles, hauteurs, E, surface, **options)
+        ions_reels = courant * duree_pas / (constants.e * np.mean(np.abs(charges_e)))
+        surface.deposer(xs, charges_e, ions_reels / n_ions_par_pas, duree_pas)
+        contact = np.isfinite(xs)
+        yield dict(rapport, temps=(pas + 1) * duree_pas, xs_moyen=float(np.mean(xs[contact])) if np.any(contact) else np.nan,
+                   xs_ecart_type=float(np.std(xs[contact])) if np.any(contact) else np.nan,
+                   potentiel_max=float(np.max(np.abs(surface.potentiels))), fraction_reflechie=rapport['reflechies'] / n_ions_par_pas)
+
+
+def tracer_charge(historique : list[dict], create_plot : bool = True, axes = None) -> None :
+    """
+    Trace la dérive du point de contact moyen et le potentiel maximal de la surface au cours du temps
+
+    Parameters
+    ----------
+    historique : list of dict
+        Métriques de iterer_charge
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (axes est alors nécessaire)
+    axes : tuple of matplotlib.axes.Axes
+        Deux axes (uniquement si create_plot = False)
+    """
+    if create_plot or axes is None : fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    temps = np.array([h['temps'] for h in historique])
+    xs, ecart = np.array([h['xs_moyen'] for h in historique]) * 1e3, np.array([h['xs_ecart_type'] for h in historique]) * 1e3
+    axes[0].plot(temps, xs, color=plt.cm.viridis(0.3))
+    axes[0].fill_between(temps, xs - ecart, xs + ecart, color=plt.cm.viridis(0.3), alpha=0.3)
+    axes[0].set_xlabel("Temps (s)")
+    axes[0].set_ylabel("Point de contact (mm)")
+    axes[0].set_title("Dérive du faisceau primaire")
+    axes[1].plot(temps, [h['potentiel_max'] for h in historique], color=plt.cm.viridis(0.7))
+    axes[1].set_xlabel("Temps (s)")
+    axes[1].set_ylabel("Potentiel de surface maximal (V)")
+    axes[1].set_title("Charge de l'échantillon")
+    for ax in axes : ax.grid(True, linestyle='--', alpha=0.6)
+    if create_plot :
+        plt.tight_layout()
+        plt.show()
+
+
+'''
+Exemple : faisceau d'Ar+ de 1 nA sur une couche isolante de 100 nm, avec une fuite de constante de temps 20 s
+'''
+if __name__ == '__main__' :
+    import source as module_source # type: ignore
+
+    primaire = module_source.source_ions(1e5, np.pi / 6, 0.05, loi_emittance='gaussienne', dispersion_angle=0.005, dispersion_hauteur=1e-4)
+    surface = charge_surface(0.0, 0.1, 400, epaisseur_isolant=100e-9, rendement_electrons=1.0, constante_relaxation=20.0)
+    t0 = time.perf_counter()
+    historique = list(iterer_charge(primaire, [(40, 1)], -2000, surface, 1e-9, 1.0, 100, graine=0))
+    print(f"100 pas de 10^5 ions : {time.perf_counter() - t0:.2f} s, itérations max {max(h['iterations'] for h in historique)}, "
+          f"non convergés max {max(h['non_convergees'] for h in historique)}")
+    print(f"Dérive du point de contact : {(historique[-1]['xs_moyen'] - historique[0]['xs_moyen']) * 1e6:.1f} µm, "
+          f"potentiel de surface {historique[-1]['potentiel_max']:.1f} V")
+    tracer_charge(historique)
@@ -1,7 +1,19 @@
+import os, sys
 import matplotlib.pyplot as plt
 import numpy as np
 import scipy.constants as constants
 
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_outils = os.path.join(folder, "outils", "Code")
+for pth in [path_outils]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+from traces import MODES_TRACE, choisir_mode_trace, tracer_resume, fractions_trajectoire # type: ignore
+import transfert # type: ignore
+from relativite import SEUIL_RELATIVISTE, facteur_lorentz, verifier_mode # type: ignore
+
 
 def champ_electrique_v2(distance: float, difference_potentiel: float) -> float:
     """
@@ -30,6 +42,209 @@ def champ_electrique_v2(distance: float, difference_potentiel: float) -> float:
         raise ValueError("La distance doit être strictement positive.")
     return difference_potentiel / distance
 
+def calculer_impacts(mq, v0, angle, hauteur, E, relativiste = False) -> tuple :
+    """
+    Calcule ensemble le point de contact, l'angle incident, le temps de vol et la vitesse d'impact
+    en partageant tous les termes intermédiaires (un seul discriminant et une seule racine).
+    Accepte des scalaires ou des tableaux (diffusés entre eux).
+
+    Avec A = v0 cos(angle), C = E / mq et D = sqrt(A² - 2 hauteur C) :
+    t = 2 hauteur / (A + D) (forme stable, valable aussi pour E = 0), xs = v0 sin(angle) t,
+    la vitesse selon y au contact vaut -D.
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé (en kg/C)
+    v0 : float or array_like
+        Vitesse initiale (en m/s)
+    angle : float or array_like
+        Angle initial entre v0 et l'axe y (en radians)
+    hauteur : float or array_like
+        Hauteur initiale (en m)
+    E : float or array_like
+        Champ électrique dirigé selon y (en V/m)
+    relativiste : bool or str
+        False (classique), True (relativiste pour tous les ions) ou 'auto' (relativiste pour les ions dont la vitesse
+        initiale ou d'impact dépasse SEUIL_RELATIVISTE c), voir _calculer_impacts_relativistes
+
+    Returns
+    -------
+    xs : float or numpy.ndarray
+        Abscisse du point de contact (en m)
+    angle_incident : float or numpy.ndarray
+        Angle entre la trajectoire et l'axe y au point de contact (en radians)
+    temps_vol : float or numpy.ndarray
+        Temps de vol jusqu'au contact (en s)
+    vitesse_impact : float or numpy.ndarray
+        Norme de la vitesse au point de contact (en m/s)
+    Toutes les valeurs sont NaN pour les particules sans contact.
+    """
+    if relativiste : return _calculer_impacts_mixtes(mq, v0, angle, hauteur, E, relativiste)
+    vx = v0 * np.sin(angle)
+    A = v0 * np.cos(angle)
+    with np.errstate(invalid='ignore') :
+        D = np.sqrt(A * A - 2 * hauteur * E / mq)
+    temps_vol = 2 * hauteur / (A + D)
+    return vx * temps_vol, np.arctan2(vx, D), temps_vol, np.sqrt(vx * vx + D * D)
+
+
+def _calculer_impacts_relativistes(mq, v0, angle, hauteur, E) -> tuple :
+    """
+    Solution relativiste exacte de calculer_impacts dans le champ uniforme, écrite avec la vitesse propre u = gamma v.
+    Avec C = E / mq, gamma_f = gamma_0 - hauteur C / c² au contact, A = u cos(angle) et D² = A² - hauteur C (gamma_0 + gamma_f)
+    (aucune différence de termes voisins, donc précis aussi aux faibles vitesses) : t = hauteur (gamma_0 + gamma_f) / (A + D),
+    u_y vaut -D au contact et xs = u_x t s asinh(z) / (gamma_perp z) (intégrale de u_x / gamma(t)), qui tendent vers les
+    expressions classiques quand v << c.
+    """
+    c = constants.c
+    gamma_0 = 1 / np.sqrt(1 - np.square(v0 / c))
+    ux = gamma_0 * v0 * np.sin(angle)
+    A = gamma_0 * v0 * np.cos(angle)
+    gamma_f = gamma_0 - hauteur * E / (mq * c * c)
+    with np.errstate(invalid='ignore', divide='ignore') :
+        D = np.sqrt(A * A - hauteur * E / mq * (gamma_0 + gamma_f))
+        temps_vol = hauteur * (gamma_0 + gamma_f) / (A + D)
+        gamma_perp = np.sqrt(1 + ux * ux / (c * c))
+        a, b = -D / (c * gamma_perp), -A / (c * gamma_perp) # u_y / (c gamma_perp) au contact et au départ
+        s = (a + b) / (a * np.sqrt(1 + b * b) + b * np.sqrt(1 + a * a)) # asinh(a) - asinh(b) = asinh((a - b) s)
+        z = (a - b) * s
+        asinh_z = np.where(z != 0, np.arcsinh(z) / z, 1.0)
+    return ux * temps_vol * s * asinh_z / gamma_perp, np.arctan2(ux, D), temps_vol, np.sqrt(ux * ux + D * D) / gamma_f
+
+
+def _calculer_impacts_mixtes(mq, v0, angle, hauteur, E, relativiste) -> tuple :
+    """
+    calculer_impacts relativiste pour tous les ions (relativiste = True) ou seulement pour ceux dont la vitesse initiale ou
+    la vitesse d'impact classique dépasse SEUIL_RELATIVISTE c ('auto')
+    """
+    verifier_mode(relativiste)
+    if relativiste is True : return _calculer_impacts_relativistes(mq, v0, angle, hauteur, E)
+    resultats = tuple(np.asarray(r, dtype=float) for r in calculer_impacts(mq, v0, angle, hauteur, E))
+    limite = SEUIL_RELATIVISTE * constants.c
+    rapides = (np.asarray(v0) > limite) | (resultats[3] > limite) # Ions rapides au départ ou accélérés par le champ
+    if np.any(rapides) :
+        arguments = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (mq, v0, angle, hauteur, E)))
+        for resultat, valeurs in zip(resultats, _calculer_impacts_relativistes(*(a[rapides] for a in arguments))) :
+            resultat[rapides] = valeurs
+    return resultats
+
+
+def energie_cinetique(masses_u, vitesses, relativiste = False) :
+    """
+    Energie cinétique (en eV) : m v² / 2, ou m c² (gamma - 1) = m (gamma v)² / (gamma + 1) en mode relativiste
+    (True, ou 'auto' pour les vitesses supérieures à SEUIL_RELATIVISTE c)
+    """
+    masses = np.asarray(masses_u, dtype=float) * constants.u
+    vitesses = np.asarray(vitesses, dtype=float)
+    if not relativiste : return 0.5 * masses * vitesses * vitesses / constants.e
+    gamma = facteur_lorentz(vitesses, relativiste) # 1 sous le seuil en mode 'auto' : m v² / 2
+    return masses * np.square(gamma * vitesses) / (gamma + 1) / constants.e
+
+
+def calculer_faisceau(masses_u, charges_e, v0, angle, hauteur, E, relativiste = False) -> dict :
+    """
+    Calcule pour tout un faisceau (calcul vectorisé) les grandeurs au point de contact avec l'échantillon,
+    y compris le temps de vol et l'énergie cinétique à l'impact
+
+    Parameters
+    ----------
+    masses_u : float or array_like
+        Masses des ions (en u)
+    charges_e : float or array_like
+        Charges des ions (en nombre de charges élémentaires, signées)
+    v0 : float or array_like
+        Vitesse initiale (en m/s)
+    angle : float or array_like
+        Angle initial entre v0 et l'axe y (en radians)
+    hauteur : float or array_like
+        Hauteur initiale (en m)
+    E : float or array_like
+        Champ électrique dirigé selon y (en V/m)
+    relativiste : bool or str
+        Voir calculer_impacts
+
+    Returns
+    -------
+    dict of str -> numpy.ndarray
+        - 'xs' : abscisse du point de contact (en m)
+        - 'angle_incident' : angle avec l'axe y au point de contact (en radians)
+        - 'temps_vol' : temps de vol jusqu'au contact (en s)
+        - 'vitesse_impact' : norme de la vitesse au point de contact (en m/s)
+        - 'energie_impact' : énergie cinétique au point de contact (en eV)
+        NaN pour les ions sans contact
+    """
+    masses_u = np.asarray(masses_u, dtype=float)
+    charges_e = np.asarray(charges_e, dtype=float)
+    mq = (masses_u * constants.u) / (charges_e * constants.e)
+    xs, angle_incident, temps_vol, vitesse_impact = calculer_impacts(mq, v0, angle, hauteur, E, relativiste)
+    energie_impact = energie_cinetique(masses_u, vitesse_impact, relativiste)
+    return {'xs' : xs, 'angle_incident' : angle_incident, 'temps_vol' : temps_vol, 'vitesse_impact' : vitesse_impact, 'energie_impact' : energie_impact}
+
+
+def positions_au_temps(mq, v0, angle, hauteur, E, temps) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Positions des particules aux instants donnés : x = v0 sin(angle) t, y = hauteur - v0 cos(angle) t + (E / mq) t² / 2.
+    Une particule qui a touché l'échantillon reste à son point de contact.
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé (en kg/C), un par particule
+    v0, angle, hauteur : float or array_like
+        Vitesse initiale (en m/s), angle initial avec l'axe y (en radians) et hauteur initiale (en m)
+    E : float
+        Champ électrique dirigé selon y (en V/m)
+    temps : array_like
+        Instants (en s)
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Positions x et y (en m), de forme (nombre d'instants, nombre de particules)
+    """
+    mq, v0, angle, hauteur = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float)) for a in (mq, v0, angle, hauteur)))
+    temps_vol = calculer_impacts(mq, v0, angle, hauteur, E)[2]
+    t = np.asarray(temps, dtype=float)[:, None]
+    t = np.where(np.isfinite(temps_vol), np.minimum(t, temps_vol), t) # Arrêt au point de contact
+    return v0 * np.sin(angle) * t, hauteur + (0.5 * (E / mq) * t - v0 * np.cos(angle)) * t
+
+
+def matrices_transfert(mq, v0, angle, hauteur, E) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Matrices de transfert du premier et du second ordre du point de départ jusqu'à l'échantillon, autour de l'ion de
+    référence. Variables de phase au départ : écart d'abscisse (m), écart d'angle initial (rad), écart relatif de m/q et
+    écart relatif de vitesse ; à l'arrivée : écart de point de contact (m), écart d'angle incident (rad) et les deux
+    écarts relatifs, conservés. L'application exacte développée est calculer_impacts.
+
+    Parameters
+    ----------
+    mq : float
+        Rapport masse/charge signé de l'ion de référence (en kg/C)
+    v0 : float
+        Vitesse initiale de l'ion de référence (en m/s)
+    angle : float
+        Angle initial de l'ion de référence avec l'axe y (en radians)
+    hauteur : float
+        Hauteur initiale (en m)
+    E : float
+        Champ électrique dirigé selon y (en V/m)
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        R de forme (4, 4) et T de forme (4, 4, 4)
+    """
+    xs_reference, angle_reference = calculer_impacts(mq, v0, angle, hauteur, E)[:2]
+    if not np.isfinite(xs_reference) : raise ValueError("L'ion de référence ne touche pas l'échantillon.")
+
+    def application(X) :
+        xs, angle_incident = calculer_impacts(mq * (1 + X[2]), v0 * (1 + X[3]), angle + X[1], hauteur, E)[:2]
+        return np.stack((X[0] + xs - xs_reference, angle_incident - angle_reference))
+
+    return transfert.developper_carte(application, (1e-4 * hauteur, 1e-4, 1e-4, 1e-4))
+
+
 # --- Classe Particule ---
 
 class particule:
@@ -116,6 +331,28 @@ class particule:
         x = np.linspace(x_min, x_max, n_points)
         return x, self.equation_trajectoire(x, E)
 
+    def impact(self, E : float) -> tuple[float, float, float, float] :
+        """
+        Calcule en une fois les grandeurs au point de contact avec l'échantillon (voir calculer_impacts)
+
+        Parameters
+        ----------
+        E : float
+            Valeur du champ électrique à proximité de la plaque dirigé selon y
+
+        Returns
+        -------
+        tuple of float or None
+            - abscisse du point de contact (depuis son abscisse initiale) (en m)
+            - angle formé par la trajectoire et l'axe y au point de contact (en radians)
+            - temps de vol jusqu'au contact (en s)
+            - norme de la vitesse au point de contact (en m/s)
+            None s'il n'y a pas de contact
+        """
+        xs, angle, temps_vol, vitesse = calculer_impacts(self.mq, self.vo, self.angle, self.height, E)
+        if np.isnan(xs) : return None
+        return float(xs), float(angle), float(temps_vol), float(vitesse)
+
     def point_contact(self, E : float) -> float :
         """
         Calcule l'abscisse où la particule touche l'échantillon
@@ -128,16 +365,10 @@ class particule:
         Returns
         -------
         float
-            abscisse du point de contact (depuis son abscisse initiale)
+            abscisse du point de contact (depuis son abscisse initiale), None s'il n'y a pas de contact
         """
-        with np.errstate(invalid='ignore') :
-            if (self.vo * np.cos(self.angle)) ** 2 - 2 * self.height * E / self.mq >= 0 :
-                if E != 0 :
-                    return self.mq * self.vo * np.sin(self.angle) / E * (self.vo * np.cos(self.angle) - np.sqrt((self.vo * np.cos(self.angle)) ** 2 - 2 * self.height * E / self.mq))
-                else :
-                    return self.height * np.tan(self.angle)
-            else :
-                return None
+        impact = self.impact(E)
+        return impact[0] if impact is not None else None
 
     def angle_incident(self, E : float) -> float :
         """
@@ -151,10 +382,10 @@ class particule:
         Returns
         -------
         float
-            Angle formé par la trajectoire et l'axe y au point de contact avec l'échantillon en radians
+            Angle formé par la trajectoire et l'axe y au point de contact avec l'échantillon en radians, None s'il n'y a pas de contact
         """
-        x_contact = self.point_contact(E)
-        return  np.arctan(-1 / (E * x_contact / (self.mq * self.vo * np.sin(self.angle) * self.vo * np.sin(self.angle)) - 1 / np.tan(self.angle)))
+        impact = self.impact(E)
+        return impact[1] if impact is not None else None
 
     def tracer_trajectoire(self, ax, E : float, x_min : float, x_max : float, color=None, label=None, is_uncertainty_plot : bool =False, n_points : int = 1000) -> None:
         """
@@ -199,7 +430,9 @@ def tracer_ensemble_trajectoires(
         hauteur_initiale : float,
         labels_particules: list[str] = None, # Liste des noms
         create_plot=True,
-        ax=None
+        ax=None,
+        mode : str = 'auto',
+        n_points_resume : int = 64
     ) -> None :
     """
     Trace les trajectoires jusqu'au contact de différentes particules de manière statique
@@ -222,8 +455,18 @@ def tracer_ensemble_trajectoires(
         Permet de maneuvrer la meme fonction pour l'utilisateur et l'interface.
     ax : bool
         Permet de maneuvrer la meme fonction pour l'utilisateur et l'interface.
+    mode : str
+        Niveau de détail (voir choisir_mode_trace) : par défaut, au-delà de SEUIL_DETAIL particules, les trajectoires
+        sont résumées (LineCollection, densité ou impacts) sans légende ni angle par particule
+    n_points_resume : int
+        Nombre de points par trajectoire dans les modes résumés
     """
     if create_plot or ax is None : fig, ax = plt.subplots(figsize=(10, 8))
+    mode = choisir_mode_trace(len(masse_charge_particules), mode)
+    if mode != 'detail' :
+        _tracer_ensemble_resume(masse_charge_particules, vitesse_initiale, potentiel, angle_initial, hauteur_initiale, ax, mode, n_points_resume)
+        if create_plot : plt.show()
+        return
     if labels_particules is None: labels_particules = [f"Particule {i+1}" for i in range(len(masse_charge_particules))]
     if len(labels_particules) != len(masse_charge_particules):
         print("Avertissement: Noms/Particules mismatch.")
@@ -242,12 +485,12 @@ def tracer_ensemble_trajectoires(
             color = colors[i]
             p = particule(mc, vitesse_initiale, angle_initial, hauteur_initiale)
             label = labels_particules[i]
-            x_contact = p.point_contact(E)
+            impact = p.impact(E) # Point de contact et angle incident en un seul calcul
 
-            if x_contact is not None and x_contact > 0:
+            if impact is not None and impact[0] > 0:
+                x_contact, angle_inc = impact[0], impact[1] # Angle vs +x
                 all_x_max.append(x_contact)
                 p.tracer_trajectoire(ax, E, 0, x_contact, label=label, color=color) # Utilise label fourni
-                angle_inc = p.angle_incident(E) # Angle vs +x
                 angle_deg = np.degrees(angle_inc) if angle_inc is not None else None
                 texte_angles += f"\n{label}: {angle_deg:.1f}°" if angle_deg is not None else f"\n{label}: Contact?" # Garder tel quel
             else:
@@ -284,6 +527,36 @@ def tracer_ensemble_trajectoires(
     if create_plot : plt.show()
 
 
+def _tracer_ensemble_resume(masse_charge_particules, vitesse_initiale, potentiel, angle_initial, hauteur_initiale, ax, mode, n_points) -> None :
+    """Modes résumés de tracer_ensemble_trajectoires : un seul calcul vectorisé et un nombre d'artistes fixe"""
+    masses_charges = np.asarray(masse_charge_particules, dtype=float).reshape(-1, 2)
+    E = champ_electrique_v2(hauteur_initiale, potentiel)
+    mq = masses_charges[:, 0] * constants.u / (masses_charges[:, 1] * constants.e)
+    xs, angle_inc, _, _ = calculer_impacts(mq, vitesse_initiale, angle_initial, hauteur_initiale, E)
+    contact = np.isfinite(xs) & (xs > 0)
+    xlim_max = np.max(xs[contact]) * 1.1 if np.any(contact) else hauteur_initiale * 2
+
+    # Trajectoires jusqu'au contact, ou jusqu'au bord du tracé sans contact (décimées pour borner le nombre total de points)
+    x_fin = np.where(contact, xs, xlim_max)
+    x = x_fin[:, None] * fractions_trajectoire(len(mq), n_points, mode)
+    X = x / (vitesse_initiale * np.sin(angle_initial))
+    y = (0.5 * (E / mq)[:, None] * X - vitesse_initiale * np.cos(angle_initial)) * X + hauteur_initiale
+    mq_u = np.abs(masses_charges[:, 0] / masses_charges[:, 1])
+    tracer_resume(ax, mq_u, x, y, contact, xs[contact], np.zeros(np.sum(contact)), mode, '|')
+
+    angles = np.degrees(angle_inc[contact])
+    texte = f"{len(mq)} particules (mode {mode})\nContact : {np.sum(contact)} / {len(mq)}"
+    if len(angles) : texte += f"\nAngles incidents : {np.min(angles):.1f}° à {np.max(angles):.1f}°"
+    ax.set_xlim(0, xlim_max)
+    ax.plot([0, xlim_max], [0, 0], c='black', linewidth=3, label='Échantillon (y=0)')
+    ax.text(0.98, 0.98, texte, transform=ax.transAxes, fontsize=9, verticalalignment='top', horizontalalignment='right', bbox=dict(boxstyle="round", facecolor="white", alpha=0.7))
+    ax.set_xlabel("Position x (m)")
+    ax.set_ylabel("Position y (m)")
+    ax.set_title(f"Déviation Électrique (V = {potentiel:.1f} V)")
+    ax.legend(fontsize='small', loc='upper left')
+    ax.grid(True, linestyle='--', alpha=0.6)
+
+
 def create_incertitude_params(p : particule, incertitudes : dict, E : float) :
     """
     Crée une des particules min et max 'incertitude' et les E_min, E_max
@@ -308,19 +581,44 @@ def create_incertitude_params(p : particule, incertitudes : dict, E : float) :
     E_max : float 
         Le champ E maximal, sera utilisé pour la particule incertitude la plus déviée
     """
-    if p.c * E >= 0 :
-            min_particule = particule((p.m * (1 + incertitudes['m']), p.c * (1 - incertitudes['q'])), p.vo * (1 + incertitudes['v0']), p.angle * (1 - incertitudes['theta']), p.height * (1 - incertitudes['h']), is_incertitude=True, incertitude_unique = True, base_mq=(p.m, p.c))
-            max_particule = particule((p.m * (1 - incertitudes['m']), p.c * (1 + incertitudes['q'])), p.vo * (1 - incertitudes['v0']), p.angle * (1 + incertitudes['theta']), p.height * (1 + incertitudes['h']), is_incertitude=True, base_mq=(p.m, p.c))
-            E_min = E * (1 - incertitudes['E'])
-            E_max = E * (1 + incertitudes['E'])
-    else :
-            min_particule = particule((p.m * (1 - incertitudes['m']), p.c * (1 + incertitudes['q'])), p.vo * (1 - incertitudes['v0']), p.angle * (1 - incertitudes['theta']), p.height * (1 - incertitudes['h']), is_incertitude=True, incertitude_unique = True, base_mq=(p.m, p.c))
-            max_particule = particule((p.m * (1 + incertitudes['m']), p.c * (1 - incertitudes['q'])), p.vo * (1 + incertitudes['v0']), p.angle * (1 + incertitudes['theta']), p.height * (1 + incertitudes['h']), is_incertitude=True, base_mq=(p.m, p.c))
-            E_min = E * (1 + incertitudes['E'])
-            E_max = E * (1 - incertitudes['E'])
+    s = 1.0 - 2.0 * (p.c * E < 0) # Signe de qE (+1 si nul) : le sens de chaque incertitude défavorable en dépend
+    min_particule = particule((p.m * (1 + s * incertitudes['m']), p.c * (1 - s * incertitudes['q'])), p.vo * (1 + s * incertitudes['v0']), p.angle * (1 - incertitudes['theta']), p.height * (1 - incertitudes['h']), is_incertitude=True, incertitude_unique = True, base_mq=(p.m, p.c))
+    max_particule = particule((p.m * (1 - s * incertitudes['m']), p.c * (1 + s * incertitudes['q'])), p.vo * (1 - s * incertitudes['v0']), p.angle * (1 + incertitudes['theta']), p.height * (1 + incertitudes['h']), is_incertitude=True, base_mq=(p.m, p.c))
+    E_min = E * (1 - s * incertitudes['E'])
+    E_max = E * (1 + s * incertitudes['E'])
 
     return min_particule, max_particule, E_min, E_max
 
+def calculer_bornes_contact(masses_u, charges_e, v0, angle, hauteur, E, incertitudes : dict) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Version vectorisée de create_incertitude_params pour tout un faisceau (cations, anions et ions multichargés mélangés) :
+    le signe s de qE fixe, ion par ion et sans branchement, le sens des incertitudes défavorables, puis les deux jeux de
+    paramètres extrêmes sont évalués en un seul appel à calculer_impacts
+
+    Parameters
+    ----------
+    masses_u, charges_e : float or array_like
+        Masses (en u) et charges signées (en e) des ions
+    v0, angle, hauteur, E : float or array_like
+        Voir calculer_impacts
+    incertitudes : dict
+        Incertitudes relatives 'm', 'q', 'v0', 'theta', 'h' et 'E'
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Points de contact minimal et maximal (en m), NaN si l'un des deux extrêmes n'a pas de contact
+    """
+    masses_u, charges_e = np.asarray(masses_u, dtype=float), np.asarray(charges_e, dtype=float)
+    s = 1.0 - 2.0 * (charges_e * np.asarray(E, dtype=float) < 0)
+    bornes = np.array([-1.0, 1.0]).reshape((2,) + (1,) * np.ndim(s)) # Axe 0 : extrêmes bas et haut
+    sens = bornes * s
+    mq = masses_u * (1 - sens * incertitudes['m']) * constants.u / (charges_e * (1 + sens * incertitudes['q']) * constants.e)
+    xs = calculer_impacts(mq, v0 * (1 - sens * incertitudes['v0']), angle * (1 + bornes * incertitudes['theta']),
+                          hauteur * (1 + bornes * incertitudes['h']), E * (1 + sens * incertitudes['E']))[0]
+    return np.minimum(xs[0], xs[1]), np.maximum(xs[0], xs[1])
+
+
 def tracer_ensemble_trajectoires_avec_incertitudes(
         masse_charge_particules : list[tuple[float, float]],
         vitesse_initiale : float,
@@ -376,11 +674,11 @@ def tracer_ensemble_trajectoires_avec_incertitudes(
         color = colors[i]; label_base = labels_particules[i]
         label_incert = f"Incert. {label_base}"
 
-        x_contact_nom = p_base.point_contact(E_nominal)
-        if x_contact_nom is not None and x_contact_nom > 0:
+        impact_nom = p_base.impact(E_nominal)
+        if impact_nom is not None and impact_nom[0] > 0:
+            x_contact_nom, angle_inc = impact_nom[0], impact_nom[1]
             all_x_max_global.append(x_contact_nom)
             p_base.tracer_trajectoire(ax, E_nominal, 0, x_contact_nom, color=color, label=label_base)
-            angle_inc = p_base.angle_incident(E_nominal)
             angle_deg = np.degrees(angle_inc) if angle_inc is not None else None
             texte_angles += f"\n{label_base}: {angle_deg:.1f}°" if angle_deg is not None else f"\n{label_base}: Contact?"
         else:
@@ -468,6 +766,120 @@ def calculer_delta_impact(masse_charge_tuple : tuple, vitesse_initiale : float,
     return xs - xs_ref
 
 
+def calculer_potentiel_pour_impact(masses_u, charges_e, vitesse_initiale, angle_initial, hauteur_initiale, xs_cible) :
+    """
+    Problème inverse de point_contact : potentiel entre les plaques pour que la particule touche l'échantillon en xs_cible.
+    Solution analytique (calcul vectorisé, scalaires ou tableaux diffusés entre eux) : le temps de vol vaut
+    t = xs / (v0 sin θ) et y(t) = 0 donne E / mq = 2 (v0 cos θ t - h) / t², puis V = E h.
+    Seuls 0 < xs <= 2 h tan θ sont atteignables (au-delà il faudrait le second passage par y = 0).
+
+    Parameters
+    ----------
+    masses_u : float or array_like
+        Masse (en u)
+    charges_e : float or array_like
+        Charge (en nombre de charges élémentaires, signée)
+    vitesse_initiale : float or array_like
+        Vitesse initiale (en m/s)
+    angle_initial : float or array_like
+        Angle initial entre v0 et l'axe y (en radians)
+    hauteur_initiale : float or array_like
+        Hauteur initiale, égale à la distance entre les plaques (en m)
+    xs_cible : float or array_like
+        Abscisse du point de contact voulue (en m)
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Différence de potentiel entre les plaques (en V), NaN si xs_cible n'est pas atteignable
+    """
+    mq = (np.asarray(masses_u, dtype=float) * constants.u) / (np.asarray(charges_e, dtype=float) * constants.e)
+    xs_cible = np.asarray(xs_cible, dtype=float)
+    A = vitesse_initiale * np.cos(angle_initial)
+    t = xs_cible / (vitesse_initiale * np.sin(angle_initial))
+    with np.errstate(invalid='ignore', divide='ignore') :
+        E = 2 * mq * (A * t - hauteur_initiale) / (t * t)
+        atteignable = (xs_cible > 0) & (A * t <= 2 * hauteur_initiale)
+    return np.where(atteignable, E * hauteur_initiale, np.nan)[()]
+
+
+def calculer_angle_pour_impact(masses_u, charges_e, vitesse_initiale, potentiel, hauteur_initiale, xs_cible, n_grille : int = 64, n_iterations : int = 60) :
+    """
+    Angle initial pour que la particule touche l'échantillon en xs_cible à potentiel donné.
+    Recherche de racine vectorisée et encadrée : xs(θ) - xs_cible est évalué sur une grille de n_grille angles
+    dans ]0, π/2[ pour encadrer la première racine, puis l'encadrement est réduit par dichotomie.
+
+    Parameters
+    ----------
+    masses_u, charges_e, vitesse_initiale, hauteur_initiale, xs_cible : float or array_like
+        Voir calculer_potentiel_pour_impact
+    potentiel : float or array_like
+        Différence de potentiel entre les plaques (en V)
+    n_grille : int
+        Nombre d'angles de la grille d'encadrement
+    n_iterations : int
+        Nombre d'itérations de dichotomie
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Angle initial (en radians) donnant le plus petit angle solution, NaN s'il n'y a pas de solution
+    """
+    masses_u, charges_e, vitesse_initiale, potentiel, hauteur_initiale, xs_cible = np.broadcast_arrays(
+        *[np.asarray(a, dtype=float) for a in (masses_u, charges_e, vitesse_initiale, potentiel, hauteur_initiale, xs_cible)])
+    mq = (masses_u * constants.u) / (charges_e * constants.e)
+    E = potentiel / hauteur_initiale
+
+    def ecart(angle) :
+        with np.errstate(invalid='ignore') :
+            return calculer_impacts(mq, vitesse_initiale, angle, hauteur_initiale, E)[0] - xs_cible
+
+    # Encadrement : premier changement de signe sur la grille (les angles sans contact donnent NaN et sont ignorés)
+    grille = np.linspace(0, np.pi / 2, n_grille + 2)[1:-1].reshape((-1,) + (1,) * mq.ndim)
+    ecarts = ecart(grille)
+    changement = (np.sign(ecarts[:-1]) * np.sign(ecarts[1:]) <= 0) & np.isfinite(ecarts[:-1]) & np.isfinite(ecarts[1:])
+    trouve = np.any(changement, axis=0)
+    premier = np.argmax(changement, axis=0)
+    bas = np.take_along_axis(np.broadcast_to(grille, ecarts.shape), premier[None], axis=0)[0]
+    haut = np.take_along_axis(np.broadcast_to(grille, ecarts.shape), premier[None] + 1, axis=0)[0]
+    ecart_bas = ecart(bas)
+
+    for _ in range(n_iterations) :
+        milieu = 0.5 * (bas + haut)
+        ecart_milieu = ecart(milieu)
+        a_gauche = np.sign(ecart_milieu) * np.sign(ecart_bas) <= 0
+        haut = np.where(a_gauche, milieu, haut)
+        bas = np.where(a_gauche, bas, milieu)
+        ecart_bas = np.where(a_gauche, ecart_bas, ecart_milieu)
+    return np.where(trouve, 0.5 * (bas + haut), np.nan)[()]
+
+
+def table_calibration_potentiels(masse_charge_particules : list[tuple[float, float]], vitesse_initiale : float, angle_initial : float, hauteur_initiale : float, xs_cibles) -> np.ndarray :
+    """
+    Table de calibration : potentiel nécessaire pour chaque particule et chaque point d'impact visé
+
+    Parameters
+    ----------
+    masse_charge_particules : list of tuple of float
+        Masse (en u), Charge (en e) des particules
+    vitesse_initiale : float
+        Vitesse initiale (en m/s)
+    angle_initial : float
+        Angle initial entre v0 et l'axe y (en radians)
+    hauteur_initiale : float
+        Hauteur initiale, égale à la distance entre les plaques (en m)
+    xs_cibles : array_like
+        Abscisses visées (en m)
+
+    Returns
+    -------
+    numpy.ndarray
+        Potentiels (en V) de forme (nombre de particules, nombre de xs_cibles), NaN si non atteignable
+    """
+    masses_charges = np.asarray(masse_charge_particules, dtype=float).reshape(-1, 2)
+    return calculer_potentiel_pour_impact(masses_charges[:, 0, None], masses_charges[:, 1, None], vitesse_initiale, angle_initial, hauteur_initiale, np.asarray(xs_cibles, dtype=float)[None, :])
+
+
 def tracer_ensemble_potentiels(
         masse_charge_particule : tuple[float, float],
         vitesse_initiale : float,
@@ -508,19 +920,24 @@ def tracer_ensemble_potentiels(
     cmap = plt.cm.viridis
     non_contact_list_info = []
 
-    for i, V in enumerate(sorted(potentiels)): # Trier pour ordre couleurs
+    potentiels_tries = sorted(potentiels) # Trier pour ordre couleurs
+    # Points de contact et angles incidents pour tous les potentiels en un seul appel vectorisé
+    champs = champ_electrique_v2(hauteur_initiale, np.array(potentiels_tries, dtype=float))
+    xs_potentiels, angles_potentiels, _, _ = calculer_impacts(p.mq, p.vo, p.angle, p.height, champs)
+
+    for i, V in enumerate(potentiels_tries):
         if len(potentiels) > 1 :
             color = cmap(i / len(potentiels))
         else :
             color = cmap(0.5)
-        E = champ_electrique_v2(hauteur_initiale, V)
-        x_contact = p.point_contact(E)
+        E = champs[i]
+        x_contact = xs_potentiels[i] if not np.isnan(xs_potentiels[i]) else None
         label = f"V = {V:.1f} V"
 
         if x_contact is not None and x_contact > 0:
             all_x_max.append(x_contact)
             p.tracer_trajectoire(ax, E, 0, x_contact, color=color, label=label)
-            angle_inc = p.angle_incident(E) # Angle vs +x
+            angle_inc = angles_potentiels[i] # Angle vs +x
             angle_deg = np.degrees(angle_inc) if angle_inc is not None else None
             texte_angles += f"\n{V:.0f} V : {angle_deg:.1f}°" if angle_deg is not None else f"\n{V:.0f} V : Contact ?"
             is_contact_found = True
@@ -614,11 +1031,11 @@ def tracer_ensemble_trajectoires_potentiels_avec_incertitudes(
         label_incert = f"Incert. {V:.1f} V"
 
         # Tracer nominal
-        x_contact_nom = p_base.point_contact(E_nominal)
-        if x_contact_nom is not None and x_contact_nom > 0:
+        impact_nom = p_base.impact(E_nominal)
+        if impact_nom is not None and impact_nom[0] > 0:
+            x_contact_nom, angle_inc = impact_nom[0], impact_nom[1]
             all_x_max.append(x_contact_nom)
             p_base.tracer_trajectoire(ax, E_nominal, 0, x_contact_nom, color=color, label=label_base)
-            angle_inc = p_base.angle_incident(E_nominal)
             angle_deg = np.degrees(angle_inc) if angle_inc is not None else None
             texte_angles += f"\n{V:.0f} V : {angle_deg:.1f}°" if angle_deg is not None else f"\n{V:.0f} V : Contact?"
         else:
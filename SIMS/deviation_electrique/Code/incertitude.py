@@ -23,22 +23,24 @@ def calculer_xs(v0: float, theta: float, y0: float, q: float, m: float, E: float
 
     Returns
     -------
-    float
-        L'abscisse x (xs) où la particule atteint y=0 (en m)
+    float or numpy.ndarray
+        L'abscisse x (xs) où la particule atteint y=0 (en m).
+        Si les paramètres sont des tableaux, xs vaut NaN pour les particules sans contact.
 
     Raises
     ------
     ValueError
-        Si le discriminant est négatif (pas de contact avec l'axe y=0).
+        Si le discriminant est négatif (pas de contact avec l'axe y=0) pour un calcul scalaire.
     """
     A = v0 * np.cos(theta)
     B = 2 * y0 * q * E / m
     C = q * E / m
-    
+
     discriminant = A**2 - B
-    if discriminant < 0:
+    if np.ndim(discriminant) == 0 and discriminant < 0:
         raise ValueError("Le discriminant est négatif (A^2 < B), pas de solution réelle pour xs (pas de contact)")
-    D = np.sqrt(discriminant)
+    with np.errstate(invalid='ignore') :
+        D = np.sqrt(discriminant)
 
     xs = ((A - D) / C) * v0 * np.sin(theta)
     return xs
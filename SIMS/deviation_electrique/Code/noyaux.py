@@ -0,0 +1,172 @@
+import time
+import numpy as np
+import deviation
+
+# Numba est optionnel : sans lui on utilise la version numpy vectorisée
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ('numpy', 'numba')
+_backend = 'numba' if numba is not None else 'numpy'
+
+
+def choisir_backend(nom : str = 'auto') -> str :
+    """
+    Choisit le backend de calcul des noyaux
+
+    Parameters
+    ----------
+    nom : str
+        'numba', 'numpy' ou 'auto' (numba s'il est installé, numpy sinon)
+
+    Returns
+    -------
+    str
+        Nom du backend actif
+
+    Raises
+    ------
+    ValueError
+        Si le backend est inconnu ou si numba est demandé sans être installé
+    """
+    global _backend
+    if nom == 'auto' : nom = 'numba' if numba is not None else 'numpy'
+    if nom not in BACKENDS : raise ValueError(f"Backend inconnu : {nom} (choix : {', '.join(BACKENDS)}, auto)")
+    if nom == 'numba' and numba is None : raise ValueError("Le backend numba nécessite le paquet numba.")
+    _backend = nom
+    return _backend
+
+
+def backend_actif() -> str :
+    """
+    Returns
+    -------
+    str
+        Nom du backend actuellement utilisé par les noyaux
+    """
+    return _backend
+
+
+def _impacts_trajectoires_numpy(mq, v0, angle, hauteur, E, n_points) :
+    """Version numpy vectorisée (calculs sur tout le faisceau à la fois)"""
+    xs, angle_inc, _, _ = deviation.calculer_impacts(mq, v0, angle, hauteur, E)
+    vx = v0 * np.sin(angle)
+    A = v0 * np.cos(angle)
+    C = E / mq
+    x = xs[:, None] * np.linspace(0, 1, n_points)
+    X = x / vx[:, None]
+    y = (0.5 * C[:, None] * X - A[:, None]) * X + hauteur[:, None]
+    return xs, angle_inc, x, y
+
+
+if numba is not None :
+    @numba.njit(parallel=True, cache=True)
+    def _impacts_trajectoires_numba(mq, v0, angle, hauteur, E, n_points) :
+        """Version compilée : une seule boucle par ion, sans tableau intermédiaire"""
+        n = mq.shape[0]
+        xs = np.empty(n); angle_inc = np.empty(n)
+        x = np.empty((n, n_points)); y = np.empty((n, n_points))
+        for i in numba.prange(n) :
+            vx = v0[i] * np.sin(angle[i])
+            A = v0[i] * np.cos(angle[i])
+            C = E[i] / mq[i]
+            discriminant = A * A - 2 * hauteur[i] * C
+            if discriminant < 0 :
+                xs[i] = np.nan; angle_inc[i] = np.nan
+                for j in range(n_points) :
+                    x[i, j] = np.nan; y[i, j] = np.nan
+                continue
+            D = np.sqrt(discriminant)
+            xs[i] = 2 * hauteur[i] * vx / (A + D)
+            angle_inc[i] = np.arctan2(vx, D)
+            pas = xs[i] / (n_points - 1) if n_points > 1 else 0.0
+            for j in range(n_points) :
+                xj = j * pas
+                X = xj / vx
+                x[i, j] = xj
+                y[i, j] = (0.5 * C * X - A) * X + hauteur[i]
+        return xs, angle_inc, x, y
+
+
+def calculer_impacts_trajectoires(mq, v0, angle, hauteur, E, n_points : int = 1000, backend : str = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray] :
+    """
+    Calcule en une passe le point de contact, l'angle incident et la trajectoire échantillonnée
+    entre x = 0 et le point de contact pour chaque ion d'un faisceau (partie électrique)
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé de chaque ion (en kg/C)
+    v0 : float or array_like
+        Vitesse initiale (en m/s)
+    angle : float or array_like
+        Angle initial entre v0 et l'axe y (en radians)
+    hauteur : float or array_like
+        Hauteur initiale (en m)
+    E : float or array_like
+        Champ électrique dirigé selon y (en V/m)
+    n_points : int
+        Nombre de points de chaque trajectoire
+    backend : str
+        'numpy' ou 'numba' (par défaut le backend actif, voir choisir_backend)
+
+    Returns
+    -------
+    xs : numpy.ndarray
+        Abscisse du point de contact (en m), NaN si pas de contact
+    angle_incident : numpy.ndarray
+        Angle entre la trajectoire et l'axe y au point de contact (en radians), NaN si pas de contact
+    x : numpy.ndarray
+        Abscisses des trajectoires, de forme (nombre d'ions, n_points)
+    y : numpy.ndarray
+        Ordonnées des trajectoires, de forme (nombre d'ions, n_points)
+    """
+    backend = backend or _backend
+    if backend == 'numba' and numba is None : raise ValueError("Le backend numba nécessite le paquet numba.")
+    mq, v0, angle, hauteur, E = [np.ascontiguousarray(a, dtype=float).ravel() for a in np.broadcast_arrays(mq, v0, angle, hauteur, E)]
+    if backend == 'numba' :
+        return _impacts_trajectoires_numba(mq, v0, angle, hauteur, E, n_points)
+    return _impacts_trajectoires_numpy(mq, v0, angle, hauteur, E, n_points)
+
+
+'''
+Benchmark : méthodes de la classe particule (point_contact, angle_incident, trajectoire) contre les noyaux
+'''
+if __name__ == '__main__' :
+    import scipy.constants as constants
+
+    n_ions, n_points = 2000, 1000
+    masses = np.linspace(1, 200, n_ions)
+    v0, angle, hauteur, potentiel = 1e5, np.pi / 6, 0.05, -5000
+    E = deviation.champ_electrique_v2(hauteur, potentiel)
+
+    t0 = time.perf_counter()
+    for m in masses :
+        p = deviation.particule((m, 1), v0, angle, hauteur)
+        x_contact = p.point_contact(E)
+        p.angle_incident(E)
+        p.trajectoire(E, 0, x_contact, n_points)
+    t_reference = time.perf_counter() - t0
+    print(f"particule (boucle Python) : {t_reference:.3f} s")
+
+    mq = masses * constants.u / constants.e
+    t0 = time.perf_counter()
+    for m in masses :
+        p = deviation.particule((m, 1), v0, angle, hauteur)
+        p.point_contact(E); p.angle_incident(E)
+    t_contact = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    deviation.calculer_impacts(mq, v0, angle, hauteur, E)
+    print(f"point de contact + angle : particule {t_contact:.4f} s, calculer_impacts {time.perf_counter() - t0:.4f} s")
+
+    for nom in BACKENDS :
+        if nom == 'numba' and numba is None :
+            print("numba : non installé")
+            continue
+        calculer_impacts_trajectoires(mq[:2], v0, angle, hauteur, E, n_points, backend=nom) # Compilation éventuelle
+        t0 = time.perf_counter()
+        calculer_impacts_trajectoires(mq, v0, angle, hauteur, E, n_points, backend=nom)
+        t_noyau = time.perf_counter() - t0
+        print(f"{nom} : {t_noyau:.3f} s (x{t_reference / t_noyau:.1f})")
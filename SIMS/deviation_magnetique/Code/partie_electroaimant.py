@@ -1,16 +1,29 @@
 # Objectif 1
 
+import os, sys
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
 import numpy as np
 import scipy.constants as constants
 from scipy.optimize import fsolve
 
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_outils = os.path.join(folder, "outils", "Code")
+for pth in [path_outils]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+from traces import MODES_TRACE, choisir_mode_trace, tracer_resume, fractions_trajectoire # type: ignore
+import transfert # type: ignore
+from relativite import SEUIL_RELATIVISTE, facteur_lorentz # type: ignore
+
 class particule :
     def __init__(self, masse_charge : tuple[float, float], v_initiale : float) -> None :
         """
         Objet particule traversant un champ magnétique B // z.
-        Vitesse initiale supposée selon +y.
+        Vitesse initiale supposée selon +y. Le rapport masse/charge est signé : pour Bz > 0, un cation tourne vers +x
+        et un anion vers -x (rayon signé R = mq v0 / Bz).
 
         Parameters
         ----------
@@ -20,10 +33,9 @@ class particule :
             Vitesse initiale en y (m/s)
         """
         mass_u, charge_e = masse_charge
-        self.mq = (mass_u * constants.u) / (abs(charge_e) * constants.e) # (toujours positif)
+        self.mq = (mass_u * constants.u) / (charge_e * constants.e)
         self.vo = v_initiale
         self.m = mass_u
-        # Stocker la charge signée pour l'affichage
         self.charge_affichage = charge_e
 
     # Niveau 5 : L'equation de la trajectoire d'une particule en fonction de son rapport masse/charge et sa vitesse initiale
@@ -44,8 +56,27 @@ class particule :
             Position en y de la particule (m)
         """             
         with np.errstate(invalid='ignore') :
-            prefix = self.mq / Bz
-            return self.vo * prefix * np.sin(np.arccos(1 - x / (self.vo * prefix)))
+            rayon = self.mq * self.vo / Bz
+            return np.abs(rayon) * np.sin(np.arccos(1 - x / rayon))
+
+    def impact_detecteur(self, x_detecteur : float, Bz : float) -> tuple[float, float] :
+        """
+        Position en y et temps de vol de la particule lorsqu'elle atteint l'abscisse du détecteur
+
+        Parameters
+        ----------
+        x_detecteur : float
+            Abscisse du détecteur (m)
+        Bz : float
+            Valeur du champ magnétique d'axe z (en T)
+
+        Returns
+        -------
+        tuple of float
+            - Position en y au détecteur (m), NaN si pas de contact
+            - Temps de vol depuis l'origine (s), NaN si pas de contact
+        """
+        return calculer_impacts(self.mq, self.vo, Bz, x_detecteur)
 
     # Niveau 4 : Renvoie un tuple de la trajectoire de la particule (liste des abscisses, liste des ordonnées)
     def trajectoire(self, Bz : float, x_min : float, x_max : float, n_points : int = 10000) -> tuple[np.ndarray, np.ndarray] :
@@ -123,11 +154,288 @@ class particule :
             Champ magnétique (en T)
         """
         if B0 == None : B0 = self.mq
-        equation_func = lambda B : y_objective - (self.mq * self.vo / B) * np.sin(np.arccos(1 - x_objective * B / (self.vo * self.mq)))
+        equation_func = lambda B : y_objective - np.abs(self.mq * self.vo / B) * np.sin(np.arccos(1 - x_objective * B / (self.vo * self.mq)))
         return fsolve(equation_func, B0)[0]
 
+def vitesse_propre(v0, relativiste = False) :
+    """
+    Vitesse propre gamma v0 (en m/s), qui remplace v0 dans le rayon R = mq gamma v0 / Bz en mode relativiste
+    (la norme de la vitesse restant constante dans le champ magnétique, le mouvement reste circulaire uniforme).
+    Sans mode relativiste, v0 est renvoyé tel quel (aucun calcul supplémentaire).
+
+    Parameters
+    ----------
+    v0 : float or array_like
+        Vitesse (en m/s)
+    relativiste : bool or str
+        False (classique), True (relativiste pour tous les ions) ou 'auto' (relativiste au-delà de SEUIL_RELATIVISTE c)
+    """
+    if not relativiste : return v0
+    return facteur_lorentz(v0, relativiste) * v0
+
+
+def calculer_impacts(mq, v0, Bz, x_detecteur, relativiste = False) -> tuple :
+    """
+    Position en y et temps de vol à l'abscisse du détecteur (scalaires ou tableaux, diffusés entre eux).
+    La trajectoire est un arc de cercle de rayon signé R = mq v0 / Bz centré en (R, 0) (vers +x si qBz > 0, vers -x sinon) :
+    l'angle parcouru vaut phi = arccos(1 - x / R), d'où y = |R| sin(phi) et t = phi |R| / v0.
+    En mode relativiste, R = mq gamma v0 / Bz (voir vitesse_propre).
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé (en kg/C)
+    v0 : float or array_like
+        Vitesse initiale selon y (en m/s)
+    Bz : float or array_like
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float or array_like
+        Abscisse du détecteur (m)
+    relativiste : bool or str
+        Voir vitesse_propre
+
+    Returns
+    -------
+    y_detecteur : float or numpy.ndarray
+        Position en y au détecteur (m)
+    temps_vol : float or numpy.ndarray
+        Temps de vol depuis l'origine (s)
+    NaN pour les particules qui n'atteignent pas le détecteur
+    """
+    rayon = mq * vitesse_propre(v0, relativiste) / Bz
+    with np.errstate(invalid='ignore') :
+        phi = np.arccos(1 - x_detecteur / rayon)
+    return np.abs(rayon) * np.sin(phi), phi * np.abs(rayon) / v0
+
+
+def detecteur_du_cote(mq, Bz, x_detecteur) -> np.ndarray :
+    """
+    Abscisse du détecteur vers lequel chaque particule est déviée, avec deux détecteurs symétriques en +|x_detecteur|
+    et -|x_detecteur| : le côté est celui du signe du rayon R = mq v0 / Bz (cations et anions de part et d'autre de l'axe)
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé (en kg/C)
+    Bz : float or array_like
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float or array_like
+        Distance des détecteurs à l'axe (m)
+
+    Returns
+    -------
+    numpy.ndarray
+        Abscisse du détecteur de chaque particule (m)
+    """
+    return np.abs(x_detecteur) * np.sign(np.asarray(mq, dtype=float) * Bz)
+
+
+def positions_au_temps(mq, v0, Bz, x_detecteur, temps, relativiste = False) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Positions des particules aux instants donnés sur l'arc de rayon signé R = mq v0 / Bz : l'angle parcouru vaut phi = v0 t / |R|,
+    d'où x = R (1 - cos(phi)) et y = |R| sin(phi). Une particule s'arrête au détecteur, ou après un demi-tour (x = 2R, y = 0)
+    si elle ne l'atteint pas.
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé (en kg/C), un par particule
+    v0 : float or array_like
+        Vitesse initiale selon y (en m/s)
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    temps : array_like
+        Instants (en s)
+    relativiste : bool or str
+        Voir vitesse_propre
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Positions x et y (en m), de forme (nombre d'instants, nombre de particules)
+    """
+    mq, v0 = np.broadcast_arrays(np.atleast_1d(np.asarray(mq, dtype=float)), np.atleast_1d(np.asarray(v0, dtype=float)))
+    rayon = mq * vitesse_propre(v0, relativiste) / Bz
+    with np.errstate(invalid='ignore') :
+        phi_fin = np.arccos(1 - x_detecteur / rayon)
+    phi = np.minimum(v0 * np.asarray(temps, dtype=float)[:, None] / np.abs(rayon), np.where(np.isnan(phi_fin), np.pi, phi_fin))
+    return rayon * (1 - np.cos(phi)), np.abs(rayon) * np.sin(phi)
+
+
+def calculer_impacts_generaux(mq, v0, Bz, x_detecteur, x_entree = 0.0, angle_entree = 0.0, relativiste = False) -> tuple :
+    """
+    Généralisation exacte de calculer_impacts à un ion qui entre dans le champ en (x_entree, 0) avec une vitesse faisant
+    l'angle angle_entree avec l'axe y (positif vers +x). Sur le cercle de rayon signé R = mq v0 / Bz, de centre
+    (x_entree + R cos(angle_entree), -R sin(angle_entree)), la direction de la vitesse psi vérifie au détecteur
+    cos(psi) = (x_centre - x_detecteur) / R, d'où y = -R sin(angle_entree) + |R| sin(|psi|) et t = R (psi - angle_entree) / v0.
+
+    Parameters
+    ----------
+    mq, v0, Bz, x_detecteur : float or array_like
+        Voir calculer_impacts
+    x_entree : float or array_like
+        Abscisse d'entrée dans le champ (m)
+    angle_entree : float or array_like
+        Angle entre la vitesse d'entrée et l'axe y (en radians)
+    relativiste : bool or str
+        Voir vitesse_propre
+
+    Returns
+    -------
+    y_detecteur : float or numpy.ndarray
+        Position en y au détecteur (m)
+    angle_sortie : float or numpy.ndarray
+        Angle entre la vitesse au détecteur et l'axe y (en radians)
+    temps_vol : float or numpy.ndarray
+        Temps de vol depuis l'entrée (s)
+    NaN pour les particules qui n'atteignent pas le détecteur
+    """
+    rayon = mq * vitesse_propre(v0, relativiste) / Bz
+    with np.errstate(invalid='ignore') :
+        psi = np.sign(rayon) * np.arccos((x_entree + rayon * np.cos(angle_entree) - x_detecteur) / rayon)
+        arc = rayon * (psi - angle_entree)
+        psi = np.where(arc >= 0, psi, np.nan) # Le détecteur est derrière l'ion
+    return -rayon * np.sin(angle_entree) + np.abs(rayon * np.sin(psi)), psi, arc / v0
+
+
+def matrices_transfert(mq, v0, Bz, x_detecteur) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Matrices de transfert du premier et du second ordre de l'entrée du champ jusqu'au détecteur, autour de l'ion de
+    référence (entrée à l'origine selon +y). Variables de phase à l'entrée : écart d'abscisse (m), écart d'angle (rad),
+    écart relatif de m/q et écart relatif de vitesse ; à la sortie : écart de position y au détecteur (m), écart d'angle (rad)
+    et les deux écarts relatifs, conservés.
+
+    Parameters
+    ----------
+    mq : float
+        Rapport masse/charge de l'ion de référence (en kg/C)
+    v0 : float
+        Vitesse de l'ion de référence (en m/s)
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        R de forme (4, 4) et T de forme (4, 4, 4)
+    """
+    y_reference, angle_reference, _ = calculer_impacts_generaux(mq, v0, Bz, x_detecteur)
+    if not np.isfinite(y_reference) : raise ValueError("L'ion de référence n'atteint pas le détecteur.")
+
+    def application(X) :
+        y, angle, _ = calculer_impacts_generaux(mq * (1 + X[2]), v0 * (1 + X[3]), Bz, x_detecteur, X[0], X[1])
+        return np.stack((y - y_reference, angle - angle_reference))
+
+    return transfert.developper_carte(application, (1e-4 * abs(x_detecteur), 1e-4, 1e-4, 1e-4))
+
+
+def calculer_champ_magnetique(mq, v0, x_objectif, y_objectif) :
+    """
+    Champ magnétique pour dévier les particules en (x_objectif, y_objectif) depuis l'origine (version vectorisée
+    et sans fsolve de particule.determiner_champ_magnetique) : le cercle centré en (R, 0) passant par ce point
+    a pour rayon R = (x² + y²) / (2 x), d'où Bz = mq v0 / R.
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé (en kg/C), le champ obtenu est négatif pour un anion
+    v0 : float or array_like
+        Vitesse initiale selon y (en m/s)
+    x_objectif : float or array_like
+        Position en x voulue à l'état final (m)
+    y_objectif : float or array_like
+        Position en y voulue à l'état final (m)
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Champ magnétique (en T)
+    """
+    return 2 * x_objectif * mq * v0 / (np.square(x_objectif) + np.square(y_objectif))
+
+
+def calculer_faisceau(masses_u, charges_e, v0, Bz, x_detecteur, relativiste = False) -> dict :
+    """
+    Calcule pour tout un faisceau (calcul vectorisé) la position d'arrivée au détecteur,
+    le temps de vol et l'énergie cinétique à l'impact (conservée dans un champ magnétique)
+
+    Parameters
+    ----------
+    masses_u : float or array_like
+        Masses des ions (en u)
+    charges_e : float or array_like
+        Charges des ions (en nombre de charges élémentaires, signées : les anions tournent dans l'autre sens)
+    v0 : float or array_like
+        Vitesse initiale selon y (en m/s)
+    Bz : float or array_like
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float or array_like
+        Abscisse du détecteur (m)
+    relativiste : bool or str
+        Voir vitesse_propre (l'énergie vaut alors m c² (gamma - 1))
+
+    Returns
+    -------
+    dict of str -> numpy.ndarray
+        - 'y_detecteur' : position en y au détecteur (m)
+        - 'temps_vol' : temps de vol depuis l'origine (s)
+        - 'energie_impact' : énergie cinétique à l'impact (en eV)
+        NaN pour les ions qui n'atteignent pas le détecteur
+    """
+    masses_u = np.asarray(masses_u, dtype=float)
+    mq = (masses_u * constants.u) / (np.asarray(charges_e, dtype=float) * constants.e)
+    y_detecteur, temps_vol = calculer_impacts(mq, v0, Bz, x_detecteur, relativiste)
+    if relativiste :
+        u0 = vitesse_propre(v0, relativiste)
+        energie = masses_u * constants.u * np.square(u0) / (np.sqrt(1 + np.square(u0 / constants.c)) + 1) # m c² (gamma - 1)
+    else :
+        energie = 0.5 * masses_u * constants.u * np.square(v0)
+    energie_impact = np.where(np.isnan(y_detecteur), np.nan, energie / constants.e)
+    return {'y_detecteur' : y_detecteur, 'temps_vol' : temps_vol, 'energie_impact' : energie_impact}
+
+
+def calculer_faisceau_ions(faisceau, Bz, x_detecteur, relativiste = False) -> dict :
+    """
+    calculer_faisceau pour un faisceau_ions (sortie de l'émission ou de la colonne d'extraction) : chaque ion entre dans le
+    champ à son abscisse x avec sa direction dans le plan (voir calculer_impacts_generaux). Le rayon ne dépend que de la
+    vitesse dans le plan ; la composante vz, inchangée par un champ d'axe z, déplace le point d'impact selon z.
+
+    Parameters
+    ----------
+    faisceau : faisceau_ions
+        Faisceau à l'entrée du champ (positions x dans le repère de la partie magnétique)
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T), du signe voulu pour le sens de déviation
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    relativiste : bool or str
+        Voir vitesse_propre (gamma est celui de la vitesse totale ; l'énergie vaut alors m c² (gamma - 1))
+
+    Returns
+    -------
+    dict of str -> numpy.ndarray
+        - 'y_detecteur', 'z_detecteur' : position au détecteur (m)
+        - 'angle_sortie' : angle entre la vitesse au détecteur et l'axe y (en radians)
+        - 'temps_vol' : temps de vol depuis l'entrée (s)
+        - 'energie_impact' : énergie cinétique à l'impact (en eV)
+        NaN pour les ions qui n'atteignent pas le détecteur
+    """
+    vitesses = faisceau.vitesse
+    gamma = facteur_lorentz(vitesses, relativiste) if relativiste else 1.0
+    # gamma (de la vitesse totale) porté par mq : rayon gamma mq v_plan / Bz, temps de vol arc / v_plan
+    y_detecteur, angle_sortie, temps_vol = calculer_impacts_generaux(gamma * faisceau.mq, np.hypot(faisceau.vx, faisceau.vy), Bz, x_detecteur, faisceau.x, faisceau.angle)
+    atteint = np.isfinite(y_detecteur)
+    energie = faisceau.masses_u * constants.u * np.square(gamma * vitesses) / (gamma + 1) / constants.e # m v² / 2 si gamma = 1
+    return {'y_detecteur' : y_detecteur, 'z_detecteur' : np.where(atteint, faisceau.z + faisceau.vz * temps_vol, np.nan),
+            'angle_sortie' : angle_sortie, 'temps_vol' : temps_vol, 'energie_impact' : np.where(atteint, energie, np.nan)}
+
 # Niveau 2.2 : Tracer l'ensemble des trajectoires des particules d'un faisceau
-def tracer_ensemble_trajectoires(masses_charges_particules : list[tuple[float, float]], vitesse_initiale : float, Bz : float, x_detecteur : float, labels_particules: list[str] = None, create_plot : bool = True, ax = None) -> None:
+def tracer_ensemble_trajectoires(masses_charges_particules : list[tuple[float, float]], vitesse_initiale : float, Bz : float, x_detecteur : float, labels_particules: list[str] = None, create_plot : bool = True, ax = None, mode : str = 'auto', n_points_resume : int = 64,
+                                 detecteurs_symetriques : bool = False) -> None:
     """
     Trace les trajectoires entre 0 et x_detecteur pour un ensemble de particules d'un faisceau
 
@@ -147,26 +455,42 @@ def tracer_ensemble_trajectoires(masses_charges_particules : list[tuple[float, f
         True s'il faut que la fonction crée un plot et l'affiche, False sinon (et l'argument ax est nécéssaire)
     ax : matplotlib.axes.Axes
         Axe matplotlib sur lequel le tracé sera fait (uniquement si create_plot = False)
+    mode : str
+        Niveau de détail (voir choisir_mode_trace) : par défaut, au-delà de SEUIL_DETAIL particules, les trajectoires
+        sont résumées (LineCollection, densité ou impacts) sans légende par particule
+    n_points_resume : int
+        Nombre de points par trajectoire dans les modes résumés
+    detecteurs_symetriques : bool
+        True pour placer un détecteur de chaque côté de l'axe, en ±x_detecteur : chaque particule va vers celui de son côté
+        de déviation (voir detecteur_du_cote), ce qui permet de tracer ensemble cations et anions
     """
-    particules = [particule(masse_charge, vitesse_initiale) for masse_charge in masses_charges_particules]    # Liste d'objets particule représentant toutes les particules
     if ax == None or create_plot == True :
         fig, ax = plt.subplots()
+    mode = choisir_mode_trace(len(masses_charges_particules), mode)
+    if mode != 'detail' :
+        _tracer_ensemble_resume(masses_charges_particules, vitesse_initiale, Bz, x_detecteur, ax, mode, n_points_resume, detecteurs_symetriques)
+        if create_plot : plt.show()
+        return
+    particules = [particule(masse_charge, vitesse_initiale) for masse_charge in masses_charges_particules]    # Liste d'objets particule représentant toutes les particules
     
     all_y_contact = []
+    abscisses_detecteurs = set()
     labels = {}
     for i in range(len(particules)) :
         labels[particules[i]] = labels_particules[i] 
 
     for particule_locale in particules :
-        y_contact = particule_locale.equation_trajectoire(x_detecteur, Bz)
+        x_cible = float(detecteur_du_cote(particule_locale.mq, Bz, x_detecteur)) if detecteurs_symetriques else x_detecteur
+        abscisses_detecteurs.add(x_cible)
+        y_contact = particule_locale.equation_trajectoire(x_cible, Bz)
         all_y_contact.append(y_contact)
         if np.isnan(y_contact):
             labels[particule_locale] += ' ; Pas de contact'
-        particule_locale.tracer_trajectoire(ax, Bz, 0, x_detecteur, label=labels[particule_locale])
+        particule_locale.tracer_trajectoire(ax, Bz, 0, x_cible, label=labels[particule_locale])
     
     if np.all(np.isnan(all_y_contact)):
         all_y_contact = [0.07 * x_detecteur]
-    ax.plot([x_detecteur, x_detecteur], [ax.get_ybound()[0], ax.get_ybound()[1]], c='black', linewidth=5, label='Détecteur')
+    _tracer_detecteurs(ax, sorted(abscisses_detecteurs) or [x_detecteur])
     ax.set_xlabel('Position x (m)')
     ax.set_ylabel('Position y (m)')
     ax.set_title(f"Déviation magnétique dans un champ de {Bz:.3f} T")
@@ -176,6 +500,39 @@ def tracer_ensemble_trajectoires(masses_charges_particules : list[tuple[float, f
         plt.show()
 
 
+def _tracer_ensemble_resume(masses_charges_particules, vitesse_initiale, Bz, x_detecteur, ax, mode, n_points, detecteurs_symetriques = False) -> None :
+    """Modes résumés de tracer_ensemble_trajectoires : un seul calcul vectorisé et un nombre d'artistes fixe"""
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    mq = masses_charges[:, 0] * constants.u / (masses_charges[:, 1] * constants.e)
+    x_cibles = detecteur_du_cote(mq, Bz, x_detecteur) if detecteurs_symetriques else np.full(len(mq), float(x_detecteur))
+    y_detecteur, _ = calculer_impacts(mq, vitesse_initiale, Bz, x_cibles)
+    contact = np.isfinite(y_detecteur)
+
+    # Arcs jusqu'au détecteur, ou jusqu'au demi-tour (x = 2R) sans contact, du côté de x donné par le signe de R
+    rayon = mq * vitesse_initiale / Bz
+    x_fin = np.sign(rayon) * np.minimum(np.where(rayon * x_cibles > 0, np.abs(x_cibles), np.inf), np.abs(2 * rayon))
+    x = x_fin[:, None] * fractions_trajectoire(len(mq), n_points, mode)
+    y = np.sqrt(np.maximum(x * (2 * rayon[:, None] - x), 0)) # R sin(arccos(1 - x/R))
+    mq_u = masses_charges[:, 0] / np.abs(masses_charges[:, 1])
+    tracer_resume(ax, mq_u, x, y, contact, x_cibles[contact], y_detecteur[contact], mode, '_')
+
+    texte = f"{len(mq)} particules (mode {mode})\nContact : {np.sum(contact)} / {len(mq)}"
+    if np.any(contact) : texte += f"\ny détecteur : {np.min(y_detecteur[contact]):.4f} à {np.max(y_detecteur[contact]):.4f} m"
+    _tracer_detecteurs(ax, np.unique(x_cibles) if len(mq) else [x_detecteur])
+    ax.text(0.98, 0.02, texte, transform=ax.transAxes, fontsize=9, verticalalignment='bottom', horizontalalignment='right', bbox=dict(boxstyle="round", facecolor="white", alpha=0.7))
+    ax.set_xlabel('Position x (m)')
+    ax.set_ylabel('Position y (m)')
+    ax.set_title(f"Déviation magnétique dans un champ de {Bz:.3f} T")
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.legend(fontsize='small', loc='upper left')
+
+
+def _tracer_detecteurs(ax, abscisses) -> None :
+    """Trace un détecteur vertical à chaque abscisse donnée (une seule entrée de légende)"""
+    for i, x in enumerate(abscisses) :
+        ax.plot([x, x], [ax.get_ybound()[0], ax.get_ybound()[1]], c='black', linewidth=5, label='Détecteur' if i == 0 else '_')
+
+
 '''
 Test de la fonction tracer_ensemble_trajectoires (valeurs non représentatives)
 On trace les trajectoires de particules avec des (masses, charges) différentes dans un champ magnétique donné
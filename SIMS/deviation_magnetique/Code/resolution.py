@@ -0,0 +1,294 @@
+import numpy as np
+import scipy.constants as constants
+from scipy.optimize import minimize
+import partie_electroaimant
+
+FWHM_SUR_SIGMA = 2 * np.sqrt(2 * np.log(2)) # Largeur à mi-hauteur d'une gaussienne / écart-type
+
+
+def dispersion_detecteur(mq, v0, Bz, x_detecteur) -> tuple :
+    """
+    Position au détecteur et dispersion en masse dy/d(m/q) (calcul vectorisé).
+    Avec y² = 2 R x - x² et R = mq v0 / Bz : dy/d(m/q) = x v0 / (Bz y).
+
+    Parameters
+    ----------
+    mq : float or array_like
+        Rapport masse/charge signé (en kg/C)
+    v0 : float or array_like
+        Vitesse initiale selon y (en m/s)
+    Bz : float or array_like
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float or array_like
+        Abscisse du détecteur (m)
+
+    Returns
+    -------
+    y_detecteur : float or numpy.ndarray
+        Position en y au détecteur (m), NaN si pas de contact
+    dispersion : float or numpy.ndarray
+        dy/d(m/q) au détecteur (en m par kg/C)
+    """
+    y_detecteur, _ = partie_electroaimant.calculer_impacts(mq, v0, Bz, x_detecteur)
+    with np.errstate(divide='ignore', invalid='ignore') :
+        return y_detecteur, x_detecteur * v0 / (Bz * y_detecteur)
+
+
+def paires_chevauchantes(centres, largeurs) -> np.ndarray :
+    """
+    Cherche toutes les paires d'intervalles [centre - largeur/2, centre + largeur/2] qui se chevauchent.
+    Les intervalles sont triés une fois (O(n log n)) puis les paires sont générées sans boucle Python :
+    le nombre de paires trouvées pour l'intervalle i est donné par une recherche dichotomique.
+
+    Parameters
+    ----------
+    centres : array_like
+        Centres des intervalles (NaN pour les ignorer)
+    largeurs : array_like
+        Largeurs totales des intervalles
+
+    Returns
+    -------
+    numpy.ndarray of int
+        Tableau (nombre de paires, 2) des indices (i, j), i < j, des intervalles qui se chevauchent
+    """
+    centres, largeurs = np.broadcast_arrays(np.asarray(centres, dtype=float), np.asarray(largeurs, dtype=float))
+    valides = np.flatnonzero(np.isfinite(centres))
+    bas = centres[valides] - 0.5 * largeurs[valides]
+    haut = centres[valides] + 0.5 * largeurs[valides]
+    ordre = np.argsort(bas, kind='stable')
+    bas, haut, indices = bas[ordre], haut[ordre], valides[ordre]
+
+    # Pour l'intervalle k (trié par borne basse), les intervalles suivants qui le chevauchent sont k+1 ... fin[k]-1
+    fin = np.searchsorted(bas, haut, side='left')
+    nombre = np.maximum(fin - np.arange(len(bas)) - 1, 0)
+    premiers = np.repeat(np.arange(len(bas)), nombre)
+    decalages = np.arange(nombre.sum()) - np.repeat(np.cumsum(nombre) - nombre, nombre)
+    paires = np.stack([indices[premiers], indices[premiers + 1 + decalages]], axis=1)
+    return np.sort(paires, axis=1)
+
+
+def analyser_resolution(masses_charges_particules : list[tuple[float, float]], vitesse_initiale : float, Bz : float, x_detecteur : float,
+                        dispersion_energie : float = 0.0, largeur_faisceau : float = 0.0, ecarts_types_spot = None) -> dict :
+    """
+    Analyse la séparation des espèces au détecteur : dispersion en masse, largeur des spots,
+    pouvoir de résolution m/Δm et paires d'espèces dont les spots se chevauchent
+
+    La largeur d'un spot (écart-type) combine en quadrature la dispersion en énergie de la source
+    (σy = (x mq / (Bz y)) σv avec σv / v0 = σE / (2 E0)) et la largeur propre du faisceau.
+    La largeur à mi-hauteur (FWHM) est utilisée pour le pouvoir de résolution et les chevauchements.
+
+    Parameters
+    ----------
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce
+    vitesse_initiale : float
+        Vitesse initiale selon y (en m/s)
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    dispersion_energie : float
+        Ecart-type de l'énergie cinétique des ions à la source (en eV)
+    largeur_faisceau : float
+        Ecart-type de la largeur propre du faisceau au détecteur (en m)
+    ecarts_types_spot : array_like
+        Ecarts-types des spots mesurés (par exemple 'ecart_type' de source.simuler_spot_magnetique) ;
+        remplacent le modèle ci-dessus s'ils sont donnés
+
+    Returns
+    -------
+    dict
+        - 'mq' : rapport masse/charge (en u/e)
+        - 'y_detecteur' : position du centre du spot (m), NaN si pas de contact
+        - 'dispersion' : dy/d(m/q) (en m par u/e)
+        - 'largeur' : largeur à mi-hauteur du spot (m)
+        - 'pouvoir_resolution' : m/Δm
+        - 'paires_chevauchantes' : tableau (k, 2) des indices des espèces dont les spots se chevauchent
+        - 'separation_min' : plus petite distance entre deux centres de spots voisins (m)
+    """
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    masses_u, charges_e = masses_charges[:, 0], masses_charges[:, 1]
+    mq_ue = masses_u / charges_e
+    mq = mq_ue * constants.u / constants.e
+    y_detecteur, dispersion = dispersion_detecteur(mq, vitesse_initiale, Bz, x_detecteur)
+
+    if ecarts_types_spot is None :
+        energie = 0.5 * masses_u * constants.u * vitesse_initiale ** 2 / constants.e
+        ecart_vitesse = vitesse_initiale * dispersion_energie / (2 * energie)
+        with np.errstate(divide='ignore', invalid='ignore') :
+            ecart_energie = np.abs(x_detecteur * mq * ecart_vitesse / (Bz * y_detecteur))
+        ecarts_types_spot = np.sqrt(ecart_energie ** 2 + largeur_faisceau ** 2)
+    largeur = FWHM_SUR_SIGMA * np.asarray(ecarts_types_spot, dtype=float)
+
+    dispersion_ue = dispersion * constants.u / constants.e
+    with np.errstate(divide='ignore', invalid='ignore') :
+        pouvoir_resolution = np.abs(mq_ue * dispersion_ue) / largeur
+
+    y_tries = np.sort(y_detecteur[np.isfinite(y_detecteur)])
+    separation_min = np.min(np.diff(y_tries)) if len(y_tries) > 1 else np.nan
+    return {'mq' : mq_ue, 'y_detecteur' : y_detecteur, 'dispersion' : dispersion_ue, 'largeur' : largeur, 'pouvoir_resolution' : pouvoir_resolution,
+            'paires_chevauchantes' : paires_chevauchantes(y_detecteur, largeur), 'separation_min' : separation_min}
+
+
+def afficher_resolution(resultats : dict, labels_particules : list[str] = None) -> None :
+    """
+    Affiche le résultat de analyser_resolution
+
+    Parameters
+    ----------
+    resultats : dict
+        Résultat de analyser_resolution
+    labels_particules : list of str
+        Labels des espèces
+    """
+    n = len(resultats['mq'])
+    if labels_particules is None : labels_particules = [f"Particule {i+1}" for i in range(n)]
+    print(f"{'Espèce':>15} {'m/q (u/e)':>10} {'y (m)':>11} {'dy/d(m/q) (m)':>14} {'FWHM (m)':>10} {'m/Δm':>10}")
+    for i in range(n) :
+        print(f"{labels_particules[i]:>15} {resultats['mq'][i]:>10.3f} {resultats['y_detecteur'][i]:>11.4e} {resultats['dispersion'][i]:>14.3e} {resultats['largeur'][i]:>10.2e} {resultats['pouvoir_resolution'][i]:>10.1f}")
+    for i, j in resultats['paires_chevauchantes'] :
+        print(f"Chevauchement : {labels_particules[i]} / {labels_particules[j]}")
+
+
+def separation_minimale(masses_charges_particules : list[tuple[float, float]], Bz, v0, x_detecteur, y_min : float = 0.0, y_max : float = np.inf, dispersion_energie : float = 0.0,
+                        detecteurs_symetriques : bool = False) -> np.ndarray :
+    """
+    Plus petite distance entre les spots de deux espèces voisines au détecteur, évaluée pour
+    toute une grille de paramètres à la fois (Bz, v0 et x_detecteur sont diffusés entre eux).
+    Avec une dispersion en énergie, la demi-largeur à mi-hauteur de chaque spot est retranchée.
+    Avec deux détecteurs symétriques, seuls les spots d'un même détecteur sont comparés.
+
+    Parameters
+    ----------
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce
+    Bz, v0, x_detecteur : float or array_like
+        Champ magnétique (T), vitesse initiale (m/s) et abscisse du détecteur (m)
+    y_min, y_max : float
+        Etendue du détecteur en y (m) : tous les spots doivent y arriver
+    dispersion_energie : float
+        Ecart-type de l'énergie cinétique des ions à la source (en eV)
+    detecteurs_symetriques : bool
+        True pour un détecteur de chaque côté de l'axe, en ±x_detecteur (voir partie_electroaimant.detecteur_du_cote)
+
+    Returns
+    -------
+    numpy.ndarray
+        Séparation minimale (m) pour chaque jeu de paramètres, -inf si une espèce manque le détecteur
+        (inf si aucun détecteur ne reçoit deux espèces)
+    """
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    masses_u = masses_charges[:, 0]
+    mq = masses_u * constants.u / (masses_charges[:, 1] * constants.e)
+    Bz, v0, x_detecteur = [np.asarray(a, dtype=float)[..., None] for a in np.broadcast_arrays(Bz, v0, x_detecteur)]
+    if detecteurs_symetriques : x_detecteur = partie_electroaimant.detecteur_du_cote(mq, Bz, x_detecteur)
+
+    y_detecteur, _ = partie_electroaimant.calculer_impacts(mq, v0, Bz, x_detecteur)
+    atteint = np.all(np.isfinite(y_detecteur) & (y_detecteur >= y_min) & (y_detecteur <= y_max), axis=-1)
+    # Tri par détecteur puis par y : deux spots voisins sur des détecteurs différents ne se gênent pas
+    cotes = np.sign(np.broadcast_to(x_detecteur, y_detecteur.shape))
+    ordre = np.argsort(y_detecteur, axis=-1)
+    ordre = np.take_along_axis(ordre, np.argsort(np.take_along_axis(cotes, ordre, axis=-1), axis=-1, kind='stable'), axis=-1)
+    y_tries = np.take_along_axis(y_detecteur, ordre, axis=-1)
+    separation = np.where(np.diff(np.take_along_axis(cotes, ordre, axis=-1), axis=-1) == 0, np.diff(y_tries, axis=-1), np.inf)
+    if dispersion_energie > 0 :
+        # σy = x mq σv / (Bz y) avec σv = v0 σE / (2 E0) = σE / (m v0)
+        ecart_vitesse = dispersion_energie * constants.e / (masses_u * constants.u * v0)
+        with np.errstate(divide='ignore', invalid='ignore') :
+            demi_largeurs = 0.5 * FWHM_SUR_SIGMA * np.abs(x_detecteur * mq * ecart_vitesse / (Bz * y_detecteur))
+        demi_largeurs = np.take_along_axis(demi_largeurs, ordre, axis=-1)
+        separation = separation - demi_largeurs[..., 1:] - demi_largeurs[..., :-1]
+    if separation.shape[-1] == 0 : return np.where(atteint, np.inf, -np.inf)
+    return np.where(atteint, np.min(separation, axis=-1), -np.inf)
+
+
+def optimiser_separation(masses_charges_particules : list[tuple[float, float]], bornes_Bz : tuple[float, float], bornes_v0 : tuple[float, float],
+                         x_detecteur : float = None, bornes_x_detecteur : tuple[float, float] = None, y_min : float = 0.0, y_max : float = np.inf,
+                         dispersion_energie : float = 0.0, n_grille : int = 60, detecteurs_symetriques : bool = False) -> dict :
+    """
+    Cherche Bz, v0 (et éventuellement x_detecteur) maximisant la séparation minimale entre les spots
+    des espèces sur le détecteur : évaluation vectorisée sur une grille de candidats, puis
+    affinage local (Nelder-Mead borné) à partir du meilleur point de la grille.
+
+    Parameters
+    ----------
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) des espèces à séparer
+    bornes_Bz : tuple of float
+        (Bz min, Bz max) (T)
+    bornes_v0 : tuple of float
+        (v0 min, v0 max) (m/s)
+    x_detecteur : float
+        Abscisse du détecteur fixe (m), si bornes_x_detecteur n'est pas donné
+    bornes_x_detecteur : tuple of float
+        (x min, x max) (m) pour optimiser aussi la position du détecteur
+    y_min, y_max : float
+        Etendue du détecteur en y (m)
+    dispersion_energie : float
+        Ecart-type de l'énergie cinétique des ions à la source (en eV)
+    n_grille : int
+        Nombre de valeurs par paramètre dans la grille (la moitié pour x_detecteur)
+    detecteurs_symetriques : bool
+        Voir separation_minimale
+
+    Returns
+    -------
+    dict
+        'Bz' (T), 'v0' (m/s), 'x_detecteur' (m), 'separation_min' (m), 'y_detecteur' (m) et
+        'succes' (False si aucun candidat n'amène toutes les espèces sur le détecteur)
+    """
+    if x_detecteur is None and bornes_x_detecteur is None : raise ValueError("Donner x_detecteur ou bornes_x_detecteur.")
+    if len(masses_charges_particules) < 2 : raise ValueError("Il faut au moins deux espèces à séparer.")
+    bornes = [tuple(map(float, bornes_Bz)), tuple(map(float, bornes_v0))]
+    if bornes_x_detecteur is not None : bornes.append(tuple(map(float, bornes_x_detecteur)))
+    for bas, haut in bornes :
+        if not bas < haut : raise ValueError("Chaque borne max doit être supérieure à la borne min.")
+    bas, haut = np.array([b[0] for b in bornes]), np.array([b[1] for b in bornes])
+
+    def parametres(t) :
+        t = np.asarray(t)
+        forme = (-1,) + (1,) * (t.ndim - 1)
+        valeurs = bas.reshape(forme) + t * (haut - bas).reshape(forme)
+        return valeurs[0], valeurs[1], (valeurs[2] if len(valeurs) > 2 else x_detecteur)
+
+    # Grille de candidats (paramètres normalisés sur [0, 1])
+    axes = [np.linspace(0, 1, n_grille), np.linspace(0, 1, n_grille)]
+    if len(bornes) > 2 : axes.append(np.linspace(0, 1, max(n_grille // 2, 2)))
+    grille = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+    Bz, v0, x = parametres(grille.T)
+    objectif_grille = separation_minimale(masses_charges_particules, Bz, v0, x, y_min, y_max, dispersion_energie, detecteurs_symetriques)
+    meilleur = int(np.argmax(objectif_grille))
+
+    resultat = {'succes' : bool(objectif_grille[meilleur] > -np.inf)}
+    t_optimal = grille[meilleur]
+    if np.isfinite(objectif_grille[meilleur]) :
+        def cout(t) :
+            valeur = separation_minimale(masses_charges_particules, *parametres(t), y_min, y_max, dispersion_energie, detecteurs_symetriques)
+            return -float(valeur) if np.isfinite(valeur) else 1e30
+        affinage = minimize(cout, t_optimal, method='Nelder-Mead', bounds=[(0, 1)] * len(axes), options={'xatol' : 1e-6, 'fatol' : 1e-12})
+        if affinage.fun <= -objectif_grille[meilleur] : t_optimal = affinage.x
+
+    Bz, v0, x = parametres(t_optimal)
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    mq = masses_charges[:, 0] * constants.u / (masses_charges[:, 1] * constants.e)
+    resultat.update({'Bz' : float(Bz), 'v0' : float(v0), 'x_detecteur' : float(x),
+                     'separation_min' : float(separation_minimale(masses_charges_particules, Bz, v0, x, y_min, y_max, dispersion_energie, detecteurs_symetriques)),
+                     'y_detecteur' : partie_electroaimant.calculer_impacts(mq, v0, Bz, partie_electroaimant.detecteur_du_cote(mq, Bz, x) if detecteurs_symetriques else x)[0]})
+    return resultat
+
+
+'''
+Test : résolution entre isotopes du silicium et chevauchement avec N2+ / CO+
+'''
+if __name__ == '__main__' :
+    particules = [(27.977, 1), (28.976, 1), (29.974, 1), (28.006, 1), (27.995, 1)]
+    labels = ['28Si+', '29Si+', '30Si+', 'N2+', 'CO+']
+    resultats = analyser_resolution(particules, 1e5, 0.2, 0.05, dispersion_energie=0.5)
+    afficher_resolution(resultats, labels)
+
+    import time
+    t0 = time.perf_counter()
+    optimum = optimiser_separation(particules, (0.01, 0.5), (1e5, 1e6), bornes_x_detecteur=(0.02, 0.1), y_max=0.15, dispersion_energie=0.5)
+    print(f"Optimum en {time.perf_counter() - t0:.2f} s : Bz = {optimum['Bz']:.4f} T, v0 = {optimum['v0']:.3e} m/s, "
+          f"x détecteur = {optimum['x_detecteur']:.4f} m, séparation min = {optimum['separation_min']:.2e} m")
@@ -0,0 +1,297 @@
+import os, sys
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+path_faisceau = os.path.join(folder, "faisceau", "Code")
+for pth in [path_partie_bleue, path_partie_verte, path_faisceau]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation # type: ignore
+import partie_electroaimant # type: ignore
+from ions import faisceau_ions # type: ignore
+
+
+LOIS_ENERGIE = ('thompson', 'maxwell_boltzmann', 'fixe')
+
+
+class modele_emission :
+    def __init__(self, especes : list[tuple[float, float]], probabilites : list[float] = None, rendement : float = 0.1,
+                 energie_reference : float = 1000.0, exposant_energie : float = 0.0, exposant_angle : float = 1.66, angle_max : float = np.radians(80),
+                 loi_energie : str = 'thompson', energie_liaison : float = 3.0, temperature : float = 1.0, energie_emission : float = 5.0,
+                 exposant_cosinus : float = 1.0) -> None :
+        """
+        Modèle d'émission d'ions secondaires par l'échantillon sous l'impact des ions primaires (partie rose du SIMS)
+
+        Parameters
+        ----------
+        especes : list of tuple of float
+            Masse (en u), Charge (en e) des ions secondaires possibles
+        probabilites : list of float
+            Probabilité relative de chaque espèce (abondance x probabilité d'ionisation), uniforme par défaut
+        rendement : float
+            Nombre moyen d'ions secondaires par ion primaire en incidence normale, à l'énergie de référence
+        energie_reference : float
+            Energie primaire de référence du rendement (en eV)
+        exposant_energie : float
+            Le rendement varie comme (E / energie_reference) ** exposant_energie
+        exposant_angle : float
+            Le rendement varie comme 1 / cos(angle_incident) ** exposant_angle
+        angle_max : float
+            Angle incident au-delà duquel le rendement n'augmente plus (en radians)
+        loi_energie : str
+            'thompson' (cascade de collisions, f(E) ∝ E / (E + U)³), 'maxwell_boltzmann' (f(E) ∝ E exp(-E / kT)) ou 'fixe'
+        energie_liaison : float
+            Energie de liaison de surface U (en eV), loi 'thompson'
+        temperature : float
+            Température kT (en eV), loi 'maxwell_boltzmann'
+        energie_emission : float
+            Energie des ions secondaires (en eV), loi 'fixe'
+        exposant_cosinus : float
+            Distribution angulaire en cos(θ) ** exposant_cosinus par angle solide autour de la normale (1 : loi de Lambert)
+        """
+        if len(especes) == 0 : raise ValueError("Au moins une espèce secondaire est nécessaire.")
+        if loi_energie not in LOIS_ENERGIE : raise ValueError(f"Loi d'énergie inconnue : {loi_energie}")
+        if min(rendement, energie_liaison, temperature, energie_emission) < 0 or energie_reference <= 0 : raise ValueError("Les paramètres d'émission doivent être positifs.")
+        if exposant_cosinus <= -1 : raise ValueError("L'exposant de la loi en cosinus doit être > -1.")
+        self.especes = np.asarray(especes, dtype=float).reshape(-1, 2)
+        if np.any(self.especes[:, 0] <= 0) or np.any(self.especes[:, 1] == 0) : raise ValueError("Masses > 0 et charges != 0 requises.")
+        probabilites = np.ones(len(self.especes)) if probabilites is None else np.asarray(probabilites, dtype=float)
+        if probabilites.shape != (len(self.especes),) or np.any(probabilites < 0) or probabilites.sum() <= 0 :
+            raise ValueError("Les probabilités doivent être positives, une par espèce.")
+        self.probabilites = probabilites / probabilites.sum()
+        self.rendement = rendement
+        self.energie_reference = energie_reference
+        self.exposant_energie = exposant_energie
+        self.exposant_angle = exposant_angle
+        self.angle_max = angle_max
+        self.loi_energie = loi_energie
+        self.energie_liaison = energie_liaison
+        self.temperature = temperature
+        self.energie_emission = energie_emission
+        self.exposant_cosinus = exposant_cosinus
+
+    def rendements(self, angle_incident, energie_impact) -> np.ndarray :
+        """
+        Nombre moyen d'ions secondaires par ion primaire (0 pour les primaires sans contact)
+
+        Parameters
+        ----------
+        angle_incident : array_like
+            Angle entre la trajectoire primaire et la normale à l'échantillon (en radians)
+        energie_impact : array_like
+            Energie des ions primaires à l'impact (en eV)
+
+        Returns
+        -------
+        numpy.ndarray
+            Rendement de chaque ion primaire
+        """
+        angle = np.minimum(np.abs(np.asarray(angle_incident, dtype=float)), self.angle_max)
+        with np.errstate(invalid='ignore') :
+            rendements = self.rendement * (np.asarray(energie_impact, dtype=float) / self.energie_reference) ** self.exposant_energie / np.cos(angle) ** self.exposant_angle
+        return np.where(np.isfinite(rendements), rendements, 0.0)
+
+    def tirer_energies(self, energies_max : np.ndarray, rng : np.random.Generator) -> np.ndarray :
+        """
+        Tire l'énergie d'émission de chaque ion secondaire, bornée par l'énergie maximale transmise par le primaire
+
+        Parameters
+        ----------
+        energies_max : numpy.ndarray
+            Energie maximale de chaque ion secondaire (en eV)
+        rng : numpy.random.Generator
+            Générateur aléatoire
+
+        Returns
+        -------
+        numpy.ndarray
+            Energies (en eV)
+        """
+        if self.loi_energie == 'fixe' : return np.minimum(self.energie_emission, energies_max)
+        if self.loi_energie == 'thompson' :
+            # Fonction de répartition F(E) = E² / (E + U)² : tirage inverse restreint à [0, F(E_max)]
+            U = self.energie_liaison
+            racine = np.sqrt(rng.random(energies_max.shape)) * energies_max / (energies_max + U)
+            return U * racine / (1 - racine)
+        # Maxwell-Boltzmann du flux émis : loi Gamma(2, kT), tronquée par rejet (rare pour kT << E_max)
+        energies = rng.gamma(2.0, self.temperature, energies_max.shape)
+        for _ in range(20) :
+            trop_grandes = energies > energies_max
+            if not np.any(trop_grandes) : break
+            energies[trop_grandes] = rng.gamma(2.0, self.temperature, np.count_nonzero(trop_grandes))
+        return np.minimum(energies, energies_max)
+
+    def tirer_directions(self, n : int, rng : np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray] :
+        """
+        Tire les directions d'émission (loi en cos(θ) ** n autour de la normale +y, azimut uniforme)
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            Composantes x, y, z du vecteur unitaire de chaque direction
+        """
+        cos_theta = rng.random(n) ** (1 / (self.exposant_cosinus + 1))
+        sin_theta = np.sqrt(1 - cos_theta * cos_theta)
+        azimut = rng.uniform(0, 2 * np.pi, n)
+        return sin_theta * np.cos(azimut), cos_theta, sin_theta * np.sin(azimut)
+
+    def emettre(self, x_impact, angle_incident, energie_impact, masses_primaires_u, temps_impact = 0.0, rng : np.random.Generator = None,
+                x_axe : float = 0.0) -> faisceau_ions :
+        """
+        Tire les ions secondaires émis par un lot d'ions primaires : nombre (loi de Poisson de moyenne rendements()),
+        espèce, énergie (bornée par l'énergie maximale transférable en un choc, 4 m1 m2 / (m1 + m2)² E0) et direction
+
+        Parameters
+        ----------
+        x_impact : array_like
+            Point de contact de chaque primaire sur l'échantillon (m), NaN sans contact
+        angle_incident : array_like
+            Angle incident de chaque primaire avec la normale (en radians)
+        energie_impact : array_like
+            Energie de chaque primaire à l'impact (en eV)
+        masses_primaires_u : array_like
+            Masse de chaque primaire (en u)
+        temps_impact : array_like
+            Date de chaque impact (s), reportée sur les secondaires
+        rng : numpy.random.Generator
+            Générateur aléatoire (un nouveau générateur par défaut)
+        x_axe : float
+            Abscisse de l'axe du faisceau secondaire sur l'échantillon (m) : les positions x des secondaires sont prises par
+            rapport à cet axe (repère d'entrée de la colonne d'extraction ou de la partie magnétique)
+
+        Returns
+        -------
+        faisceau_ions
+            Ions secondaires, partant de l'échantillon (y = 0), x mesuré depuis x_axe
+        """
+        rng = rng or np.random.default_rng()
+        x_impact, angle_incident, energie_impact, masses_primaires_u, temps_impact = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (x_impact, angle_incident, energie_impact, masses_primaires_u, temps_impact)))
+        contact = np.isfinite(x_impact) & np.isfinite(energie_impact)
+        nombres = rng.poisson(np.where(contact, self.rendements(angle_incident, energie_impact), 0.0))
+        primaires = np.repeat(np.arange(len(nombres)), nombres) # Primaire à l'origine de chaque secondaire
+        n = len(primaires)
+
+        especes = np.searchsorted(np.cumsum(self.probabilites), rng.random(n), side='right').clip(0, len(self.especes) - 1)
+        masses_u, charges_e = self.especes[especes, 0], self.especes[especes, 1]
+        m1 = masses_primaires_u[primaires]
+        transfert_max = 4 * m1 * masses_u / np.square(m1 + masses_u) * energie_impact[primaires]
+        vitesses = np.sqrt(2 * self.tirer_energies(transfert_max, rng) * constants.e / (masses_u * constants.u))
+        ux, uy, uz = self.tirer_directions(n, rng)
+        return faisceau_ions(masses_u, charges_e, x_impact[primaires] - x_axe, 0.0, vitesses * ux, vitesses * uy, 0.0, vitesses * uz, temps_impact[primaires])
+
+
+def iterer_emission(source, masses_charges_primaires : list[tuple[float, float]], potentiel : float, modele : modele_emission, n_primaires : int = 1_000_000,
+                    proportions : list[float] = None, taille_lot : int = 1_000_000, graine : int = None, x_axe : float = None) :
+    """
+    Enchaîne la partie électrique (faisceau primaire tiré depuis la source) et l'émission secondaire, lot par lot
+
+    Parameters
+    ----------
+    source : source.source_ions
+        Source du faisceau primaire
+    masses_charges_primaires : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce primaire
+    potentiel : float
+        Différence de potentiel entre les plaques (en V), la distance entre plaques étant la hauteur nominale
+    modele : modele_emission
+        Modèle d'émission de l'échantillon
+    n_primaires : int
+        Nombre total d'ions primaires
+    proportions : list of float
+        Proportion de chaque espèce primaire (uniforme par défaut)
+    taille_lot : int
+        Nombre d'ions primaires calculés à la fois
+    graine : int
+        Graine du générateur aléatoire
+    x_axe : float
+        Abscisse de l'axe du faisceau secondaire (m), voir modele_emission.emettre. Par défaut le point de contact de l'ion
+        primaire de référence (première espèce, vitesse, angle et hauteur nominaux de la source) : le faisceau secondaire
+        peut alors entrer tel quel dans la partie magnétique (partie_electroaimant.calculer_faisceau_ions)
+
+    Yields
+    ------
+    faisceau_ions
+        Ions secondaires émis par chaque lot
+    """
+    rng = np.random.default_rng(graine)
+    primaires = np.asarray(masses_charges_primaires, dtype=float).reshape(-1, 2)
+    proportions = np.ones(len(primaires)) if proportions is None else np.asarray(proportions, dtype=float)
+    E = deviation.champ_electrique_v2(source.height, potentiel)
+    if x_axe is None :
+        mq_reference = primaires[0, 0] * constants.u / (primaires[0, 1] * constants.e)
+        x_axe = float(deviation.calculer_impacts(mq_reference, source.vo, source.angle, source.height, E)[0])
+        if not np.isfinite(x_axe) : raise ValueError("L'ion primaire de référence ne touche pas l'échantillon : préciser x_axe.")
+    for debut in range(0, n_primaires, taille_lot) :
+        n = min(taille_lot, n_primaires - debut)
+        especes = rng.choice(len(primaires), n, p=proportions / proportions.sum())
+        masses_u, charges_e = primaires[especes, 0], primaires[especes, 1]
+        v0, angles, hauteurs = source.echantillonner(masses_u, rng)
+        angles = np.where((angles > 0) & (angles < np.pi / 2) & (hauteurs > 0), angles, np.nan)
+        impacts = deviation.calculer_faisceau(masses_u, charges_e, v0, angles, hauteurs, E)
+        yield modele.emettre(impacts['xs'], impacts['angle_incident'], impacts['energie_impact'], masses_u, impacts['temps_vol'], rng, x_axe)
+
+
+def simuler_emission(*args, **kwargs) -> faisceau_ions :
+    """Tous les ions secondaires émis (voir iterer_emission pour les paramètres)"""
+    return faisceau_ions.concatener(list(iterer_emission(*args, **kwargs)))
+
+
+def tracer_emission(secondaires : faisceau_ions, n_bins : int = 100, create_plot : bool = True, axes = None) -> None :
+    """
+    Trace la distribution en énergie et en angle d'émission (dans le plan) des ions secondaires, par espèce
+
+    Parameters
+    ----------
+    secondaires : faisceau_ions
+        Ions secondaires
+    n_bins : int
+        Nombre d'intervalles des histogrammes
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (axes est alors nécessaire)
+    axes : tuple of matplotlib.axes.Axes
+        Deux axes (énergie, angle), uniquement si create_plot = False
+    """
+    if create_plot or axes is None : fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    especes, indices = secondaires.especes()
+    energies, angles = secondaires.energie, np.degrees(secondaires.angle)
+    bords_energie = np.linspace(0, np.percentile(energies, 99) if len(energies) else 1, n_bins + 1)
+    bords_angle = np.linspace(-90, 90, n_bins + 1)
+    colors = plt.cm.viridis(np.linspace(0, 1, max(len(especes), 1)))
+    for i, (m, q) in enumerate(especes) :
+        label = f"{m:g} u, {q:+g} e ({np.count_nonzero(indices == i)} ions)"
+        axes[0].hist(energies[indices == i], bins=bords_energie, histtype='step', color=colors[i], label=label)
+        axes[1].hist(angles[indices == i], bins=bords_angle, histtype='step', color=colors[i], label=label)
+    axes[0].set_xlabel("Energie d'émission (eV)")
+    axes[1].set_xlabel("Angle d'émission dans le plan (° vs normale)")
+    for ax in axes :
+        ax.set_ylabel("Nombre d'ions")
+        ax.grid(True, linestyle='--', alpha=0.6)
+        if len(especes) : ax.legend(fontsize='small')
+    if create_plot : plt.show()
+
+
+'''
+Exemple : 10^6 ions O+ primaires sur un échantillon de silicium, ions secondaires Si+ et SiO+ envoyés dans la partie magnétique
+(positions x mesurées depuis le point de contact de l'ion O+ de référence, sur l'axe d'entrée du champ)
+'''
+if __name__ == '__main__' :
+    import time
+    import source # type: ignore
+
+    primaire = source.source_ions(2e5, np.pi / 6, 0.05, loi_vitesse='gaussienne', dispersion_energie=10)
+    modele = modele_emission([(28, 1), (44, 1)], probabilites=[0.8, 0.2], rendement=0.5, loi_energie='thompson', energie_liaison=4.7)
+    t0 = time.perf_counter()
+    secondaires = simuler_emission(primaire, [(16, 1)], -5000, modele, n_primaires=1_000_000, graine=0)
+    print(f"Emission : {time.perf_counter() - t0:.2f} s, {len(secondaires)} ions secondaires, énergie moyenne {secondaires.energie.mean():.2f} eV")
+
+    t0 = time.perf_counter()
+    impacts = partie_electroaimant.calculer_faisceau_ions(secondaires, 0.05, 0.05)
+    print(f"Partie magnétique : {time.perf_counter() - t0:.3f} s, {np.count_nonzero(np.isfinite(impacts['y_detecteur']))} ions au détecteur")
+    tracer_emission(secondaires)
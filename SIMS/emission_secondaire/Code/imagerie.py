@@ -0,0 +1,225 @@
+import os, sys, time
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+from scipy.ndimage import gaussian_filter
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+for pth in [path_partie_bleue]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation # type: ignore
+
+
+class balayage :
+    def __init__(self, masse_charge_primaire : tuple[float, float], vitesse_initiale : float, angle_initial : float, hauteur_initiale : float,
+                 potentiels, angles_hors_plan, lignes_par_bloc : int = 64) -> None :
+        """
+        Balayage (raster) du faisceau primaire sur l'échantillon : le potentiel entre les plaques déplace le point de contact
+        selon x (balayage rapide, une valeur par colonne) et un angle hors du plan déplace le point de contact selon z
+        (balayage lent, une valeur par ligne) : z = v0 sin(phi) t, avec une vitesse dans le plan v0 cos(phi).
+        Les points de contact sont calculés par blocs de lignes avec deviation.calculer_impacts.
+
+        Parameters
+        ----------
+        masse_charge_primaire : tuple of float
+            Masse (en u), Charge (en e) des ions primaires
+        vitesse_initiale : float
+            Vitesse initiale (en m/s)
+        angle_initial : float
+            Angle initial dans le plan entre v0 et l'axe y (en radians)
+        hauteur_initiale : float
+            Hauteur initiale, égale à la distance entre les plaques (en m)
+        potentiels : array_like
+            Potentiel de chaque colonne (en V)
+        angles_hors_plan : array_like
+            Angle hors du plan de chaque ligne (en radians)
+        lignes_par_bloc : int
+            Nombre de lignes calculées à la fois
+        """
+        self.mq = masse_charge_primaire[0] * constants.u / (masse_charge_primaire[1] * constants.e)
+        self.charge_e = masse_charge_primaire[1]
+        self.vo = vitesse_initiale
+        self.angle = angle_initial
+        self.height = hauteur_initiale
+        self.potentiels = np.asarray(potentiels, dtype=float)
+        self.angles_hors_plan = np.asarray(angles_hors_plan, dtype=float)
+        self.lignes_par_bloc = int(lignes_par_bloc)
+
+    @classmethod
+    def regulier(cls, masse_charge_primaire : tuple[float, float], vitesse_initiale : float, angle_initial : float, hauteur_initiale : float,
+                 x_min : float, x_max : float, z_min : float, z_max : float, n_x : int = 1024, n_z : int = 1024, lignes_par_bloc : int = 64) -> 'balayage' :
+        """
+        Balayage dont la ligne centrale couvre [x_min, x_max] à pas constant (potentiels calculés par
+        deviation.calculer_potentiel_pour_impact) et dont la colonne centrale couvre [z_min, z_max] (tan(phi) = z sin(angle) / x)
+
+        Returns
+        -------
+        balayage
+            Balayage de n_z lignes et n_x colonnes
+        """
+        positions_x = np.linspace(x_min, x_max, n_x)
+        potentiels = deviation.calculer_potentiel_pour_impact(masse_charge_primaire[0], masse_charge_primaire[1], vitesse_initiale,
+                                                              angle_initial, hauteur_initiale, positions_x)
+        if np.any(np.isnan(potentiels)) : raise ValueError("Une partie de [x_min, x_max] n'est pas atteignable.")
+        angles_hors_plan = np.arctan(np.linspace(z_min, z_max, n_z) * np.sin(angle_initial) / (0.5 * (x_min + x_max)))
+        return cls(masse_charge_primaire, vitesse_initiale, angle_initial, hauteur_initiale, potentiels, angles_hors_plan, lignes_par_bloc)
+
+    @property
+    def forme(self) -> tuple[int, int] :
+        return len(self.angles_hors_plan), len(self.potentiels)
+
+    def iterer_blocs(self) :
+        """
+        Points de contact bloc de lignes par bloc de lignes (mémoire indépendante de la taille du balayage)
+
+        Yields
+        ------
+        tuple
+            Première ligne du bloc, x et z des points de contact (lignes du bloc, n_x) en m (NaN sans contact)
+        """
+        E = deviation.champ_electrique_v2(self.height, self.potentiels)[None, :]
+        for debut in range(0, self.forme[0], self.lignes_par_bloc) :
+            phi = self.angles_hors_plan[debut:debut + self.lignes_par_bloc, None]
+            xs, _, temps_vol, _ = deviation.calculer_impacts(self.mq, self.vo * np.cos(phi), self.angle, self.height, E)
+            yield debut, xs, self.vo * np.sin(phi) * temps_vol
+
+
+class carte_echantillon :
+    def __init__(self, concentrations : np.ndarray, etendue : tuple[float, float, float, float]) -> None :
+        """
+        Composition de la surface de l'échantillon, pixel par pixel
+
+        Parameters
+        ----------
+        concentrations : numpy.ndarray
+            Fraction atomique de chaque espèce, de forme (n_especes, n_z, n_x)
+        etendue : tuple of float
+            (x_min, x_max, z_min, z_max) de la carte (m)
+        """
+        self.concentrations = np.asarray(concentrations, dtype=float)
+        if self.concentrations.ndim != 3 : raise ValueError("Les concentrations doivent être de forme (n_especes, n_z, n_x).")
+        self.etendue = tuple(float(e) for e in etendue)
+
+    def flouter(self, ecart_type_x : float, ecart_type_z : float) -> 'carte_echantillon' :
+        """
+        Carte vue par un faisceau primaire de taille finie : convolution par le spot gaussien (une seule fois, avant le balayage)
+
+        Parameters
+        ----------
+        ecart_type_x, ecart_type_z : float
+            Ecarts-types du spot selon x et z (m), par exemple simuler_spot_electrique(...)['ecart_type']
+        """
+        x_min, x_max, z_min, z_max = self.etendue
+        n_z, n_x = self.concentrations.shape[1:]
+        sigma = (0, ecart_type_z * n_z / (z_max - z_min), ecart_type_x * n_x / (x_max - x_min))
+        return carte_echantillon(gaussian_filter(self.concentrations, sigma, mode='nearest'), self.etendue)
+
+    def echantillonner(self, x : np.ndarray, z : np.ndarray) -> np.ndarray :
+        """
+        Concentrations aux points donnés (pixel le plus proche), 0 hors de la carte
+
+        Returns
+        -------
+        numpy.ndarray
+            Concentrations de forme (n_especes, *x.shape)
+        """
+        x_min, x_max, z_min, z_max = self.etendue
+        n_z, n_x = self.concentrations.shape[1:]
+        with np.errstate(invalid='ignore') :
+            i = np.floor((x - x_min) * (n_x / (x_max - x_min)))
+            j = np.floor((z - z_min) * (n_z / (z_max - z_min)))
+            dedans = (i >= 0) & (i < n_x) & (j >= 0) & (j < n_z)
+        indices = np.where(dedans, j * n_x + i, 0).astype(np.intp)
+        return np.where(dedans, self.concentrations.reshape(len(self.concentrations), -1)[:, indices], 0.0)
+
+
+def imager(trame : balayage, carte : carte_echantillon, courant : float, temps_pixel : float, rendements_utiles, bruit : bool = True,
+           graine : int = None) -> np.ndarray :
+    """
+    Image en ions secondaires : pour chaque position du balayage, coups de chaque espèce émis au point de contact réel,
+    rangés au pixel (ligne, colonne) du balayage. Les distorsions du balayage (déplacement de x avec l'angle hors du plan)
+    apparaissent donc dans l'image.
+
+    Parameters
+    ----------
+    trame : balayage
+        Balayage du faisceau primaire
+    carte : carte_echantillon
+        Composition de la surface (déjà floutée par le spot si besoin)
+    courant : float
+        Courant primaire (A)
+    temps_pixel : float
+        Durée passée sur chaque position (s)
+    rendements_utiles : array_like
+        Ions détectés de chaque espèce par ion primaire et par unité de concentration
+        (rendement de pulvérisation x probabilité d'ionisation x transmission x efficacité de détection)
+    bruit : bool
+        True pour tirer les coups (loi de Poisson), False pour les valeurs moyennes
+    graine : int
+        Graine du générateur aléatoire
+
+    Returns
+    -------
+    numpy.ndarray
+        Coups de forme (n_especes, n_z, n_x) (float32)
+    """
+    rng = np.random.default_rng(graine)
+    primaires_par_pixel = courant * temps_pixel / (abs(trame.charge_e) * constants.e)
+    facteurs = primaires_par_pixel * np.asarray(rendements_utiles, dtype=float)[:, None, None]
+    image = np.empty((len(carte.concentrations),) + trame.forme, dtype=np.float32)
+    for debut, x, z in trame.iterer_blocs() :
+        moyennes = carte.echantillonner(x, z) * facteurs
+        image[:, debut:debut + len(x)] = rng.poisson(moyennes) if bruit else moyennes
+    return image
+
+
+def tracer_image(image : np.ndarray, trame : balayage, labels_especes : list[str] = None, create_plot : bool = True, axes = None) -> None :
+    """
+    Trace l'image de chaque espèce en fonction de la position nominale du balayage (ligne et colonne)
+
+    Parameters
+    ----------
+    image : numpy.ndarray
+        Résultat de imager
+    trame : balayage
+        Balayage ayant produit l'image
+    labels_especes : list of str
+        Nom de chaque espèce
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (axes est alors nécessaire)
+    axes : list of matplotlib.axes.Axes
+        Un axe par espèce (uniquement si create_plot = False)
+    """
+    if create_plot or axes is None :
+        fig, axes = plt.subplots(1, len(image), figsize=(5 * len(image), 5), squeeze=False)
+        axes = axes[0]
+    for i, ax in enumerate(axes) :
+        artiste = ax.imshow(image[i], origin='lower', cmap='inferno', interpolation='nearest')
+        ax.figure.colorbar(artiste, ax=ax, shrink=0.8, label="Coups")
+        ax.set_title(labels_especes[i] if labels_especes is not None else f"Espèce {i + 1}")
+        ax.set_xlabel("Colonne (potentiel)")
+        ax.set_ylabel("Ligne (angle hors du plan)")
+    if create_plot :
+        plt.tight_layout()
+        plt.show()
+
+
+'''
+Exemple : image 1024 x 1024 d'une mire (bandes d'aluminium sur silicium, avec un disque de bore) balayée par un faisceau d'Ar+
+'''
+if __name__ == '__main__' :
+    n = 512
+    x, z = np.meshgrid(np.linspace(0.02, 0.06, n), np.linspace(-0.02, 0.02, n))
+    aluminium = (np.floor(x / 0.004) % 2 == 0) * 1.0
+    bore = ((x - 0.04) ** 2 + z ** 2 < 0.008 ** 2) * 1e-3
+    carte = carte_echantillon(np.stack((aluminium, 1 - aluminium, bore)), (0.02, 0.06, -0.02, 0.02)).flouter(2e-4, 2e-4)
+
+    t0 = time.perf_counter()
+    trame = balayage.regulier((40, 1), 1e5, np.pi / 6, 0.05, 0.025, 0.055, -0.015, 0.015, 1024, 1024)
+    image = imager(trame, carte, 1e-9, 1e-4, [2e-3, 1e-3, 1e-1], graine=0)
+    print(f"Image 1024 x 1024 : {time.perf_counter() - t0:.2f} s, {image.nbytes / 1e6:.0f} Mo")
+    tracer_image(image, trame, ["Al+", "Si+", "B+"])
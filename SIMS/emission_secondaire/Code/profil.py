@@ -0,0 +1,306 @@
+import os, sys, time
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+from scipy.special import erf
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+path_faisceau = os.path.join(folder, "faisceau", "Code")
+path_detection = os.path.join(folder, "detection", "Code")
+for pth in [path_partie_bleue, path_partie_verte, path_faisceau, path_detection]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation # type: ignore
+import partie_electroaimant # type: ignore
+import acquisition # type: ignore
+from detecteur import detecteur # type: ignore
+
+
+class couche :
+    def __init__(self, epaisseur : float, composition : list[float], rendement_pulverisation : float = 2.0, densite_atomique : float = 5e28) -> None :
+        """
+        Couche de l'échantillon
+
+        Parameters
+        ----------
+        epaisseur : float
+            Epaisseur (m), np.inf pour le substrat
+        composition : list of float
+            Fraction atomique de chaque espèce de l'échantillon (normalisée)
+        rendement_pulverisation : float
+            Atomes arrachés par ion primaire
+        densite_atomique : float
+            Atomes par m³
+        """
+        if epaisseur <= 0 : raise ValueError("L'épaisseur doit être strictement positive.")
+        if rendement_pulverisation < 0 or densite_atomique <= 0 : raise ValueError("Rendement et densité doivent être positifs.")
+        composition = np.asarray(composition, dtype=float)
+        if composition.sum() <= 0 : raise ValueError("La composition doit être non nulle.")
+        self.epaisseur = epaisseur
+        self.composition = composition / composition.sum()
+        self.rendement_pulverisation = rendement_pulverisation
+        self.densite_atomique = densite_atomique
+
+
+class echantillon_couches :
+    def __init__(self, especes : list[tuple[float, float]], couches : list[couche], x_min : float, x_max : float, n_cellules : int = 200,
+                 probabilites_ionisation : list[float] = None, largeur_melange : float = 0.0, largeur_z : float = 1e-3) -> None :
+        """
+        Echantillon en couches érodé par le faisceau primaire : la surface, découpée en cellules selon x, se creuse de
+        dose x rendement / densité atomique à chaque pas, et chaque cellule émet les espèces de la couche où se trouve son fond
+
+        Parameters
+        ----------
+        especes : list of tuple of float
+            Masse (en u), Charge (en e) des ions secondaires de chaque espèce
+        couches : list of couche
+            Couches de la surface vers le substrat (la dernière est prolongée si elle est d'épaisseur finie)
+        x_min, x_max : float
+            Etendue de l'échantillon le long de la surface (m)
+        n_cellules : int
+            Nombre de cellules selon x
+        probabilites_ionisation : list of float
+            Probabilité qu'un atome arraché de chaque espèce soit émis sous forme d'ion (1e-2 par défaut)
+        largeur_melange : float
+            Ecart-type du mélange aux interfaces (m) (rugosité, mélange collisionnel), 0 pour des interfaces abruptes
+        largeur_z : float
+            Largeur de la zone balayée hors du plan (m), pour passer de la dose par cellule à la dose par unité de surface
+        """
+        if len(couches) == 0 : raise ValueError("Il faut au moins une couche.")
+        if any(len(c.composition) != len(especes) for c in couches) : raise ValueError("Chaque composition doit donner une fraction par espèce.")
+        self.especes = np.asarray(especes, dtype=float).reshape(-1, 2)
+        self.couches = list(couches)
+        self.bords = np.linspace(x_min, x_max, n_cellules + 1)
+        self.aire_cellule = (x_max - x_min) / n_cellules * largeur_z
+        self.probabilites_ionisation = np.full(len(especes), 1e-2) if probabilites_ionisation is None else np.asarray(probabilites_ionisation, dtype=float)
+        self.largeur_melange = largeur_melange
+        self.interfaces = np.cumsum([c.epaisseur for c in self.couches[:-1]])
+        self.compositions = np.array([c.composition for c in self.couches])
+        self.rendements = np.array([c.rendement_pulverisation for c in self.couches])
+        self.densites = np.array([c.densite_atomique for c in self.couches])
+        self.profondeurs = np.zeros(n_cellules)
+
+    def reinitialiser(self) -> None :
+        """Surface plane, avant toute érosion"""
+        self.profondeurs[:] = 0
+
+    def poids_couches(self, profondeurs : np.ndarray) -> np.ndarray :
+        """
+        Part de chaque couche à chaque profondeur
+
+        Returns
+        -------
+        numpy.ndarray
+            Poids de forme (n_profondeurs, n_couches), de somme 1 sur chaque ligne
+        """
+        n_couches = len(self.couches)
+        if self.largeur_melange <= 0 :
+            return np.eye(n_couches)[np.searchsorted(self.interfaces, profondeurs, side='right')]
+        # Fraction d'une gaussienne centrée sur la profondeur qui tombe dans chaque couche
+        cumul = 0.5 * (1 + erf((self.interfaces[None, :] - profondeurs[:, None]) / (np.sqrt(2) * self.largeur_melange)))
+        cumul = np.concatenate((np.zeros((len(profondeurs), 1)), cumul, np.ones((len(profondeurs), 1))), axis=1)
+        return np.diff(cumul, axis=1) # La part au-dessus de la surface revient à la première couche
+
+    def eroder(self, ions_par_cellule : np.ndarray) -> np.ndarray :
+        """
+        Un pas d'érosion, vectorisé sur les cellules
+
+        Parameters
+        ----------
+        ions_par_cellule : numpy.ndarray
+            Ions primaires reçus par chaque cellule pendant le pas
+
+        Returns
+        -------
+        numpy.ndarray
+            Ions secondaires émis de chaque espèce pendant le pas
+        """
+        poids = self.poids_couches(self.profondeurs)
+        atomes = ions_par_cellule * (poids @ self.rendements)
+        self.profondeurs += atomes / ((poids @ self.densites) * self.aire_cellule)
+        atomes_par_couche = atomes @ poids
+        return (atomes_par_couche @ self.compositions) * self.probabilites_ionisation
+
+
+def repartition_dose(source, masses_charges_primaires : list[tuple[float, float]], potentiel : float, bords : np.ndarray,
+                     n_ions : int = 1_000_000, proportions : list[float] = None, taille_lot : int = 1_000_000, graine : int = None) -> np.ndarray :
+    """
+    Fraction des ions primaires reçue par chaque cellule de l'échantillon, d'après les points de contact de la partie électrique
+
+    Parameters
+    ----------
+    source : source.source_ions
+        Source du faisceau primaire
+    masses_charges_primaires : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce primaire
+    potentiel : float
+        Différence de potentiel entre les plaques (en V), la distance entre plaques étant la hauteur nominale
+    bords : numpy.ndarray
+        Bords des cellules (m)
+    n_ions, proportions, taille_lot, graine :
+        Nombre d'ions tirés, proportion de chaque espèce (uniforme par défaut), ions calculés à la fois, graine
+
+    Returns
+    -------
+    numpy.ndarray
+        Fraction par cellule (la somme est inférieure à 1 si des ions manquent l'échantillon)
+    """
+    rng = np.random.default_rng(graine)
+    primaires = np.asarray(masses_charges_primaires, dtype=float).reshape(-1, 2)
+    proportions = np.ones(len(primaires)) if proportions is None else np.asarray(proportions, dtype=float)
+    E = deviation.champ_electrique_v2(source.height, potentiel)
+    comptes = np.zeros(len(bords) - 1)
+    for debut in range(0, n_ions, taille_lot) :
+        n = min(taille_lot, n_ions - debut)
+        especes = rng.choice(len(primaires), n, p=proportions / proportions.sum())
+        masses_u, charges_e = primaires[especes, 0], primaires[especes, 1]
+        v0, angles, hauteurs = source.echantillonner(masses_u, rng)
+        angles = np.where((angles > 0) & (angles < np.pi / 2) & (hauteurs > 0), angles, np.nan) # Tirages hors du domaine du modèle : perdus
+        xs = deviation.calculer_faisceau(masses_u, charges_e, v0, angles, hauteurs, E)['xs']
+        comptes += np.histogram(xs[np.isfinite(xs)], bins=bords)[0]
+    return comptes / n_ions
+
+
+def iterer_profil(echantillon : echantillon_couches, fractions_dose : np.ndarray, courant_primaire : float, duree_pas : float, n_pas : int,
+                  charge_primaire : float = 1.0) :
+    """
+    Profil en profondeur pas à pas
+
+    Parameters
+    ----------
+    echantillon : echantillon_couches
+        Echantillon (érodé en place)
+    fractions_dose : numpy.ndarray
+        Fraction des ions primaires reçue par chaque cellule (repartition_dose)
+    courant_primaire : float
+        Courant du faisceau primaire (A)
+    duree_pas : float
+        Durée d'un pas (s)
+    n_pas : int
+        Nombre de pas
+    charge_primaire : float
+        Charge des ions primaires (en e)
+
+    Yields
+    ------
+    dict
+        'temps' (s), 'profondeur' (profondeur moyenne des cellules pondérée par la dose, m),
+        'profondeur_max' (m) et 'flux' (ions secondaires par seconde de chaque espèce)
+    """
+    ions_par_cellule = fractions_dose * courant_primaire * duree_pas / (abs(charge_primaire) * constants.e)
+    poids_dose = fractions_dose / fractions_dose.sum() if fractions_dose.sum() > 0 else fractions_dose
+    for pas in range(n_pas) :
+        emis = echantillon.eroder(ions_par_cellule)
+        yield {'temps' : (pas + 1) * duree_pas, 'profondeur' : float(poids_dose @ echantillon.profondeurs),
+               'profondeur_max' : float(echantillon.profondeurs.max()), 'flux' : emis / duree_pas}
+
+
+def simuler_profil(echantillon : echantillon_couches, fractions_dose : np.ndarray, courant_primaire : float, duree_pas : float, n_pas : int,
+                   Bz : float = None, x_detecteur : float = None, capteur : detecteur = None, vitesse : float = 1e5,
+                   transmission : float = 1.0, charge_primaire : float = 1.0, graine : int = None) -> dict :
+    """
+    Profil en profondeur complet ; avec la partie magnétique (Bz, x_detecteur, capteur), les flux secondaires sont détectés
+    image par image (acquisition.iterer_acquisition, une image par pas) et les coups comptés au point d'arrivée de chaque espèce
+
+    Parameters
+    ----------
+    echantillon, fractions_dose, courant_primaire, duree_pas, n_pas, charge_primaire :
+        Voir iterer_profil
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    capteur : detecteur
+        Détecteur
+    vitesse : float
+        Vitesse commune des ions secondaires à l'entrée de la partie magnétique (m/s)
+    transmission : float
+        Fraction des ions secondaires qui atteignent la partie magnétique (colonne d'extraction)
+    graine : int
+        Graine du générateur aléatoire (détection)
+
+    Returns
+    -------
+    dict
+        'temps', 'profondeur', 'profondeur_max' (n_pas,), 'flux' (n_pas, n_especes) et, avec la partie magnétique,
+        'comptes' (n_pas, n_especes) ainsi que 'duree_calcul' (s)
+    """
+    debut = time.perf_counter()
+    temps, profondeur, profondeur_max = np.empty(n_pas), np.empty(n_pas), np.empty(n_pas)
+    flux = np.empty((n_pas, len(echantillon.especes)))
+
+    def flux_transmis() :
+        for pas, etat in enumerate(iterer_profil(echantillon, fractions_dose, courant_primaire, duree_pas, n_pas, charge_primaire)) :
+            temps[pas], profondeur[pas], profondeur_max[pas], flux[pas] = etat['temps'], etat['profondeur'], etat['profondeur_max'], etat['flux']
+            yield etat['flux'] * transmission
+
+    resultats = {'temps' : temps, 'profondeur' : profondeur, 'profondeur_max' : profondeur_max, 'flux' : flux}
+    if capteur is None :
+        for _ in flux_transmis() : pass
+    else :
+        masses_u, charges_e = echantillon.especes[:, 0], echantillon.especes[:, 1]
+        positions = partie_electroaimant.calculer_faisceau(masses_u, charges_e, vitesse, Bz, x_detecteur)['y_detecteur']
+        tampon = acquisition.tampon_images(1, capteur.image.shape)
+        comptes = np.empty((n_pas, len(masses_u)))
+        for metriques in acquisition.iterer_acquisition(echantillon.especes, flux_transmis(), Bz, x_detecteur, capteur, tampon, None, duree_pas,
+                                                        vitesse, graine=graine) :
+            comptes[metriques['indice']] = acquisition.comptes_autour(tampon.images, capteur, positions)[0]
+        resultats['comptes'] = comptes
+    resultats['duree_calcul'] = time.perf_counter() - debut
+    return resultats
+
+
+def tracer_profil(resultats : dict, labels_especes : list[str] = None, create_plot : bool = True, ax = None) -> None :
+    """
+    Trace les coups détectés (ou, sans détection, le flux émis) de chaque espèce en fonction de la profondeur
+
+    Parameters
+    ----------
+    resultats : dict
+        Résultat de simuler_profil
+    labels_especes : list of str
+        Nom de chaque espèce
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (ax est alors nécessaire)
+    ax : matplotlib.axes.Axes
+        Axe sur lequel tracer (uniquement si create_plot = False)
+    """
+    if create_plot or ax is None : fig, ax = plt.subplots(figsize=(10, 6))
+    valeurs = resultats['comptes'] if 'comptes' in resultats else resultats['flux']
+    couleurs = plt.cm.viridis(np.linspace(0, 0.9, valeurs.shape[1]))
+    for i in range(valeurs.shape[1]) :
+        label = labels_especes[i] if labels_especes is not None else f"Espèce {i + 1}"
+        ax.plot(resultats['profondeur'] * 1e9, np.where(valeurs[:, i] > 0, valeurs[:, i], np.nan), color=couleurs[i], label=label)
+    ax.set_yscale('log')
+    ax.set_xlabel("Profondeur (nm)")
+    ax.set_ylabel("Coups par pas" if 'comptes' in resultats else "Flux émis (ions/s)")
+    ax.set_title("Profil en profondeur")
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.legend()
+    if create_plot : plt.show()
+
+
+'''
+Exemple : 20 nm de SiO2 sur 50 nm d'aluminium sur un substrat de silicium dopé au bore, 10^4 pas de 0,1 s
+'''
+if __name__ == '__main__' :
+    import source as module_source # type: ignore
+
+    especes = [(16, 1), (27, 1), (28, 1), (11, 1)]
+    couches = [couche(20e-9, [0.67, 0, 0.33, 0], rendement_pulverisation=1.5, densite_atomique=6.6e28),
+               couche(50e-9, [0, 1, 0, 0], rendement_pulverisation=3.0, densite_atomique=6.0e28),
+               couche(np.inf, [0, 0, 1, 1e-4], rendement_pulverisation=2.0, densite_atomique=5.0e28)]
+    primaire = module_source.source_ions(1e5, np.pi / 6, 0.05, loi_emittance='gaussienne', dispersion_angle=0.01, dispersion_hauteur=2e-4)
+    echantillon = echantillon_couches(especes, couches, 0.0, 0.05, 200, probabilites_ionisation=[1e-2, 5e-3, 1e-2, 1e-3], largeur_melange=2e-9)
+    fractions = repartition_dose(primaire, [(40, 1)], -2000, echantillon.bords, graine=0)
+    print(f"Ions primaires sur l'échantillon : {fractions.sum():.1%}")
+
+    capteur = detecteur(0.0, 0.3, 2048)
+    resultats = simuler_profil(echantillon, fractions, 1e-6, 0.1, 10_000, Bz=0.5, x_detecteur=0.1, capteur=capteur, vitesse=1.5e5, transmission=0.1, graine=0)
+    print(f"10^4 pas : {resultats['duree_calcul']:.2f} s, profondeur finale {resultats['profondeur'][-1] * 1e9:.1f} nm "
+          f"(cratère {resultats['profondeur_max'][-1] * 1e9:.1f} nm)")
+    tracer_profil(resultats, ["O+", "Al+", "Si+", "B+"])
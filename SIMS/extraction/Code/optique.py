@@ -0,0 +1,358 @@
+import os, sys, time
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+path_faisceau = os.path.join(folder, "faisceau", "Code")
+path_emission = os.path.join(folder, "emission_secondaire", "Code")
+for pth in [path_partie_verte, path_faisceau, path_emission]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import partie_electroaimant # type: ignore
+from ions import faisceau_ions # type: ignore
+
+TAILLE_ECHANTILLON_REFERENCE = 65536 # Ions utilisés pour estimer l'énergie longitudinale moyenne (méthode 'matrices')
+
+# Les éléments sont placés le long de l'axe +y de la colonne (normale à l'échantillon) ; x et z sont les
+# coordonnées transverses, x' = vx / vy et z' = vz / vy les pentes associées.
+
+
+class derive :
+    def __init__(self, longueur : float) -> None :
+        """
+        Espace sans champ
+
+        Parameters
+        ----------
+        longueur : float
+            Longueur selon y (m)
+        """
+        if longueur < 0 : raise ValueError("La longueur doit être positive.")
+        self.longueur = longueur
+        self.nom = f"Dérive {longueur * 1e3:g} mm"
+
+    def appliquer(self, faisceau : faisceau_ions) -> None :
+        """Transport exact, en place (les ions qui ne progressent pas selon +y sont perdus)"""
+        faisceau.garder(faisceau.vy > 0)
+        t = self.longueur / faisceau.vy
+        faisceau.x += faisceau.vx * t
+        faisceau.z += faisceau.vz * t
+        faisceau.y += self.longueur
+        faisceau.temps += t
+
+    def matrice(self, energie_longitudinale : float, charge_e : float) -> np.ndarray :
+        """Matrice de transfert du premier ordre (x, x') pour l'ion de référence"""
+        return np.array([[1.0, self.longueur], [0.0, 1.0]])
+
+    def gain_energie(self, charge_e) -> float :
+        return 0.0
+
+
+class intervalle_accelerateur :
+    def __init__(self, tension : float, longueur : float) -> None :
+        """
+        Intervalle accélérateur à champ uniforme selon y (entre l'échantillon et l'électrode d'extraction par exemple) :
+        un ion de charge q gagne l'énergie q * tension en le traversant
+
+        Parameters
+        ----------
+        tension : float
+            Différence de potentiel V(entrée) - V(sortie) (en V), positive pour accélérer les ions positifs
+        longueur : float
+            Longueur de l'intervalle selon y (m)
+        """
+        if longueur <= 0 : raise ValueError("La longueur doit être strictement positive.")
+        self.tension = tension
+        self.longueur = longueur
+        self.nom = f"Accélération {tension:g} V"
+
+    def _vitesses_sortie(self, vy, masses_u, charges_e) -> np.ndarray :
+        with np.errstate(invalid='ignore') :
+            return np.sqrt(vy * vy + 2 * charges_e * constants.e * self.tension / (masses_u * constants.u))
+
+    def appliquer(self, faisceau : faisceau_ions) -> None :
+        """Transport exact, en place : durée t = 2 L / (vy_entrée + vy_sortie) (mouvement uniformément accéléré), ions réfléchis perdus"""
+        vy_sortie = self._vitesses_sortie(faisceau.vy, faisceau.masses_u, faisceau.charges_e)
+        passe = (vy_sortie > 0) & (faisceau.vy + vy_sortie > 0)
+        faisceau.garder(passe)
+        vy_sortie = vy_sortie[passe]
+        t = 2 * self.longueur / (faisceau.vy + vy_sortie)
+        faisceau.x += faisceau.vx * t
+        faisceau.z += faisceau.vz * t
+        faisceau.y += self.longueur
+        faisceau.vy = vy_sortie
+        faisceau.temps += t
+
+    def matrice(self, energie_longitudinale : float, charge_e : float) -> np.ndarray :
+        """
+        Matrice de transfert du premier ordre (x, x') pour l'ion de référence d'énergie longitudinale E (en eV) :
+        avec k = vy_sortie / vy_entrée = sqrt(1 + q V / E), x_sortie = x + x' 2L / (1 + k) et x'_sortie = x' / k
+        """
+        k = np.sqrt(1 + charge_e * self.tension / energie_longitudinale)
+        return np.array([[1.0, 2 * self.longueur / (1 + k)], [0.0, 1 / k]])
+
+    def gain_energie(self, charge_e) :
+        return charge_e * self.tension
+
+
+class lentille_mince :
+    def __init__(self, focale : float) -> None :
+        """
+        Lentille électrostatique mince (lentille de Einzel) : change la pente de -x / f sans changer l'énergie
+
+        Parameters
+        ----------
+        focale : float
+            Distance focale (m), négative pour une lentille divergente
+        """
+        if focale == 0 : raise ValueError("La focale doit être non nulle.")
+        self.focale = focale
+        self.longueur = 0.0
+        self.nom = f"Lentille f = {focale * 1e3:g} mm"
+
+    def appliquer(self, faisceau : faisceau_ions) -> None :
+        """Transport exact, en place (à vy constant)"""
+        faisceau.vx -= faisceau.x / self.focale * faisceau.vy
+        faisceau.vz -= faisceau.z / self.focale * faisceau.vy
+
+    def matrice(self, energie_longitudinale : float, charge_e : float) -> np.ndarray :
+        return np.array([[1.0, 0.0], [-1 / self.focale, 1.0]])
+
+    def gain_energie(self, charge_e) -> float :
+        return 0.0
+
+
+class diaphragme :
+    def __init__(self, demi_largeur_x : float, demi_largeur_z : float = None, circulaire : bool = True, centre : tuple[float, float] = (0.0, 0.0)) -> None :
+        """
+        Diaphragme (fente ou trou) : les ions qui passent en dehors de l'ouverture sont retirés du faisceau
+
+        Parameters
+        ----------
+        demi_largeur_x : float
+            Rayon du trou, ou demi-largeur de la fente selon x (m)
+        demi_largeur_z : float
+            Demi-largeur selon z (m), égale à demi_largeur_x par défaut
+        circulaire : bool
+            True pour une ouverture elliptique, False pour une ouverture rectangulaire
+        centre : tuple of float
+            Centre de l'ouverture (x, z) (m)
+        """
+        self.demi_largeur_x = demi_largeur_x
+        self.demi_largeur_z = demi_largeur_x if demi_largeur_z is None else demi_largeur_z
+        if min(self.demi_largeur_x, self.demi_largeur_z) <= 0 : raise ValueError("L'ouverture doit être strictement positive.")
+        self.circulaire = circulaire
+        self.centre = centre
+        self.longueur = 0.0
+        self.nom = f"Diaphragme {2 * demi_largeur_x * 1e3:g} mm"
+
+    def dedans(self, x : np.ndarray, z : np.ndarray) -> np.ndarray :
+        """True pour les positions (x, z) dans l'ouverture"""
+        u = (x - self.centre[0]) / self.demi_largeur_x
+        v = (z - self.centre[1]) / self.demi_largeur_z
+        return (u * u + v * v <= 1) if self.circulaire else ((np.abs(u) <= 1) & (np.abs(v) <= 1))
+
+    def appliquer(self, faisceau : faisceau_ions) -> None :
+        """Retire en place les ions arrêtés"""
+        faisceau.garder(self.dedans(faisceau.x, faisceau.z))
+
+
+class colonne :
+    def __init__(self, elements : list, x_axe : float = 0.0) -> None :
+        """
+        Colonne d'extraction : suite d'éléments traversés dans l'ordre
+
+        Parameters
+        ----------
+        elements : list
+            Eléments (derive, intervalle_accelerateur, lentille_mince, diaphragme)
+        x_axe : float
+            Abscisse de l'axe de la colonne (m) : les positions x du faisceau sont prises par rapport à cet axe, puis rendues
+            dans le repère du faisceau en sortie. Pour envoyer ensuite le faisceau dans la partie magnétique, dont l'entrée est
+            sur l'axe, mesurer plutôt x depuis l'axe dès l'émission (x_axe de emission.modele_emission.emettre)
+        """
+        self.elements = list(elements)
+        self.x_axe = x_axe
+
+    @property
+    def longueur(self) -> float :
+        return sum(e.longueur for e in self.elements)
+
+    def matrice(self, energie_longitudinale : float, charge_e : float = 1.0, debut : int = 0, fin : int = None) -> np.ndarray :
+        """
+        Produit des matrices du premier ordre (x, x') des éléments debut à fin - 1 pour un ion de référence, diaphragmes exclus
+
+        Parameters
+        ----------
+        energie_longitudinale : float
+            Energie longitudinale de l'ion de référence à l'entrée de l'élément debut (en eV)
+        charge_e : float
+            Charge de l'ion de référence (en e)
+
+        Returns
+        -------
+        numpy.ndarray
+            Matrice 2 x 2
+        """
+        M = np.eye(2)
+        for element in self.elements[debut:fin] :
+            if isinstance(element, diaphragme) : continue
+            M = element.matrice(energie_longitudinale, charge_e) @ M
+            energie_longitudinale += element.gain_energie(charge_e)
+        return M
+
+    def transmettre(self, faisceau : faisceau_ions, methode : str = 'exacte', energie_reference : float = None) -> list[dict] :
+        """
+        Fait traverser la colonne au faisceau, en place
+
+        Parameters
+        ----------
+        faisceau : faisceau_ions
+            Faisceau à l'entrée de la colonne (modifié en place : les ions perdus sont retirés)
+        methode : str
+            'exacte' (transformations exactes élément par élément) ou 'matrices' (optique du premier ordre : entre deux diaphragmes,
+            les coordonnées transverses sont transportées par un seul produit matriciel, calculé pour l'ion de référence ; le coût
+            d'un groupe ne dépend pas de son nombre d'éléments, un élément isolé est transporté exactement)
+        energie_reference : float
+            Energie longitudinale par charge de l'ion de référence (en eV/e, signée comme la charge), méthode 'matrices'
+            (par défaut la moyenne du faisceau)
+
+        Returns
+        -------
+        list of dict
+            Pour chaque élément (ou groupe d'éléments) : 'nom', 'entree', 'perdus'
+        """
+        if methode not in ('exacte', 'matrices') : raise ValueError(f"Méthode inconnue : {methode}")
+        faisceau.x -= self.x_axe
+        bilan = []
+        if methode == 'exacte' :
+            for element in self.elements :
+                entree = len(faisceau)
+                element.appliquer(faisceau)
+                bilan.append({'nom' : element.nom, 'entree' : entree, 'perdus' : entree - len(faisceau)})
+        else :
+            if energie_reference is None :
+                pas = max(1, len(faisceau) // TAILLE_ECHANTILLON_REFERENCE) # Moyenne estimée sur un échantillon régulier du faisceau
+                masses, charges, vy = faisceau.masses_u[::pas], faisceau.charges_e[::pas], faisceau.vy[::pas]
+                energie_reference = float(np.mean(0.5 * masses * constants.u * vy ** 2 / (constants.e * charges)))
+            charge_reference = 1.0 # Les matrices ne dépendent que de q V / E : l'ion de référence porte une charge e
+            debut = 0
+            coupures = [i for i, e in enumerate(self.elements) if isinstance(e, diaphragme)] + [len(self.elements)]
+            for fin in coupures :
+                if fin == debut + 1 : # Un seul élément : son transport exact est aussi rapide
+                    entree = len(faisceau)
+                    self.elements[debut].appliquer(faisceau)
+                    energie_reference += self.elements[debut].gain_energie(charge_reference)
+                    bilan.append({'nom' : self.elements[debut].nom, 'entree' : entree, 'perdus' : entree - len(faisceau)})
+                elif fin > debut :
+                    entree = len(faisceau)
+                    energie_reference = self._transporter_lineaire(faisceau, debut, fin, energie_reference, charge_reference)
+                    bilan.append({'nom' : ' + '.join(e.nom for e in self.elements[debut:fin]), 'entree' : entree, 'perdus' : entree - len(faisceau)})
+                if fin < len(self.elements) :
+                    entree = len(faisceau)
+                    self.elements[fin].appliquer(faisceau)
+                    bilan.append({'nom' : self.elements[fin].nom, 'entree' : entree, 'perdus' : entree - len(faisceau)})
+                debut = fin + 1
+        faisceau.x += self.x_axe
+        return bilan
+
+    def _transporter_lineaire(self, faisceau : faisceau_ions, debut : int, fin : int, energie_reference : float, charge_reference : float) -> float :
+        """
+        Transport du premier ordre des éléments debut à fin - 1 : (x, x') et (z, z') par une seule matrice, en place ;
+        vy, y et la date sont mis à jour exactement. Sans intervalle accélérateur, vy est inchangé et la durée de vol
+        est la longueur totale divisée par vy ; sinon les dérives consécutives sont regroupées entre deux intervalles.
+
+        Returns
+        -------
+        float
+            Energie longitudinale de référence à la sortie
+        """
+        faisceau.garder(faisceau.vy > 0)
+        (a, b), (c, d) = self.matrice(energie_reference, charge_reference, debut, fin)
+        elements = self.elements[debut:fin]
+        vy = faisceau.vy
+        inverse_vy = 1 / vy
+        if not any(isinstance(e, intervalle_accelerateur) for e in elements) :
+            vy_sortie = vy
+            faisceau.temps += sum(e.longueur for e in elements) * inverse_vy
+        else :
+            vy_sortie, temps, longueur_derive = vy, np.zeros(len(faisceau)), 0.0
+            for element in elements :
+                if isinstance(element, intervalle_accelerateur) :
+                    if longueur_derive > 0 : temps += longueur_derive / vy_sortie
+                    vy_entree, vy_sortie = vy_sortie, element._vitesses_sortie(vy_sortie, faisceau.masses_u, faisceau.charges_e)
+                    temps += 2 * element.longueur / (vy_entree + vy_sortie)
+                    longueur_derive = 0.0
+                else :
+                    longueur_derive += element.longueur
+            if longueur_derive > 0 : temps += longueur_derive / vy_sortie
+            faisceau.temps += temps
+        for position, vitesse in ((faisceau.x, faisceau.vx), (faisceau.z, faisceau.vz)) :
+            vitesse *= inverse_vy # Pente
+            terme = b * vitesse
+            if d != 1 : vitesse *= d
+            if c != 0 : vitesse += c * position
+            vitesse *= vy_sortie
+            if a != 1 : position *= a
+            position += terme
+        faisceau.vy = vy_sortie
+        faisceau.y += sum(e.longueur for e in elements)
+        for element in elements :
+            energie_reference += element.gain_energie(charge_reference)
+        if vy_sortie is not vy : faisceau.garder(np.isfinite(vy_sortie) & (vy_sortie > 0)) # Ions réfléchis par un intervalle retardateur
+        return energie_reference
+
+
+def tracer_transmission(bilan : list[dict], create_plot : bool = True, ax = None) -> None :
+    """
+    Trace le nombre d'ions restant après chaque élément de la colonne
+
+    Parameters
+    ----------
+    bilan : list of dict
+        Résultat de colonne.transmettre
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (ax est alors nécessaire)
+    ax : matplotlib.axes.Axes
+        Axe sur lequel tracer (uniquement si create_plot = False)
+    """
+    if create_plot or ax is None : fig, ax = plt.subplots(figsize=(10, 6))
+    restants = [etape['entree'] - etape['perdus'] for etape in bilan]
+    n_initial = bilan[0]['entree'] if bilan else 0
+    ax.bar(range(len(bilan)), restants, color=plt.cm.viridis(0.4))
+    ax.set_xticks(range(len(bilan)))
+    ax.set_xticklabels([etape['nom'] for etape in bilan], rotation=30, ha='right', fontsize=8)
+    ax.set_ylabel("Ions restants")
+    ax.set_title(f"Transmission de la colonne : {restants[-1] / max(n_initial, 1):.1%}" if bilan else "Transmission de la colonne")
+    ax.grid(True, axis='y', linestyle='--', alpha=0.6)
+    if create_plot : plt.show()
+
+
+'''
+Exemple : ions secondaires Si+ extraits par 4,5 kV (intervalle d'immersion, non paraxial : transport exact), puis focalisés
+et filtrés par un diaphragme (optique paraxiale : les deux méthodes coïncident) avant la partie magnétique. Le retrait des ions
+arrêtés par le diaphragme domine ici ; la méthode 'matrices' est d'autant plus rapide que les groupes d'éléments sont longs.
+'''
+if __name__ == '__main__' :
+    import emission # type: ignore
+
+    rng = np.random.default_rng(0)
+    n = 2_000_000
+    modele = emission.modele_emission([(28, 1), (29, 1), (30, 1)], probabilites=[0.92, 0.05, 0.03], rendement=1.0, energie_liaison=4.7)
+    secondaires = modele.emettre(rng.normal(0.02, 20e-6, n), np.radians(30), 5000, 16, rng=rng, x_axe=0.02) # x depuis l'axe de la colonne
+    colonne([intervalle_accelerateur(4500, 2e-3)]).transmettre(secondaires)
+    extraction = colonne([derive(0.05), lentille_mince(0.05), derive(0.1), diaphragme(1e-3), derive(0.05)])
+
+    for methode in ('exacte', 'matrices') :
+        faisceau = secondaires.copie()
+        t0 = time.perf_counter()
+        bilan = extraction.transmettre(faisceau, methode=methode)
+        print(f"Méthode {methode} : {time.perf_counter() - t0:.3f} s pour {len(secondaires)} ions, transmission {len(faisceau) / len(secondaires):.2%}")
+
+    impacts = partie_electroaimant.calculer_faisceau_ions(faisceau, 0.3, 0.05)
+    print(f"Partie magnétique : {np.count_nonzero(np.isfinite(impacts['y_detecteur']))} ions au détecteur")
+    tracer_transmission(bilan)
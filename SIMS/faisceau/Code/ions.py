@@ -0,0 +1,111 @@
+import numpy as np
+import scipy.constants as constants
+
+# Grandeurs stockées par ion (un tableau float64 chacune)
+CHAMPS = ('masses_u', 'charges_e', 'x', 'y', 'z', 'vx', 'vy', 'vz', 'temps')
+
+
+class faisceau_ions :
+    def __init__(self, masses_u, charges_e, x, y, vx, vy, z = 0.0, vz = 0.0, temps = 0.0) -> None :
+        """
+        Faisceau d'ions stocké colonne par colonne (un tableau par grandeur) : c'est le format échangé entre les étages
+        du SIMS (émission, extraction, secteur magnétique, détection). Les valeurs scalaires sont étendues à tout le faisceau.
+
+        Parameters
+        ----------
+        masses_u : array_like
+            Masses (en u)
+        charges_e : array_like
+            Charges (en e, signées)
+        x, y : array_like
+            Positions dans le plan de la simulation (m)
+        vx, vy : array_like
+            Vitesses dans le plan (m/s)
+        z, vz : array_like
+            Position et vitesse hors du plan (m, m/s)
+        temps : array_like
+            Date de passage à la position (s)
+        """
+        colonnes = np.broadcast_arrays(*(np.atleast_1d(np.asarray(c, dtype=float)) for c in (masses_u, charges_e, x, y, z, vx, vy, vz, temps)))
+        for nom, colonne in zip(CHAMPS, colonnes) :
+            setattr(self, nom, np.array(colonne.ravel())) # Copie : garder() compacte chaque tableau sur lui-même
+
+    def __len__(self) -> int :
+        return len(self.masses_u)
+
+    @property
+    def vitesse(self) -> np.ndarray :
+        """Norme de la vitesse (m/s)"""
+        return np.sqrt(self.vx * self.vx + self.vy * self.vy + self.vz * self.vz)
+
+    @property
+    def energie(self) -> np.ndarray :
+        """Energie cinétique (en eV)"""
+        return 0.5 * self.masses_u * constants.u * (self.vx * self.vx + self.vy * self.vy + self.vz * self.vz) / constants.e
+
+    @property
+    def mq(self) -> np.ndarray :
+        """Rapport masse / charge signé (en kg/C)"""
+        return self.masses_u * constants.u / (self.charges_e * constants.e)
+
+    @property
+    def angle(self) -> np.ndarray :
+        """Angle entre la vitesse dans le plan et l'axe +y (en radians, positif vers +x)"""
+        return np.arctan2(self.vx, self.vy)
+
+    def garder(self, masque) -> int :
+        """
+        Ne garde que les ions sélectionnés, en place (les tableaux sont compactés, l'ordre est conservé)
+
+        Parameters
+        ----------
+        masque : array_like of bool
+            True pour les ions conservés
+
+        Returns
+        -------
+        int
+            Nombre d'ions retirés
+        """
+        masque = np.asarray(masque, dtype=bool)
+        n_gardes = int(np.count_nonzero(masque))
+        retires = len(self) - n_gardes
+        if retires == 0 : return 0
+        for nom in CHAMPS :
+            colonne = getattr(self, nom)
+            colonne[:n_gardes] = colonne[masque] # Compactage dans le même tableau
+            setattr(self, nom, colonne[:n_gardes])
+        return retires
+
+    def copie(self) -> 'faisceau_ions' :
+        """Copie indépendante du faisceau"""
+        return faisceau_ions(*(getattr(self, nom) for nom in ('masses_u', 'charges_e', 'x', 'y', 'vx', 'vy', 'z', 'vz', 'temps')))
+
+    @staticmethod
+    def concatener(faisceaux : list['faisceau_ions']) -> 'faisceau_ions' :
+        """Réunit plusieurs faisceaux (par exemple plusieurs lots) en un seul"""
+        return faisceau_ions(*(np.concatenate([getattr(f, nom) for f in faisceaux]) for nom in ('masses_u', 'charges_e', 'x', 'y', 'vx', 'vy', 'z', 'vz', 'temps')))
+
+    def especes(self) -> tuple[np.ndarray, np.ndarray] :
+        """
+        Returns
+        -------
+        tuple of numpy.ndarray
+            - Couples (masse, charge) distincts, de forme (n_especes, 2)
+            - Indice d'espèce de chaque ion
+        """
+        return np.unique(np.column_stack((self.masses_u, self.charges_e)), axis=0, return_inverse=True)
+
+
+'''
+Exemple : compactage en place d'un faisceau de 10^7 ions
+'''
+if __name__ == '__main__' :
+    import time
+    rng = np.random.default_rng(0)
+    n = 10_000_000
+    faisceau = faisceau_ions(rng.choice([1., 16., 28.], n), 1, rng.normal(0, 1e-3, n), 0, rng.normal(0, 1e3, n), 1e5)
+    t0 = time.perf_counter()
+    retires = faisceau.garder(np.abs(faisceau.x) < 1e-3)
+    print(f"Compactage : {time.perf_counter() - t0:.3f} s, {retires} ions retirés, {len(faisceau)} restants")
+    print(f"Energie moyenne : {faisceau.energie.mean():.1f} eV")
@@ -0,0 +1,624 @@
+import os, sys
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+for pth in [path_partie_bleue, path_partie_verte]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation # type: ignore
+import partie_electroaimant # type: ignore
+
+
+LOIS_VITESSE = ('fixe', 'gaussienne', 'maxwell_boltzmann')
+LOIS_EMITTANCE = ('fixe', 'gaussienne', 'ellipse')
+
+
+class source_ions :
+    def __init__(self, v_initiale : float, angle_initial : float = np.pi / 6, hauteur_initiale : float = 0.5,
+                 loi_vitesse : str = 'fixe', dispersion_energie : float = 0.0,
+                 loi_emittance : str = 'fixe', dispersion_angle : float = 0.0, dispersion_hauteur : float = 0.0,
+                 emittance : float = 0.0, alpha : float = 0.0, beta : float = 1.0) -> None :
+        """
+        Source d'ions avec dispersion en énergie et divergence angulaire (tirages vectorisés de (v0, θ, y0))
+
+        Parameters
+        ----------
+        v_initiale : float
+            Vitesse initiale nominale (en m/s)
+        angle_initial : float
+            Angle initial nominal entre v0 et l'axe y (en radians)
+        hauteur_initiale : float
+            Hauteur initiale nominale (en m)
+        loi_vitesse : str
+            'fixe', 'gaussienne' (énergie cinétique gaussienne d'écart-type dispersion_energie)
+            ou 'maxwell_boltzmann' (énergie nominale + énergie thermique de Maxwell-Boltzmann à la température kT = dispersion_energie)
+        dispersion_energie : float
+            Ecart-type de l'énergie ou température kT selon la loi (en eV)
+        loi_emittance : str
+            'fixe', 'gaussienne' (θ et y0 indépendants) ou 'ellipse' (ellipse d'espace des phases (y0, θ) de paramètres de Twiss)
+        dispersion_angle : float
+            Ecart-type de l'angle (en radians), loi 'gaussienne'
+        dispersion_hauteur : float
+            Ecart-type de la hauteur (en m), loi 'gaussienne'
+        emittance : float
+            Emittance rms de l'ellipse (en m.rad), loi 'ellipse'
+        alpha : float
+            Paramètre de Twiss alpha (corrélation entre y0 et θ), loi 'ellipse'
+        beta : float
+            Paramètre de Twiss beta (en m/rad), loi 'ellipse'
+        """
+        if v_initiale <= 0 : raise ValueError("La vitesse initiale doit être positive.")
+        if loi_vitesse not in LOIS_VITESSE : raise ValueError(f"Loi de vitesse inconnue : {loi_vitesse}")
+        if loi_emittance not in LOIS_EMITTANCE : raise ValueError(f"Loi d'émittance inconnue : {loi_emittance}")
+        if min(dispersion_energie, dispersion_angle, dispersion_hauteur, emittance) < 0 : raise ValueError("Les dispersions doivent être positives.")
+        if beta <= 0 : raise ValueError("Le paramètre beta doit être strictement positif.")
+
+        self.vo = v_initiale
+        self.angle = angle_initial
+        self.height = hauteur_initiale
+        self.loi_vitesse = loi_vitesse
+        self.dispersion_energie = dispersion_energie
+        self.loi_emittance = loi_emittance
+        self.dispersion_angle = dispersion_angle
+        self.dispersion_hauteur = dispersion_hauteur
+        self.emittance = emittance
+        self.alpha = alpha
+        self.beta = beta
+
+    def tirer_vitesses(self, masses_u, rng : np.random.Generator) -> np.ndarray :
+        """
+        Tire les vitesses initiales des ions
+
+        Parameters
+        ----------
+        masses_u : numpy.ndarray
+            Masse (en u) de chaque ion
+        rng : numpy.random.Generator
+            Générateur aléatoire
+
+        Returns
+        -------
+        numpy.ndarray
+            Vitesses initiales (en m/s), NaN si l'énergie tirée est négative
+        """
+        masses_u = np.asarray(masses_u, dtype=float)
+        if self.loi_vitesse == 'fixe' or self.dispersion_energie == 0 :
+            return np.full(masses_u.shape, float(self.vo))
+        masses = masses_u * constants.u
+        energie = 0.5 * masses * self.vo ** 2 / constants.e # (eV)
+        if self.loi_vitesse == 'gaussienne' :
+            energie = energie + self.dispersion_energie * rng.standard_normal(masses.shape)
+        else :
+            energie = energie + rng.gamma(1.5, self.dispersion_energie, masses.shape)
+        with np.errstate(invalid='ignore') :
+            return np.sqrt(2 * energie * constants.e / masses)
+
+    def tirer_angles_hauteurs(self, n : int, rng : np.random.Generator) -> tuple[np.ndarray, np.ndarray] :
+        """
+        Tire les angles et hauteurs initiaux des ions
+
+        Parameters
+        ----------
+        n : int
+            Nombre d'ions
+        rng : numpy.random.Generator
+            Générateur aléatoire
+
+        Returns
+        -------
+        tuple of (numpy.ndarray, numpy.ndarray)
+            - Angles initiaux (en radians)
+            - Hauteurs initiales (en m)
+        """
+        if self.loi_emittance == 'fixe' :
+            return np.full(n, float(self.angle)), np.full(n, float(self.height))
+        if self.loi_emittance == 'gaussienne' :
+            return self.angle + self.dispersion_angle * rng.standard_normal(n), self.height + self.dispersion_hauteur * rng.standard_normal(n)
+        # Ellipse : covariance emittance * [[beta, -alpha], [-alpha, gamma]] (factorisation de Cholesky explicite)
+        u1, u2 = rng.standard_normal(n), rng.standard_normal(n)
+        ecart_hauteur = np.sqrt(self.emittance * self.beta)
+        ecart_angle = np.sqrt(self.emittance / self.beta)
+        return self.angle + ecart_angle * (-self.alpha * u1 + u2), self.height + ecart_hauteur * u1
+
+    def echantillonner(self, masses_u, rng : np.random.Generator = None) -> tuple[np.ndarray, np.ndarray, np.ndarray] :
+        """
+        Tire (v0, θ, y0) pour chaque ion
+
+        Parameters
+        ----------
+        masses_u : array_like
+            Masse (en u) de chaque ion
+        rng : numpy.random.Generator
+            Générateur aléatoire (un nouveau générateur par défaut)
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            - Vitesses initiales (en m/s)
+            - Angles initiaux (en radians)
+            - Hauteurs initiales (en m)
+        """
+        rng = rng or np.random.default_rng()
+        masses_u = np.asarray(masses_u, dtype=float)
+        angles, hauteurs = self.tirer_angles_hauteurs(masses_u.size, rng)
+        return self.tirer_vitesses(masses_u, rng), angles.reshape(masses_u.shape), hauteurs.reshape(masses_u.shape)
+
+
+class _statistiques_spot :
+    def __init__(self, n_especes : int, n_bins : int) -> None :
+        """
+        Accumule par espèce les statistiques d'une position d'impact, lot par lot (mémoire constante)
+
+        Parameters
+        ----------
+        n_especes : int
+            Nombre d'espèces du faisceau
+        n_bins : int
+            Nombre d'intervalles de l'histogramme
+        """
+        self.n_especes = n_especes
+        self.n_bins = n_bins
+        self.n = np.zeros(n_especes, dtype=np.int64)
+        self.n_contact = np.zeros(n_especes, dtype=np.int64)
+        self.somme = np.zeros(n_especes)
+        self.somme_carres = np.zeros(n_especes)
+        self.min = np.full(n_especes, np.inf)
+        self.max = np.full(n_especes, -np.inf)
+        self.comptes = np.zeros((n_especes, n_bins), dtype=np.int64)
+        self.hors_histogramme = np.zeros(n_especes, dtype=np.int64)
+        self.bords = None
+        self.reference = np.full(n_especes, np.nan) # Décalage par espèce pour limiter les erreurs d'arrondi de la variance
+
+    def ajouter(self, especes : np.ndarray, positions : np.ndarray) -> None :
+        """
+        Ajoute un lot d'impacts
+
+        Parameters
+        ----------
+        especes : numpy.ndarray of int
+            Indice d'espèce de chaque ion
+        positions : numpy.ndarray
+            Position d'impact de chaque ion (NaN si pas de contact)
+        """
+        self.n += np.bincount(especes, minlength=self.n_especes)
+        contact = np.isfinite(positions)
+        especes, positions = especes[contact], positions[contact]
+        if positions.size == 0 : return
+        if self.bords is None :
+            # Intervalles fixés sur le premier lot, élargis pour contenir les lots suivants
+            bas, haut = positions.min(), positions.max()
+            marge = 0.5 * (haut - bas) if haut > bas else max(abs(bas) * 1e-3, 1e-12)
+            self.bords = np.linspace(bas - marge, haut + marge, self.n_bins + 1)
+        n_lot = np.bincount(especes, minlength=self.n_especes)
+        sans_reference = np.isnan(self.reference) & (n_lot > 0)
+        self.reference[sans_reference] = np.bincount(especes, weights=positions, minlength=self.n_especes)[sans_reference] / n_lot[sans_reference]
+        self.n_contact += n_lot
+        ecarts = positions - self.reference[especes]
+        self.somme += np.bincount(especes, weights=ecarts, minlength=self.n_especes)
+        self.somme_carres += np.bincount(especes, weights=ecarts * ecarts, minlength=self.n_especes)
+        np.minimum.at(self.min, especes, positions)
+        np.maximum.at(self.max, especes, positions)
+        indices = np.searchsorted(self.bords, positions, side='right') - 1
+        dedans = (indices >= 0) & (indices < self.n_bins)
+        self.hors_histogramme += np.bincount(especes[~dedans], minlength=self.n_especes)
+        self.comptes += np.bincount(especes[dedans] * self.n_bins + indices[dedans], minlength=self.n_especes * self.n_bins).reshape(self.n_especes, self.n_bins)
+
+    def resultats(self) -> dict :
+        """
+        Returns
+        -------
+        dict
+            Statistiques par espèce : 'n', 'n_contact', 'moyenne', 'ecart_type', 'min', 'max',
+            'largeur_90' (intervalle contenant 90% des impacts, estimé sur l'histogramme),
+            'histogramme' (n_especes, n_bins), 'bords', 'hors_histogramme'
+        """
+        with np.errstate(invalid='ignore', divide='ignore') :
+            moyenne_ecarts = self.somme / self.n_contact
+            variance = np.maximum(self.somme_carres / self.n_contact - moyenne_ecarts ** 2, 0)
+            moyenne = moyenne_ecarts + self.reference
+            largeur_90 = np.full(self.n_especes, np.nan)
+            if self.bords is not None :
+                cumul = np.cumsum(self.comptes, axis=1) / np.maximum(self.comptes.sum(axis=1, keepdims=True), 1)
+                centres = 0.5 * (self.bords[1:] + self.bords[:-1])
+                for i in np.flatnonzero(self.comptes.sum(axis=1)) :
+                    largeur_90[i] = np.interp(0.95, cumul[i], centres) - np.interp(0.05, cumul[i], centres)
+        return {'n' : self.n, 'n_contact' : self.n_contact, 'moyenne' : moyenne, 'ecart_type' : np.sqrt(variance),
+                'min' : np.where(self.n_contact > 0, self.min, np.nan), 'max' : np.where(self.n_contact > 0, self.max, np.nan),
+                'largeur_90' : largeur_90, 'histogramme' : self.comptes, 'bords' : self.bords, 'hors_histogramme' : self.hors_histogramme}
+
+
+def _tirer_especes(n : int, n_especes : int, proportions, rng : np.random.Generator) -> np.ndarray :
+    """Tire l'espèce de chaque ion selon les proportions (uniformes par défaut)"""
+    if proportions is None : return rng.integers(0, n_especes, n)
+    proportions = np.asarray(proportions, dtype=float)
+    if proportions.shape != (n_especes,) or np.any(proportions < 0) or proportions.sum() <= 0 :
+        raise ValueError("Les proportions doivent être positives, une par espèce.")
+    return np.searchsorted(np.cumsum(proportions) / proportions.sum(), rng.random(n), side='right').clip(0, n_especes - 1)
+
+
+def simuler_spot_electrique(source : source_ions, masses_charges_particules : list[tuple[float, float]], potentiel : float, n_ions : int = 1_000_000,
+                            proportions : list[float] = None, n_bins : int = 200, taille_lot : int = 1_000_000, graine : int = None) -> dict :
+    """
+    Fait passer un faisceau tiré depuis la source dans la partie électrique et calcule la taille et la forme
+    du spot d'impact sur l'échantillon pour chaque espèce. Le calcul est fait par lots de taille_lot ions
+    (mémoire bornée, adapté à 10^7 ions et plus).
+
+    Parameters
+    ----------
+    source : source_ions
+        Source du faisceau
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce
+    potentiel : float
+        Différence de potentiel entre les plaques (en V), la distance entre plaques étant la hauteur nominale
+    n_ions : int
+        Nombre total d'ions
+    proportions : list of float
+        Proportion de chaque espèce dans le faisceau (uniforme par défaut)
+    n_bins : int
+        Nombre d'intervalles des histogrammes
+    taille_lot : int
+        Nombre d'ions calculés à la fois
+    graine : int
+        Graine du générateur aléatoire
+
+    Returns
+    -------
+    dict
+        Statistiques de xs par espèce (voir _statistiques_spot.resultats) complétées de
+        'angle_incident_moyen' (rad), 'temps_vol_moyen' (s) et 'energie_impact_moyenne' (eV)
+    """
+    rng = np.random.default_rng(graine)
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    n_especes = len(masses_charges)
+    E = deviation.champ_electrique_v2(source.height, potentiel)
+    statistiques = _statistiques_spot(n_especes, n_bins)
+    sommes = {'angle_incident' : np.zeros(n_especes), 'temps_vol' : np.zeros(n_especes), 'energie_impact' : np.zeros(n_especes)}
+
+    for debut in range(0, n_ions, taille_lot) :
+        n = min(taille_lot, n_ions - debut)
+        especes = _tirer_especes(n, n_especes, proportions, rng)
+        masses_u, charges_e = masses_charges[especes, 0], masses_charges[especes, 1]
+        v0, angles, hauteurs = source.echantillonner(masses_u, rng)
+        valides = (angles > 0) & (angles < np.pi / 2) & (hauteurs > 0) # Tirages hors du domaine du modèle : perdus
+        angles = np.where(valides, angles, np.nan)
+        impacts = deviation.calculer_faisceau(masses_u, charges_e, v0, angles, hauteurs, E)
+        statistiques.ajouter(especes, impacts['xs'])
+        contact = np.isfinite(impacts['xs'])
+        for cle in sommes :
+            sommes[cle] += np.bincount(especes[contact], weights=impacts[cle][contact], minlength=n_especes)
+
+    resultats = statistiques.resultats()
+    with np.errstate(invalid='ignore', divide='ignore') :
+        resultats['angle_incident_moyen'] = sommes['angle_incident'] / resultats['n_contact']
+        resultats['temps_vol_moyen'] = sommes['temps_vol'] / resultats['n_contact']
+        resultats['energie_impact_moyenne'] = sommes['energie_impact'] / resultats['n_contact']
+    return resultats
+
+
+def simuler_spot_magnetique(source : source_ions, masses_charges_particules : list[tuple[float, float]], Bz : float, x_detecteur : float, n_ions : int = 1_000_000,
+                            proportions : list[float] = None, n_bins : int = 200, taille_lot : int = 1_000_000, graine : int = None) -> dict :
+    """
+    Fait passer un faisceau tiré depuis la source (dispersion en vitesse) dans la partie magnétique et calcule
+    la taille et la forme du spot sur le détecteur pour chaque espèce, par lots de taille_lot ions.
+
+    Parameters
+    ----------
+    source : source_ions
+        Source du faisceau (seule la loi de vitesse est utilisée : les ions partent de l'origine selon +y)
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    n_ions, proportions, n_bins, taille_lot, graine :
+        Voir simuler_spot_electrique
+
+    Returns
+    -------
+    dict
+        Statistiques de y au détecteur par espèce (voir _statistiques_spot.resultats) complétées de
+        'temps_vol_moyen' (s)
+    """
+    rng = np.random.default_rng(graine)
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    n_especes = len(masses_charges)
+    statistiques = _statistiques_spot(n_especes, n_bins)
+    somme_temps = np.zeros(n_especes)
+
+    for debut in range(0, n_ions, taille_lot) :
+        n = min(taille_lot, n_ions - debut)
+        especes = _tirer_especes(n, n_especes, proportions, rng)
+        masses_u, charges_e = masses_charges[especes, 0], masses_charges[especes, 1]
+        impacts = partie_electroaimant.calculer_faisceau(masses_u, charges_e, source.tirer_vitesses(masses_u, rng), Bz, x_detecteur)
+        statistiques.ajouter(especes, impacts['y_detecteur'])
+        contact = np.isfinite(impacts['y_detecteur'])
+        somme_temps += np.bincount(especes[contact], weights=impacts['temps_vol'][contact], minlength=n_especes)
+
+    resultats = statistiques.resultats()
+    with np.errstate(invalid='ignore', divide='ignore') :
+        resultats['temps_vol_moyen'] = somme_temps / resultats['n_contact']
+    return resultats
+
+
+def tracer_spots(resultats : dict, labels_particules : list[str] = None, titre : str = "Spot d'impact", create_plot : bool = True, ax = None) -> None :
+    """
+    Trace l'histogramme des positions d'impact de chaque espèce
+
+    Parameters
+    ----------
+    resultats : dict
+        Résultat de simuler_spot_electrique ou simuler_spot_magnetique
+    labels_particules : list of str
+        Labels des espèces
+    titre : str
+        Titre du graphique
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (ax est alors nécessaire)
+    ax : matplotlib.axes.Axes
+        Axe sur lequel tracer (uniquement si create_plot = False)
+    """
+    if create_plot or ax is None : fig, ax = plt.subplots(figsize=(10, 6))
+    n_especes = len(resultats['n'])
+    if labels_particules is None : labels_particules = [f"Particule {i+1}" for i in range(n_especes)]
+    if resultats['bords'] is not None :
+        centres = 0.5 * (resultats['bords'][1:] + resultats['bords'][:-1])
+        colors = plt.cm.viridis([i / n_especes for i in range(n_especes)])
+        for i in range(n_especes) :
+            if resultats['n_contact'][i] == 0 : continue
+            label = f"{labels_particules[i]} : {resultats['moyenne'][i]:.3e} ± {resultats['ecart_type'][i]:.1e} m"
+            ax.step(centres, resultats['histogramme'][i], where='mid', color=colors[i], label=label)
+    ax.set_xlabel("Position d'impact (m)")
+    ax.set_ylabel("Nombre d'ions")
+    ax.set_title(titre)
+    ax.grid(True, linestyle='--', alpha=0.6)
+    if ax.get_legend_handles_labels()[0] : ax.legend(fontsize='small')
+    if create_plot : plt.show()
+
+
+class image_densite :
+    def __init__(self, etendue : tuple[float, float, float, float], n_bins : tuple[int, int] = (480, 360)) -> None :
+        """
+        Image de densité des trajectoires dans le plan (x, y) : chaque point de trajectoire incrémente le pixel
+        qui le contient (np.bincount sur l'indice aplati), le coût est donc proportionnel au nombre de points
+
+        Parameters
+        ----------
+        etendue : tuple of float
+            (x_min, x_max, y_min, y_max) de l'image (m)
+        n_bins : tuple of int
+            Nombre de pixels selon x et selon y
+        """
+        self.etendue = tuple(float(e) for e in etendue)
+        self.n_bins = tuple(int(n) for n in n_bins)
+        self.comptes = np.zeros(self.n_bins[0] * self.n_bins[1], dtype=np.int64)
+        self.n_points = 0 # Points comptés dans l'image
+        self.hors_image = 0 # Points finis hors de l'étendue
+        self.n_ions = 0
+        self.n_contact = 0
+
+    def ajouter(self, x : np.ndarray, y : np.ndarray) -> None :
+        """
+        Ajoute des points de trajectoire (les points non finis sont ignorés)
+
+        Parameters
+        ----------
+        x, y : numpy.ndarray
+            Coordonnées des points (m)
+        """
+        x_min, x_max, y_min, y_max = self.etendue
+        nx, ny = self.n_bins
+        x, y = x.ravel(), y.ravel()
+        with np.errstate(invalid='ignore') :
+            i = np.floor((x - x_min) * (nx / (x_max - x_min)))
+            j = np.floor((y - y_min) * (ny / (y_max - y_min)))
+            dedans = (i >= 0) & (i < nx) & (j >= 0) & (j < ny)
+        n_dedans = int(np.count_nonzero(dedans))
+        self.comptes += np.bincount(j[dedans].astype(np.intp) * nx + i[dedans].astype(np.intp), minlength=nx * ny)
+        self.n_points += n_dedans
+        self.hors_image += int(np.count_nonzero(np.isfinite(x) & np.isfinite(y))) - n_dedans
+
+    @property
+    def image(self) -> np.ndarray :
+        """Nombre de points par pixel, de forme (ny, nx) (ligne 0 en bas, pour imshow avec origin='lower')"""
+        return self.comptes.reshape(self.n_bins[1], self.n_bins[0])
+
+
+def _fractions_aleatoires(n : int, n_points : int, rng : np.random.Generator) -> np.ndarray :
+    """Fractions du parcours échantillonnées : n_points intervalles réguliers, décalés aléatoirement pour chaque ion (pas de motif dans l'image)"""
+    return (np.arange(n_points) + rng.random((n, 1))) / n_points
+
+
+def iterer_densite_electrique(source : source_ions, masses_charges_particules : list[tuple[float, float]], potentiel : float, n_ions : int = 1_000_000,
+                              proportions : list[float] = None, n_points : int = 32, etendue : tuple = None, n_bins : tuple[int, int] = (480, 360),
+                              taille_lot : int = 100_000, graine : int = None) :
+    """
+    Accumule lot par lot l'image de densité des trajectoires d'un faisceau tiré depuis la source dans la partie électrique.
+    Générateur : l'image est renvoyée après chaque lot, ce qui permet à l'interface de l'afficher au fur et à mesure.
+
+    Parameters
+    ----------
+    source : source_ions
+        Source du faisceau
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce
+    potentiel : float
+        Différence de potentiel entre les plaques (en V), la distance entre plaques étant la hauteur nominale
+    n_ions : int
+        Nombre total d'ions
+    proportions : list of float
+        Proportion de chaque espèce dans le faisceau (uniforme par défaut)
+    n_points : int
+        Nombre de points par trajectoire
+    etendue : tuple of float
+        (x_min, x_max, y_min, y_max) de l'image (m), par défaut déduite du premier lot
+    n_bins : tuple of int
+        Nombre de pixels selon x et selon y
+    taille_lot : int
+        Nombre d'ions calculés à la fois (mémoire proportionnelle à taille_lot * n_points)
+    graine : int
+        Graine du générateur aléatoire
+
+    Yields
+    ------
+    image_densite
+        Image accumulée sur les lots déjà calculés
+    """
+    rng = np.random.default_rng(graine)
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    E = deviation.champ_electrique_v2(source.height, potentiel)
+    image = None
+
+    for debut in range(0, n_ions, taille_lot) :
+        n = min(taille_lot, n_ions - debut)
+        especes = _tirer_especes(n, len(masses_charges), proportions, rng)
+        masses_u, charges_e = masses_charges[especes, 0], masses_charges[especes, 1]
+        v0, angles, hauteurs = source.echantillonner(masses_u, rng)
+        angles = np.where((angles > 0) & (angles < np.pi / 2) & (hauteurs > 0), angles, np.nan) # Tirages hors du domaine du modèle : perdus
+        xs = deviation.calculer_faisceau(masses_u, charges_e, v0, angles, hauteurs, E)['xs']
+        contact = np.isfinite(xs) & (xs > 0)
+        if image is None :
+            if etendue is None :
+                x_max = 1.1 * np.max(xs[contact]) if np.any(contact) else 2 * source.height
+                etendue = (0.0, x_max, 0.0, 1.1 * np.nanmax(hauteurs))
+            image = image_densite(etendue, n_bins)
+
+        # Trajectoires jusqu'au contact, ou jusqu'au bord droit de l'image sans contact
+        x = np.where(contact, xs, image.etendue[1])[:, None] * _fractions_aleatoires(n, n_points, rng)
+        mq = masses_u * constants.u / (charges_e * constants.e)
+        X = x / (v0 * np.sin(angles))[:, None]
+        y = (0.5 * (E / mq)[:, None] * X - (v0 * np.cos(angles))[:, None]) * X + hauteurs[:, None]
+        image.ajouter(x, y)
+        image.n_ions += n
+        image.n_contact += int(np.count_nonzero(contact))
+        yield image
+
+
+def iterer_densite_magnetique(source : source_ions, masses_charges_particules : list[tuple[float, float]], Bz : float, x_detecteur : float, n_ions : int = 1_000_000,
+                              proportions : list[float] = None, n_points : int = 32, etendue : tuple = None, n_bins : tuple[int, int] = (480, 360),
+                              taille_lot : int = 100_000, graine : int = None, detecteurs_symetriques : bool = False) :
+    """
+    Accumule lot par lot l'image de densité des trajectoires d'un faisceau (dispersion en vitesse) dans la partie magnétique
+
+    Parameters
+    ----------
+    source : source_ions
+        Source du faisceau (seule la loi de vitesse est utilisée : les ions partent de l'origine selon +y)
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque espèce
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    n_ions, proportions, n_points, etendue, n_bins, taille_lot, graine :
+        Voir iterer_densite_electrique
+    detecteurs_symetriques : bool
+        True pour un détecteur de chaque côté de l'axe, en ±x_detecteur (voir partie_electroaimant.detecteur_du_cote)
+
+    Yields
+    ------
+    image_densite
+        Image accumulée sur les lots déjà calculés
+    """
+    rng = np.random.default_rng(graine)
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    # Abscisse du détecteur de chaque espèce (le signe de R est celui de q Bz, indépendant de la vitesse)
+    x_especes = partie_electroaimant.detecteur_du_cote(masses_charges[:, 1], Bz, x_detecteur) if detecteurs_symetriques else np.full(len(masses_charges), float(x_detecteur))
+    image = None
+
+    for debut in range(0, n_ions, taille_lot) :
+        n = min(taille_lot, n_ions - debut)
+        especes = _tirer_especes(n, len(masses_charges), proportions, rng)
+        masses_u, charges_e, x_cibles = masses_charges[especes, 0], masses_charges[especes, 1], x_especes[especes]
+        rayon = masses_u * constants.u * source.tirer_vitesses(masses_u, rng) / (charges_e * constants.e * Bz)
+        cote_detecteur = rayon * x_cibles > 0 # Rayon signé : l'ion tourne vers x > 0 si q Bz > 0, vers x < 0 sinon
+        contact = cote_detecteur & (2 * np.abs(rayon) >= abs(x_detecteur))
+        if image is None :
+            if etendue is None :
+                # Point le plus haut de chaque arc du côté du détecteur : sommet (|x| = |R|) s'il est avant le détecteur, impact sinon
+                with np.errstate(invalid='ignore') :
+                    y_haut = np.where(abs(x_detecteur) >= np.abs(rayon), np.abs(rayon), np.sqrt(abs(x_detecteur) * (2 * np.abs(rayon) - abs(x_detecteur))))
+                y_haut = np.where(cote_detecteur, y_haut, np.nan)
+                etendue = (min(0.0, float(np.min(x_especes))), max(0.0, float(np.max(x_especes))), 0.0,
+                           1.1 * np.nanmax(y_haut) if np.any(np.isfinite(y_haut)) else abs(float(x_detecteur)))
+            image = image_densite(etendue, n_bins)
+
+        # Arcs jusqu'au détecteur, ou jusqu'au demi-tour (x = 2R) sans contact, du côté donné par le signe de R
+        x_fin = np.where(cote_detecteur, np.minimum(abs(x_detecteur), 2 * np.abs(rayon)), 2 * np.abs(rayon)) * np.sign(rayon)
+        x = x_fin[:, None] * _fractions_aleatoires(n, n_points, rng)
+        y = np.sqrt(np.maximum(x * (2 * rayon[:, None] - x), 0))
+        image.ajouter(x, y)
+        image.n_ions += n
+        image.n_contact += int(np.count_nonzero(contact))
+        yield image
+
+
+def image_densite_electrique(*args, **kwargs) -> image_densite :
+    """Image de densité complète (voir iterer_densite_electrique pour les paramètres)"""
+    for image in iterer_densite_electrique(*args, **kwargs) : pass
+    return image
+
+
+def image_densite_magnetique(*args, **kwargs) -> image_densite :
+    """Image de densité complète (voir iterer_densite_magnetique pour les paramètres)"""
+    for image in iterer_densite_magnetique(*args, **kwargs) : pass
+    return image
+
+
+def tracer_densite(image : image_densite, titre : str = "Densité des trajectoires", create_plot : bool = True, ax = None, artiste = None) :
+    """
+    Affiche l'image de densité avec imshow (échelle logarithmique, pixels vides transparents)
+
+    Parameters
+    ----------
+    image : image_densite
+        Image à afficher
+    titre : str
+        Titre du graphique
+    create_plot : bool
+        True s'il faut créer une figure et l'afficher, False sinon (ax est alors nécessaire)
+    ax : matplotlib.axes.Axes
+        Axe sur lequel tracer (uniquement si create_plot = False)
+    artiste : matplotlib.image.AxesImage
+        Image renvoyée par un appel précédent : seules ses données sont remplacées (mise à jour rapide pendant l'accumulation)
+
+    Returns
+    -------
+    matplotlib.image.AxesImage
+        Image affichée
+    """
+    donnees = np.ma.masked_equal(np.log10(1 + image.image), 0)
+    maximum = max(float(donnees.max()), 1.0) if donnees.count() else 1.0
+    if artiste is not None :
+        artiste.set_data(donnees); artiste.set_clim(0, maximum)
+        return artiste
+    if create_plot or ax is None : fig, ax = plt.subplots(figsize=(10, 8))
+    artiste = ax.imshow(donnees, origin='lower', extent=image.etendue, aspect='auto', cmap='inferno_r', interpolation='nearest', vmin=0, vmax=maximum)
+    cax = ax.inset_axes([0.65, 0.93, 0.3, 0.025]) # Axe enfant : effacé avec ax.cla()
+    barre = ax.figure.colorbar(artiste, cax=cax, orientation='horizontal')
+    barre.set_label('log10(1 + points par pixel)', fontsize=8); barre.ax.tick_params(labelsize=8)
+    ax.set_xlabel("Position x (m)")
+    ax.set_ylabel("Position y (m)")
+    ax.set_title(titre)
+    ax.grid(True, linestyle='--', alpha=0.4)
+    if create_plot : plt.show()
+    return artiste
+
+
+'''
+Test : spot d'impact de 10^7 ions avec dispersion en énergie et émittance
+'''
+if __name__ == '__main__' :
+    import time
+    source = source_ions(1e5, np.pi / 6, 0.05, loi_vitesse='maxwell_boltzmann', dispersion_energie=5, loi_emittance='ellipse', emittance=1e-6, alpha=0.5, beta=0.05)
+    t0 = time.perf_counter()
+    resultats = simuler_spot_electrique(source, [(1, 1), (2, 1), (16, 1)], -5000, n_ions=10_000_000, graine=0)
+    print(f"10^7 ions (partie électrique) : {time.perf_counter() - t0:.2f} s")
+    tracer_spots(resultats, ['H+', 'D+', 'O+'], titre="Spot sur l'échantillon")
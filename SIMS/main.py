@@ -1,6 +1,6 @@
 import sys, os
 import tkinter as tk
-from tkinter import ttk, messagebox, font, Listbox
+from tkinter import ttk, messagebox, font, filedialog, Listbox
 import numpy as np
 import scipy.constants as constants
 import matplotlib.pyplot as plt
@@ -9,8 +9,10 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolb
 folder = os.path.dirname(os.path.abspath(__file__))
 path_partie_bleue = os.path.abspath(os.path.join(folder, "deviation_electrique", "Code"))
 path_partie_verte = os.path.abspath(os.path.join(folder, "deviation_magnetique", "Code"))
+path_outils = os.path.abspath(os.path.join(folder, "outils", "Code"))
+path_faisceau = os.path.abspath(os.path.join(folder, "faisceau", "Code"))
 
-paths_to_add = [path_partie_bleue, path_partie_verte]
+paths_to_add = [path_partie_bleue, path_partie_verte, path_outils, path_faisceau]
 for pth in paths_to_add:
     if os.path.isdir(pth) and pth not in sys.path:
         sys.path.append(pth)
@@ -22,6 +24,11 @@ if folder not in sys.path:
 try:
     import deviation as deviation # type : ignore
     import partie_electroaimant as partie_electroaimant# type : ignore
+    import resolution as resolution # type : ignore
+    import session as session # type : ignore
+    import particules as particules # type : ignore
+    import source as source # type : ignore
+    import animation as animation # type : ignore
     print("Modules de simulation importés.")
 except ImportError as e:
     print(f"ERREUR FATALE d'importation: {e}")
@@ -37,6 +44,137 @@ except Exception as e_other:
      sys.exit(1)
 
 
+class ListeParticulesVirtuelle(ttk.Frame):
+    """
+    Liste de particules virtualisée : le Treeview ne contient que les lignes visibles, dont le contenu est
+    réécrit au défilement. Les particules sont lues dans une particules.liste_particules, triées par m/q et
+    filtrées par nom et par intervalle de m/q ; la sélection est gardée sous forme d'identifiants.
+    """
+    def __init__(self, parent, liste, hauteur=8, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.liste = liste; self.hauteur = hauteur
+        self.ids_filtres = np.empty(0, dtype=np.intp) # Identifiants affichables, triés par m/q
+        self.debut = 0 # Position de la première ligne visible dans ids_filtres
+        self._selection = set()
+        self._filtre_differe = None
+
+        filtre_frame = ttk.Frame(self); filtre_frame.pack(fill=tk.X, pady=(0, 3))
+        filtre_frame.columnconfigure(1, weight=1); filtre_frame.columnconfigure(3, weight=1); filtre_frame.columnconfigure(5, weight=1)
+        self.filtre_nom_var = tk.StringVar(); self.mq_min_var = tk.StringVar(); self.mq_max_var = tk.StringVar(); self.aller_mq_var = tk.StringVar()
+        ttk.Label(filtre_frame, text="Nom :").grid(row=0, column=0, sticky=tk.W)
+        nom_entry = ttk.Entry(filtre_frame, textvariable=self.filtre_nom_var); nom_entry.grid(row=0, column=1, columnspan=5, sticky="ew", padx=5, pady=1)
+        ttk.Label(filtre_frame, text="m/q min :").grid(row=1, column=0, sticky=tk.W)
+        min_entry = ttk.Entry(filtre_frame, textvariable=self.mq_min_var, width=7); min_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=1)
+        ttk.Label(filtre_frame, text="max :").grid(row=1, column=2, sticky=tk.W)
+        max_entry = ttk.Entry(filtre_frame, textvariable=self.mq_max_var, width=7); max_entry.grid(row=1, column=3, sticky="ew", padx=5, pady=1)
+        ttk.Label(filtre_frame, text="Aller à m/q :").grid(row=1, column=4, sticky=tk.W)
+        aller_entry = ttk.Entry(filtre_frame, textvariable=self.aller_mq_var, width=7); aller_entry.grid(row=1, column=5, sticky="ew", padx=5, pady=1)
+        for entry in (nom_entry, min_entry, max_entry): entry.bind("<KeyRelease>", self._filtre_modifie)
+        aller_entry.bind("<Return>", self._aller_a_mq)
+
+        tree_frame = ttk.Frame(self); tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(tree_frame, columns=('Name', 'Mass (u)', 'Charge (e)', 'm/q'), show='headings', height=hauteur, selectmode='extended')
+        self.tree.heading('Name', text='Nom'); self.tree.column('Name', width=100, anchor=tk.CENTER)
+        self.tree.heading('Mass (u)', text='Masse (u)'); self.tree.column('Mass (u)', width=80, anchor=tk.CENTER)
+        self.tree.heading('Charge (e)', text='Charge (e)'); self.tree.column('Charge (e)', width=70, anchor=tk.CENTER)
+        self.tree.heading('m/q', text='m/q (u/e)'); self.tree.column('m/q', width=80, anchor=tk.CENTER)
+        self.items = [self.tree.insert('', tk.END, values=('', '', '', '')) for _ in range(hauteur)]
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self._defiler)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<ButtonPress-1>", self._clic)
+        self.tree.bind("<<TreeviewSelect>>", self._selection_modifiee)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"): self.tree.bind(sequence, self._molette)
+
+        bas_frame = ttk.Frame(self); bas_frame.pack(fill=tk.X, pady=(3, 0))
+        self.compte_var = tk.StringVar(value="0 particule")
+        ttk.Label(bas_frame, textvariable=self.compte_var).pack(side=tk.LEFT)
+        ttk.Button(bas_frame, text="Aucune", command=self.deselectionner).pack(side=tk.RIGHT)
+        ttk.Button(bas_frame, text="Tout sélectionner", command=self.tout_selectionner).pack(side=tk.RIGHT, padx=5)
+
+    @staticmethod
+    def _lire_nombre(var):
+        try: return float(var.get().strip().replace(',', '.'))
+        except ValueError: return None
+
+    def rafraichir(self):
+        """Recalcule la liste filtrée (après un ajout, une suppression ou un changement de filtre) et réaffiche."""
+        self._filtre_differe = None
+        self.ids_filtres = self.liste.rechercher(self.filtre_nom_var.get().strip(), self._lire_nombre(self.mq_min_var), self._lire_nombre(self.mq_max_var))
+        self._selection = {i for i in self._selection if self.liste.est_active(i)}
+        self._afficher()
+
+    def _afficher(self):
+        n = len(self.ids_filtres)
+        self.debut = max(0, min(self.debut, n - self.hauteur))
+        visibles = self.ids_filtres[self.debut:self.debut + self.hauteur].tolist()
+        items_selectionnes = []
+        for k, item in enumerate(self.items):
+            if k < len(visibles):
+                masse, charge, nom = self.liste.particule(visibles[k])
+                self.tree.item(item, values=(nom, f"{masse:.3f}", f"{charge:+.2f}", f"{masse / abs(charge):.3f}"))
+                if visibles[k] in self._selection: items_selectionnes.append(item)
+            else: self.tree.item(item, values=('', '', '', ''))
+        self.tree.selection_set(items_selectionnes)
+        if n > self.hauteur: self.scrollbar.set(self.debut / n, (self.debut + self.hauteur) / n)
+        else: self.scrollbar.set(0, 1)
+        self._afficher_compte()
+
+    def _afficher_compte(self):
+        n = len(self.ids_filtres); total = len(self.liste)
+        self.compte_var.set(f"{n} / {total} particule(s), {len(self._selection)} sélectionnée(s)" if n != total else f"{total} particule(s), {len(self._selection)} sélectionnée(s)")
+
+    def _defiler(self, *args):
+        n = len(self.ids_filtres)
+        if args[0] == 'moveto': self.debut = int(round(float(args[1]) * n))
+        elif args[0] == 'scroll': self.debut += int(args[1]) * (self.hauteur if args[2] == 'pages' else 1)
+        self._afficher()
+
+    def _molette(self, event):
+        if event.num == 5 or event.delta < 0: self._defiler('scroll', 3, 'units')
+        elif event.num == 4 or event.delta > 0: self._defiler('scroll', -3, 'units')
+        return "break" # Ne pas faire défiler le panneau de contrôle
+
+    def _clic(self, event):
+        # Un clic sans Ctrl ni Maj remplace la sélection, y compris les lignes hors de la vue
+        if not event.state & 0x0005: self._selection.clear()
+
+    def _selection_modifiee(self, event=None):
+        choisis = set(self.tree.selection())
+        for item, identifiant in zip(self.items, self.ids_filtres[self.debut:self.debut + self.hauteur].tolist()):
+            if item in choisis: self._selection.add(identifiant)
+            else: self._selection.discard(identifiant)
+        self._afficher_compte() # Pas de selection_set ici : il redéclencherait <<TreeviewSelect>>
+
+    def _filtre_modifie(self, event=None):
+        if self._filtre_differe is not None: self.after_cancel(self._filtre_differe)
+        self._filtre_differe = self.after(150, self.rafraichir)
+
+    def _aller_a_mq(self, event=None):
+        mq = self._lire_nombre(self.aller_mq_var)
+        position = self.liste.position_mq(self.ids_filtres, mq) if mq is not None else -1
+        if position < 0: return
+        self._selection = {int(self.ids_filtres[position])}
+        self.debut = position - self.hauteur // 2
+        self._afficher()
+
+    def voir(self, identifiant):
+        """Fait défiler la liste jusqu'à la particule (si elle passe le filtre)."""
+        position = np.flatnonzero(self.ids_filtres == identifiant)
+        if len(position) and not (self.debut <= position[0] < self.debut + self.hauteur):
+            self.debut = int(position[0]) - self.hauteur // 2
+            self._afficher()
+
+    def selection(self):
+        """Identifiants des particules sélectionnées (y compris hors de la vue)."""
+        return np.array(sorted(self._selection), dtype=np.intp)
+
+    def tout_selectionner(self):
+        self._selection = set(self.ids_filtres.tolist()); self._afficher()
+
+    def deselectionner(self):
+        self._selection.clear(); self._afficher()
+
+
 class ParticleApp:
     def __init__(self, root):
         self.root = root
@@ -57,13 +195,19 @@ class ParticleApp:
         style.configure("LanAct.TButton", padding=2, font=('Segoe UI', 9), background="#e8f4ea")
 
         # --- Données ---
-        self.particles_data = [] # Liste de tuples (masse_u: float, charge_e: float)
-        self.particle_names = [] # Liste parallèle pour stocker les noms/formules
+        self.particules = particules.liste_particules() # Masses, charges et noms (voir les propriétés particles_data et particle_names)
 
         # --- Données spécifiques à l'onglet Potentiel ---
-        self.selected_potential_particle_index = None 
+        self.selected_potential_particle_id = None # Identifiant dans self.particules
         self.selected_potential_particle_name = None
 
+        # --- Image de densité en cours d'accumulation (un lot par passage dans la boucle Tk) ---
+        self._densite_tache = None
+
+        # --- Lecture animée du vol (paramètres du dernier tracé réussi) ---
+        self._animation = None
+        self._parametres_vol = None
+
         # --- Structure Principale et Panneau de Contrôle Scrollable ---
         main_paned_window = ttk.PanedWindow(root, orient=tk.HORIZONTAL)
         main_paned_window.pack(fill=tk.BOTH, expand=True)
@@ -120,12 +264,32 @@ class ParticleApp:
         toolbar.update()
         toolbar.pack(side=tk.BOTTOM, fill=tk.X)
 
+        # --- Menu Fichier (sessions et import) ---
+        menu_bar = tk.Menu(root)
+        menu_fichier = tk.Menu(menu_bar, tearoff=0)
+        menu_fichier.add_command(label="Ouvrir une session...", command=self.ouvrir_session)
+        menu_fichier.add_command(label="Enregistrer la session...", command=self.enregistrer_session)
+        menu_fichier.add_separator()
+        menu_fichier.add_command(label="Importer des particules (CSV)...", command=self.importer_particules_csv)
+        menu_bar.add_cascade(label="Fichier", menu=menu_fichier)
+        root.config(menu=menu_bar)
+
         # --- Barre de Statut ---
         self.status_var = tk.StringVar()
         self.status_var.set("Prêt.")
         status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
+    @property
+    def particles_data(self):
+        """Liste de tuples (masse_u: float, charge_e: float), recalculée seulement après une modification"""
+        return self.particules.donnees()
+
+    @property
+    def particle_names(self):
+        """Liste parallèle des noms/formules"""
+        return self.particules.noms()
+
     def _bind_mousewheel(self, enter):
         """Lie ou délie les événements de molette pour le canvas."""
         if enter:
@@ -227,16 +391,8 @@ class ParticleApp:
         create_molecule_btn = ttk.Button(parent, text="Construire une Particule...", command=self.ouvrir_fenetre_tp)
         create_molecule_btn.pack(pady=(5, 10), padx=10, fill=tk.X)
 
-        tree_frame = ttk.Frame(parent); tree_frame.pack(pady=5, padx=10, fill=tk.BOTH, expand=True, ipady=10)
-        self.particle_tree = ttk.Treeview(tree_frame, columns=('Name', 'Mass (u)', 'Charge (e)'), show='headings', height=6)
-        self.particle_tree.heading('Name', text='Nom'); self.particle_tree.column('Name', width=100, anchor=tk.CENTER)
-        self.particle_tree.heading('Mass (u)', text='Masse (u)'); self.particle_tree.column('Mass (u)', width=100, anchor=tk.CENTER)
-        self.particle_tree.heading('Charge (e)', text='Charge (e)'); self.particle_tree.column('Charge (e)', width=100, anchor=tk.CENTER)
-        scrollbar_tree = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.particle_tree.yview)
-        self.particle_tree.configure(yscrollcommand=scrollbar_tree.set)
-        self.particle_tree.bind("<MouseWheel>", lambda e: self._on_mousewheel(e))
-        self.particle_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar_tree.pack(side=tk.RIGHT, fill=tk.Y)
+        self.particle_list = ListeParticulesVirtuelle(parent, self.particules, hauteur=8)
+        self.particle_list.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
 
         remove_btn = ttk.Button(parent, text="Supprimer Sélection", command=self.remove_particle)
         remove_btn.pack(pady=5, padx=10, fill=tk.X)
@@ -358,66 +514,103 @@ class ParticleApp:
         except Exception as e: messagebox.showerror("Erreur", f"Erreur inattendue: {e}")
 
     def _add_particle_to_list(self, mass_u, charge_e, particle_name):
+        parent_win = getattr(self, 'molecule_fenetre', self.root)
+        if not parent_win.winfo_exists(): parent_win = self.root
         try:
-            if mass_u <= 0: raise ValueError("Masse > 0.")
-            if charge_e == 0: raise ValueError("Charge != 0.")
-            current_sign = np.sign(charge_e)
-            if self.particles_data:
-                existing_sign = np.sign(self.particles_data[0][1])
-                if current_sign != existing_sign: raise ValueError("Charges de même signe requises.")
-
-            particle_info = (round(mass_u, 5), round(charge_e, 5))
-            existing_particles = [(round(p[0], 5), round(p[1], 5)) for p in self.particles_data]
-
-            if particle_info not in existing_particles:
-                self.particles_data.append((mass_u, charge_e))
-                self.particle_names.append(particle_name)
-                self.particle_tree.insert('', tk.END, values=(particle_name, f"{mass_u:.3f}", f"{charge_e:+.2f}"))
-                self.status_var.set(f"{particle_name} ajoutée.")
-                self._reset_potential_selection() # Réinitialiser au cas où
-                return True
-            else:
-                parent_win = getattr(self, 'molecule_fenetre', self.root)
+            if mass_u > 0 and charge_e != 0 and self.particules.contient(mass_u, charge_e):
                 messagebox.showwarning("Doublon", f"Particule déjà listée.", parent=parent_win)
                 return False
+            identifiant = self.particules.ajouter(mass_u, charge_e, particle_name)
+            self.particle_list.rafraichir(); self.particle_list.voir(identifiant)
+            self.status_var.set(f"{particle_name} ajoutée.")
+            self._reset_potential_selection() # Réinitialiser au cas où
+            return True
         except ValueError as e:
-            parent_win = getattr(self, 'molecule_fenetre', self.root)
-            if parent_win.winfo_exists(): messagebox.showerror("Erreur Validation", f"{e}", parent=parent_win)
-            else: messagebox.showerror("Erreur Validation", f"{e}")
+            messagebox.showerror("Erreur Validation", f"{e}", parent=parent_win)
             return False
         except Exception as e:
-             parent_win = getattr(self, 'molecule_fenetre', self.root)
-             if parent_win.winfo_exists(): messagebox.showerror("Erreur Inattendue", f"{e}", parent=parent_win)
-             else: messagebox.showerror("Erreur Inattendue", f"{e}")
-             return False
+            messagebox.showerror("Erreur Inattendue", f"{e}", parent=parent_win)
+            return False
 
     def remove_particle(self):
-        selected_items = self.particle_tree.selection()
-        if not selected_items: return
-        if len(selected_items) > 1 and not messagebox.askyesno("Confirmation", f"Supprimer {len(selected_items)} particules ?"): return
-
-        indices_to_remove = []
-        items_to_remove_tree = []
-        for item_id in selected_items:
-            try: indices_to_remove.append(self.particle_tree.index(item_id)); items_to_remove_tree.append(item_id)
-            except tk.TclError: pass
-
-        indices_to_remove.sort(reverse=True)
-        deleted_count = 0
-        for index in indices_to_remove:
-            try:
-                if self.selected_potential_particle_index == index: self._reset_potential_selection()
-                del self.particles_data[index]; del self.particle_names[index]; deleted_count += 1
-                if self.selected_potential_particle_index is not None and index < self.selected_potential_particle_index:
-                    self.selected_potential_particle_index -= 1
-            except IndexError: pass
-
-        for item_id in items_to_remove_tree:
-            if self.particle_tree.exists(item_id): self.particle_tree.delete(item_id)
-
+        ids = self.particle_list.selection()
+        if len(ids) == 0: return
+        if len(ids) > 1 and not messagebox.askyesno("Confirmation", f"Supprimer {len(ids)} particules ?"): return
+        if self.selected_potential_particle_id in ids: self._reset_potential_selection()
+        deleted_count = self.particules.supprimer(ids)
+        self.particle_list.rafraichir()
         self.status_var.set(f"{deleted_count} particule(s) supprimée(s).")
         self._update_potential_tab_state()
 
+    def _ajouter_particules_en_bloc(self, masses_u, charges_e, noms):
+        """Ajoute d'un coup une liste de particules (validation vectorisée, pas de fenêtre par particule). Renvoie le nombre ajouté et les rejets."""
+        ids, rejets = self.particules.ajouter_en_bloc(masses_u, charges_e, noms)
+        self.particle_list.rafraichir()
+        if len(ids): self._reset_potential_selection()
+        return len(ids), rejets
+
+    def _vider_particules(self):
+        self.particules.vider()
+        self.particle_list.rafraichir()
+        self._reset_potential_selection()
+
+    # --- Sessions (particules + réglages) ---
+    def _variables_session(self):
+        """Variables Tk enregistrées dans une session : géométrie, champs, limites et positions des sliders, options."""
+        noms = ['x_detecteur_var', 'dynamic_trace_var', 'v0_mag_var', 'bz_mag_var', 'bz_min_var', 'bz_max_var', 'bz_var', 'v0_min_var', 'v0_max_var', 'v0_var', 'hauteur_detecteur_var',
+                'angle_var', 'dist_var', 'show_uncertainty_var', 'delta_v0_percent_var', 'delta_theta_percent_var', 'delta_h_percent_var', 'delta_E_percent_var',
+                'dynamic_elec_var', 'v0_elec_var', 'diff_pot_var', 'elec_v0_min_var', 'elec_v0_max_var', 'v0_var_elec', 'diff_pot_min_var', 'diff_pot_max_var', 'pot_var',
+                'angle_pot_var', 'dist_pot_var', 'v0_pot_var', 'show_uncertainty_pot_var', 'delta_v0_percent_pot_var', 'delta_theta_percent_pot_var', 'delta_h_percent_pot_var', 'delta_E_percent_pot_var', 'pot1_var', 'pot2_var']
+        return {nom: getattr(self, nom) for nom in noms if hasattr(self, nom)}
+
+    def _appliquer_limites_sliders(self):
+        """Recale les bornes des sliders sur les limites saisies (valeurs illisibles ignorées)."""
+        for slider, var_min, var_max in [(self.bz_slider, self.bz_min_var, self.bz_max_var), (self.v0_slider, self.v0_min_var, self.v0_max_var),
+                                         (self.v0_slider_elec, self.elec_v0_min_var, self.elec_v0_max_var), (self.pot_slider, self.diff_pot_min_var, self.diff_pot_max_var)]:
+            try: slider.config(from_=float(var_min.get().strip().replace(',', '.')), to=float(var_max.get().strip().replace(',', '.')))
+            except (ValueError, tk.TclError): pass
+        self._update_bz_label(); self._update_v0_label(); self._update_pot_label(); self._update_v0_label_elec()
+
+    def enregistrer_session(self):
+        chemin = filedialog.asksaveasfilename(parent=self.root, title="Enregistrer la session", defaultextension=".sims", filetypes=[("Session SIMS", "*.sims"), ("Tous les fichiers", "*.*")])
+        if not chemin: return
+        try:
+            reglages = {nom: var.get() for nom, var in self._variables_session().items()}
+            session.sauvegarder_session(chemin, self.particules.masses, self.particules.charges, self.particle_names, reglages)
+            self.status_var.set(f"Session enregistrée ({len(self.particules)} particules) : {os.path.basename(chemin)}")
+        except (OSError, ValueError) as e: messagebox.showerror("Erreur Session", f"Enregistrement impossible : {e}", parent=self.root)
+
+    def ouvrir_session(self):
+        chemin = filedialog.askopenfilename(parent=self.root, title="Ouvrir une session", filetypes=[("Session SIMS", "*.sims"), ("Tous les fichiers", "*.*")])
+        if not chemin: return
+        try:
+            masses, charges, noms, reglages = session.charger_session(chemin)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Erreur Session", f"Lecture impossible : {e}", parent=self.root); return
+        variables = self._variables_session()
+        for nom, valeur in reglages.items():
+            if nom in variables:
+                try: variables[nom].set(valeur)
+                except tk.TclError: pass
+        self._appliquer_limites_sliders()
+        self.toggle_dynamic_inputs(); self.toggle_dynamic_electric(); self.toggle_uncertainty_inputs()
+        self._vider_particules()
+        n_ajoutees, _ = self._ajouter_particules_en_bloc(masses, charges, noms)
+        self.status_var.set(f"Session chargée ({n_ajoutees} particules) : {os.path.basename(chemin)}")
+
+    def importer_particules_csv(self):
+        chemin = filedialog.askopenfilename(parent=self.root, title="Importer des particules", filetypes=[("CSV", "*.csv *.txt"), ("Tous les fichiers", "*.*")])
+        if not chemin: return
+        try:
+            masses, charges, noms = session.importer_csv_particules(chemin)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erreur Import", f"{e}", parent=self.root); return
+        self.status_var.set(f"Import de {len(masses)} particules..."); self.root.update_idletasks()
+        n_ajoutees, rejets = self._ajouter_particules_en_bloc(masses, charges, noms)
+        message = f"{n_ajoutees} particule(s) importée(s)."
+        if any(rejets.values()): message += f" Rejetées : {rejets['invalides']} invalide(s), {rejets['doublons']} doublon(s)."
+        self.status_var.set(message)
+
     # --- Widgets Onglet Magnétique ---
     def create_magnetic_widgets(self, parent):
         frame = ttk.Frame(parent, padding="10"); frame.pack(fill=tk.BOTH, expand=True)
@@ -452,13 +645,47 @@ class ParticleApp:
         self.v0_label_var = tk.StringVar(value=f"{self.v0_var.get():.2e} m/s")
         ttk.Label(self.slider_frame_v0, textvariable=self.v0_label_var, width=12).pack(side=tk.LEFT)
         apply_limits_btn_dyn = ttk.Button(parent_dyn, text="Appliquer Limites & Tracer", command=self.run_magnetic_simulation); apply_limits_btn_dyn.pack(pady=15)
+        self.hauteur_detecteur_var = tk.StringVar(value="0.1"); self.add_labeled_entry(parent_dyn, "Hauteur détecteur (m):", self.hauteur_detecteur_var).pack(fill=tk.X, pady=3)
+        optimiser_btn = ttk.Button(parent_dyn, text="Optimiser Séparation (Bz, V0)", command=self.optimiser_separation_magnetique); optimiser_btn.pack(pady=(5, 15))
+        self.animer_mag_btn = ttk.Button(frame, text="Animer le Vol", command=self.animer_vol_magnetique); self.animer_mag_btn.pack(pady=5)
+        self.densite_mag_frame = ttk.LabelFrame(frame, text="Image de densité (Monte Carlo)"); self.densite_mag_frame.pack(fill=tk.X, pady=5, padx=5)
+        self.n_ions_mag_var = tk.StringVar(value="1e6"); self.add_labeled_entry(self.densite_mag_frame, "Nombre d'ions:", self.n_ions_mag_var).pack(fill=tk.X, pady=2, padx=5)
+        self.dispersion_energie_mag_var = tk.StringVar(value="5"); self.add_labeled_entry(self.densite_mag_frame, "Dispersion énergie (eV):", self.dispersion_energie_mag_var).pack(fill=tk.X, pady=2, padx=5)
+        ttk.Button(self.densite_mag_frame, text="Tracer la Densité", command=self.run_magnetic_density).pack(pady=5)
         self.toggle_dynamic_inputs()
 
     def toggle_dynamic_inputs(self) :
-        if self.dynamic_trace_var.get(): self.base_inputs_frame.pack_forget(); self.dynamic_inputs_frame.pack(fill=tk.X, pady=5, padx=5)
-        else: self.dynamic_inputs_frame.pack_forget(); self.base_inputs_frame.pack(fill=tk.X, pady=5, padx=5)
+        if self.dynamic_trace_var.get(): self.base_inputs_frame.pack_forget(); self.dynamic_inputs_frame.pack(fill=tk.X, pady=5, padx=5, before=self.animer_mag_btn)
+        else: self.dynamic_inputs_frame.pack_forget(); self.base_inputs_frame.pack(fill=tk.X, pady=5, padx=5, before=self.animer_mag_btn)
         self.root.after(50, self._update_scroll_region_and_bar)
 
+    def optimiser_separation_magnetique(self):
+        """Règle Bz et V0 (dans les limites des sliders) pour maximiser la séparation des spots sur le détecteur."""
+        if len(self.particles_data) < 2:
+            messagebox.showwarning("Optimisation", "Ajoutez au moins deux particules.", parent=self.root); return
+        try:
+            x_detecteur = float(self.x_detecteur_var.get().strip().replace(',', '.'))
+            hauteur_detecteur = float(self.hauteur_detecteur_var.get().strip().replace(',', '.'))
+            bz_min = float(self.bz_min_var.get().strip().replace(',', '.')); bz_max = float(self.bz_max_var.get().strip().replace(',', '.'))
+            v0_min = float(self.v0_min_var.get().strip().replace(',', '.')); v0_max = float(self.v0_max_var.get().strip().replace(',', '.'))
+            if x_detecteur <= 0: raise ValueError("X détecteur > 0.")
+            if hauteur_detecteur <= 0: raise ValueError("Hauteur détecteur > 0.")
+            if bz_min <= 0: raise ValueError("Bz min > 0.")
+            if v0_min <= 0: raise ValueError("V0 min > 0.")
+            self.status_var.set("Optimisation de la séparation..."); self.root.update_idletasks()
+            resultat = resolution.optimiser_separation(self.particles_data, (bz_min, bz_max), (v0_min, v0_max), x_detecteur=x_detecteur, y_max=hauteur_detecteur,
+                                                       detecteurs_symetriques=True)
+            if not resultat['succes']:
+                messagebox.showwarning("Optimisation", "Aucun réglage dans ces limites n'amène toutes les particules sur le détecteur.", parent=self.root)
+                self.status_var.set("Optimisation impossible."); return
+            self.bz_var.set(resultat['Bz']); self._update_bz_label()
+            self.v0_var.set(resultat['v0']); self._update_v0_label()
+            self.run_magnetic_simulation()
+            self.status_var.set(f"Optimum : Bz = {resultat['Bz']:.4f} T, V0 = {resultat['v0']:.3e} m/s, séparation min = {resultat['separation_min']:.2e} m")
+        except ValueError as e:
+            messagebox.showerror("Erreur Paramètre", f"Inv. (Optimisation): {e}", parent=self.root)
+            self.status_var.set(f"Erreur param (Optimisation): {e}")
+
     def _on_bz_slider_change(self, event=None): self._update_bz_label(); self.run_magnetic_simulation(called_by_slider=True)
     def _update_bz_label(self, event=None): self.bz_label_var.set(f"{self.bz_var.get():.3f}\u00A0T") # Espace insécable
     def _on_v0_slider_change(self, event=None): self._update_v0_label(); self.run_magnetic_simulation(called_by_slider=True)
@@ -499,6 +726,12 @@ class ParticleApp:
         ttk.Label(parent_dyn, text="Diff. Potentiel (V):").pack(anchor=tk.W, pady=(5, 0)); self.slider_frame_v = ttk.Frame(parent_dyn); self.slider_frame_v.pack(fill=tk.X, pady=(0, 5)); self.pot_var = tk.DoubleVar(value=-5000)
         self.pot_slider = ttk.Scale(self.slider_frame_v, from_=-10000, to=10000, variable=self.pot_var, command=self._on_pot_slider_change); self.pot_slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10)); self.pot_label_var = tk.StringVar(value=f"{self.pot_var.get():.1f} V"); ttk.Label(self.slider_frame_v, textvariable=self.pot_label_var, width=12).pack(side=tk.LEFT)
         apply_limits_btn_dyn = ttk.Button(parent_dyn, text="Appliquer Limites & Tracer", command=self.run_electric_simulation); apply_limits_btn_dyn.pack(pady=15)
+        densite_frame = ttk.LabelFrame(frame, text="Image de densité (Monte Carlo)"); densite_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=5, padx=5)
+        self.n_ions_elec_var = tk.StringVar(value="1e6"); self.add_labeled_entry(densite_frame, "Nombre d'ions:", self.n_ions_elec_var).pack(fill=tk.X, pady=2, padx=5)
+        self.dispersion_energie_elec_var = tk.StringVar(value="5"); self.add_labeled_entry(densite_frame, "Dispersion énergie (eV):", self.dispersion_energie_elec_var).pack(fill=tk.X, pady=2, padx=5)
+        self.dispersion_angle_elec_var = tk.StringVar(value="1"); self.add_labeled_entry(densite_frame, "Dispersion angle (°):", self.dispersion_angle_elec_var).pack(fill=tk.X, pady=2, padx=5)
+        ttk.Button(densite_frame, text="Tracer la Densité", command=self.run_electric_density).pack(pady=5)
+        ttk.Button(frame, text="Animer le Vol", command=self.animer_vol_electrique).pack(side=tk.BOTTOM, pady=5)
         self.toggle_uncertainty_inputs(); self.toggle_dynamic_electric() # Affichage initial
 
     def toggle_dynamic_electric(self):
@@ -571,7 +804,7 @@ class ParticleApp:
     # --- Gérer affichage état Potentiel + Incertitudes ---
     def _update_potential_tab_state(self):
         """Affiche/cache widgets de l'onglet Potentiel."""
-        if self.selected_potential_particle_index is None:
+        if self.selected_potential_particle_id is None:
             self.pot_controls_frame.pack_forget()
             self.start_pot_sim_button.pack(pady=20, padx=10, fill=tk.X)
         else:
@@ -609,13 +842,13 @@ class ParticleApp:
 
     def _reset_potential_selection(self):
         """Réinitialise la sélection pour l'onglet potentiel."""
-        self.selected_potential_particle_index = None
+        self.selected_potential_particle_id = None
         self.selected_potential_particle_name = None
         self._update_potential_tab_state()
 
     def open_particle_selection_window(self):
         """Ouvre la fenêtre modale pour sélectionner UNE particule."""
-        if not self.particles_data:
+        if not len(self.particules):
             messagebox.showerror("Pas de Particules", "Ajoutez des particules d'abord.", parent=self.root)
             return
 
@@ -631,25 +864,18 @@ class ParticleApp:
         scrollbar.config(command=listbox.yview); scrollbar.pack(side=tk.RIGHT, fill=tk.Y); listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         listbox.bind("<MouseWheel>", lambda e: listbox.yview_scroll(int(-1*(e.delta/120)), "units")) # Scroll listbox
 
-        self.listbox_to_data_index = {}
-        for i, name in enumerate(self.particle_names):
-            mass, charge = self.particles_data[i]
-            display_text = f"{name} (m={mass:.2f}u, q={charge:+.1f}e)"
-            listbox.insert(tk.END, display_text)
-            self.listbox_to_data_index[listbox.size() - 1] = i
+        ids = self.particules.ids() # Ligne i de la listbox -> identifiant ids[i] (insertion en un seul appel)
+        listbox.insert(tk.END, *[f"{name} (m={mass:.2f}u, q={charge:+.1f}e)" for (mass, charge), name in zip(self.particles_data, self.particle_names)])
 
-        if self.selected_potential_particle_index is not None:
-            try:
-                listbox_idx = list(self.listbox_to_data_index.values()).index(self.selected_potential_particle_index)
-                listbox.selection_set(listbox_idx); listbox.activate(listbox_idx); listbox.see(listbox_idx)
-            except ValueError: pass
+        if self.particules.est_active(self.selected_potential_particle_id):
+            listbox_idx = int(np.searchsorted(ids, self.selected_potential_particle_id))
+            listbox.selection_set(listbox_idx); listbox.activate(listbox_idx); listbox.see(listbox_idx)
 
         def confirm():
             selected_indices = listbox.curselection()
             if not selected_indices: messagebox.showwarning("Aucune Sélection", "Sélectionnez une particule.", parent=selection_win); return
-            original_data_index = self.listbox_to_data_index[selected_indices[0]]
-            self.selected_potential_particle_index = original_data_index
-            self.selected_potential_particle_name = self.particle_names[original_data_index]
+            self.selected_potential_particle_id = int(ids[selected_indices[0]])
+            self.selected_potential_particle_name = self.particules.particule(self.selected_potential_particle_id)[2]
             selection_win.destroy()
             self._update_potential_tab_state()
             self.status_var.set(f"Particule '{self.selected_potential_particle_name}' sélectionnée.")
@@ -680,6 +906,7 @@ class ParticleApp:
 
     # Simulation Magnétique
     def run_magnetic_simulation(self, called_by_slider=False):
+        self._arreter_affichages_en_cours()
         if not self.particles_data:
             if not called_by_slider: messagebox.showwarning("Aucune Particule", "Ajoutez des particules.", parent=self.root)
             self.status_var.set("Ajoutez des particules."); self.ax.cla(); self.canvas.draw(); return
@@ -714,9 +941,10 @@ class ParticleApp:
             partie_electroaimant.tracer_ensemble_trajectoires(
                 self.particles_data, 
                 v0, bz, x_detecteur, create_plot=False, ax=self.ax,
-                labels_particules=self.particle_names
+                labels_particules=self.particle_names, detecteurs_symetriques=True
             )
             self.ax.relim(); self.ax.autoscale_view(True, True, True); self.canvas.draw()
+            self._parametres_vol = ('magnetique', (self.particles_data, v0, bz, x_detecteur))
             self.status_var.set("Tracé déviation magnétique terminé.")
         except ValueError as e:
             if not called_by_slider: messagebox.showerror("Erreur Paramètre", f"Inv. (Mag): {e}", parent=self.root)
@@ -728,6 +956,7 @@ class ParticleApp:
 
     # Simulation Électrique Standard
     def run_electric_simulation(self, called_by_slider=False):
+        self._arreter_affichages_en_cours()
         if not self.particles_data:
             if not called_by_slider: messagebox.showwarning("Aucune Particule", "Ajoutez des particules.", parent=self.root)
             self.status_var.set("Ajoutez des particules."); self.ax.cla(); self.canvas.draw(); return
@@ -776,6 +1005,7 @@ class ParticleApp:
                 self.status_var.set("Tracé électrique terminé.")
 
             self.canvas.draw()
+            self._parametres_vol = ('electrique', (masse_charge_list, v0, potentiel, angle_rad, hauteur_initiale))
         except ValueError as e:
             if not called_by_slider: messagebox.showerror("Erreur Paramètre", f"Inv. (Elec): {e}", parent=self.root)
             self.status_var.set(f"Erreur param (Elec): {e}")
@@ -787,7 +1017,8 @@ class ParticleApp:
     # Simulation Comparaison Potentiels 
     def run_potential_comparison_simulation(self, called_by_slider=False):
         """Lance la simulation pour la particule sélectionnée avec deux potentiels."""
-        if self.selected_potential_particle_index is None:
+        self._arreter_affichages_en_cours()
+        if self.selected_potential_particle_id is None:
             if not called_by_slider: messagebox.showerror("Erreur", "Sélectionnez une particule.", parent=self.root)
             self.status_var.set("Sélectionnez une particule.")
             return
@@ -807,12 +1038,12 @@ class ParticleApp:
             if v0 <= 0: raise ValueError("V0 > 0.")
 
             angle_rad = np.radians(angle_deg); hauteur_initiale = hauteur_distance
-            if self.selected_potential_particle_index >= len(self.particles_data):
+            if not self.particules.est_active(self.selected_potential_particle_id):
                 self._reset_potential_selection()
                 messagebox.showerror("Erreur", "La particule sélectionnée n'existe plus. Veuillez resélectionner.")
                 return
-            particle_data = self.particles_data[self.selected_potential_particle_index]
-            particle_name = self.particle_names[self.selected_potential_particle_index]
+            masse, charge, particle_name = self.particules.particule(self.selected_potential_particle_id)
+            particle_data = (masse, charge)
 
             # --- Logique Incertitude ---
             show_uncertainty = self.show_uncertainty_pot_var.get()
@@ -863,6 +1094,99 @@ class ParticleApp:
             import traceback; traceback.print_exc()
             self.status_var.set("Erreur simulation potentiel.")
 
+
+    # Images de densité (Monte Carlo) : accumulées lot par lot pour garder l'interface réactive
+    def _arreter_affichages_en_cours(self):
+        """Arrête l'accumulation d'une image de densité et la lecture animée avant un nouveau tracé"""
+        if self._densite_tache is not None:
+            self.root.after_cancel(self._densite_tache); self._densite_tache = None
+        if self._animation is not None:
+            self._animation.arreter(); self._animation = None
+        self._parametres_vol = None
+
+    def _lancer_densite(self, iterateur, titre):
+        """Affiche l'image après chaque lot de l'itérateur (voir source.iterer_densite_electrique), un lot par passage dans la boucle Tk"""
+        self._arreter_affichages_en_cours()
+        self.ax.cla()
+        etat = {'artiste' : None, 'image' : None}
+        def etape():
+            try:
+                etat['image'] = next(iterateur)
+            except StopIteration:
+                self._densite_tache = None
+                image = etat['image']
+                self.status_var.set(f"Densité terminée : {image.n_ions:.3g} ions, {image.n_contact / max(image.n_ions, 1):.1%} en contact.")
+                return
+            except Exception as e:
+                self._densite_tache = None
+                messagebox.showerror("Erreur", f"Erreur (Densité):\n{type(e).__name__}: {e}", parent=self.root); self.status_var.set("Erreur densité.")
+                return
+            etat['artiste'] = source.tracer_densite(etat['image'], titre=titre, create_plot=False, ax=self.ax, artiste=etat['artiste'])
+            self.canvas.draw_idle()
+            self.status_var.set(f"Densité : {etat['image'].n_ions:.3g} ions accumulés...")
+            self._densite_tache = self.root.after(1, etape)
+        self._densite_tache = self.root.after(1, etape)
+
+    def _lire_parametres_densite(self, n_ions_var, dispersion_energie_var):
+        n_ions = int(float(n_ions_var.get().strip().replace(',', '.')))
+        dispersion_energie = float(dispersion_energie_var.get().strip().replace(',', '.'))
+        if n_ions <= 0: raise ValueError("Nombre d'ions > 0.")
+        if dispersion_energie < 0: raise ValueError("Dispersion énergie >= 0.")
+        return n_ions, dispersion_energie
+
+    def run_magnetic_density(self):
+        if not self.particles_data:
+            messagebox.showwarning("Aucune Particule", "Ajoutez des particules.", parent=self.root); return
+        try:
+            n_ions, dispersion_energie = self._lire_parametres_densite(self.n_ions_mag_var, self.dispersion_energie_mag_var)
+            x_detecteur = float(self.x_detecteur_var.get().strip().replace(',', '.'))
+            if x_detecteur <= 0: raise ValueError("X détecteur > 0.")
+            if self.dynamic_trace_var.get(): v0, bz = self.v0_var.get(), self.bz_var.get()
+            else: v0 = float(self.v0_mag_var.get().strip().replace(',', '.')); bz = float(self.bz_mag_var.get().strip().replace(',', '.'))
+            if v0 <= 0: raise ValueError("V0 > 0.")
+            if bz == 0: raise ValueError("Bz != 0.")
+            src = source.source_ions(v0, loi_vitesse='gaussienne', dispersion_energie=dispersion_energie)
+            iterateur = source.iterer_densite_magnetique(src, self.particles_data, bz, x_detecteur, n_ions=n_ions, detecteurs_symetriques=True)
+            self._lancer_densite(iterateur, f"Densité des trajectoires (Bz = {bz:.3f} T, {n_ions:.3g} ions)")
+        except ValueError as e:
+            messagebox.showerror("Erreur Paramètre", f"Inv. (Densité Mag): {e}", parent=self.root); self.status_var.set(f"Erreur param (Densité Mag): {e}")
+
+    def run_electric_density(self):
+        if not self.particles_data:
+            messagebox.showwarning("Aucune Particule", "Ajoutez des particules.", parent=self.root); return
+        try:
+            n_ions, dispersion_energie = self._lire_parametres_densite(self.n_ions_elec_var, self.dispersion_energie_elec_var)
+            dispersion_angle = float(self.dispersion_angle_elec_var.get().strip().replace(',', '.'))
+            angle_deg = float(self.angle_var.get().strip().replace(',', '.'))
+            hauteur_initiale = float(self.dist_var.get().strip().replace(',', '.'))
+            if hauteur_initiale <= 0 : raise ValueError("Hauteur/Distance > 0.")
+            if not (0 < angle_deg < 90): raise ValueError("0° < Angle < 90°.")
+            if dispersion_angle < 0: raise ValueError("Dispersion angle >= 0.")
+            if self.dynamic_elec_var.get(): v0, potentiel = self.v0_var_elec.get(), self.pot_var.get()
+            else: v0 = float(self.v0_elec_var.get().strip().replace(',', '.')); potentiel = float(self.diff_pot_var.get().strip().replace(',', '.'))
+            if v0 <= 0 : raise ValueError("V0 > 0.")
+            src = source.source_ions(v0, np.radians(angle_deg), hauteur_initiale, loi_vitesse='gaussienne', dispersion_energie=dispersion_energie,
+                                     loi_emittance='gaussienne', dispersion_angle=np.radians(dispersion_angle))
+            iterateur = source.iterer_densite_electrique(src, self.particles_data, potentiel, n_ions=n_ions)
+            self._lancer_densite(iterateur, f"Densité des trajectoires (V = {potentiel:.1f} V, {n_ions:.3g} ions)")
+        except ValueError as e:
+            messagebox.showerror("Erreur Paramètre", f"Inv. (Densité Elec): {e}", parent=self.root); self.status_var.set(f"Erreur param (Densité Elec): {e}")
+
+    # Lecture animée : positions précalculées une fois, images blittées sur le tracé statique
+    def _animer_vol(self, partie, run_simulation):
+        run_simulation()
+        if self._parametres_vol is None or self._parametres_vol[0] != partie: return # Tracé impossible (erreur déjà signalée)
+        if partie == 'electrique': trajets = animation.precalculer_vol_electrique(*self._parametres_vol[1])
+        else: trajets = animation.precalculer_vol_magnetique(*self._parametres_vol[1], detecteurs_symetriques=True)
+        self._animation = animation.animation_vol(self.ax, trajets, duree=5.0)
+        self._animation.demarrer()
+        temps_vol = trajets['temps_vol'][np.isfinite(trajets['temps_vol'])]
+        if len(temps_vol): self.status_var.set(f"Animation : temps de vol de {temps_vol.min() * 1e6:.3f} à {temps_vol.max() * 1e6:.3f} µs (lecture en 5 s).")
+        else: self.status_var.set("Animation : aucune particule n'atteint sa cible.")
+
+    def animer_vol_magnetique(self): self._animer_vol('magnetique', self.run_magnetic_simulation)
+    def animer_vol_electrique(self): self._animer_vol('electrique', self.run_electric_simulation)
+
 # --- Point d'entrée ---
 if __name__ == "__main__":
     root = tk.Tk()
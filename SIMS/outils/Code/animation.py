@@ -0,0 +1,189 @@
+import os, sys, time
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+for pth in [path_partie_bleue, path_partie_verte]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation # type: ignore
+import partie_electroaimant # type: ignore
+
+
+def _instants(temps_vol : np.ndarray, temps_defaut : float, n_images : int) -> np.ndarray :
+    """Instants des images : de 0 au plus long temps de vol (+5 %) ou, sans aucun contact, jusqu'à temps_defaut"""
+    temps_vol = temps_vol[np.isfinite(temps_vol)]
+    t_max = 1.05 * np.max(temps_vol) if len(temps_vol) else temps_defaut
+    return np.linspace(0, t_max, n_images)
+
+
+def precalculer_vol_electrique(masses_charges_particules : list[tuple[float, float]], vitesse_initiale : float, potentiel : float,
+                               angle_initial : float, hauteur_initiale : float, n_images : int = 300) -> dict :
+    """
+    Positions de chaque particule de la partie électrique à n_images instants régulièrement espacés, calculées en une fois
+
+    Parameters
+    ----------
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque particule
+    vitesse_initiale : float
+        Vitesse initiale (en m/s)
+    potentiel : float
+        Différence de potentiel entre les plaques (en V)
+    angle_initial : float
+        Angle initial entre v0 et l'axe y (en radians)
+    hauteur_initiale : float
+        Hauteur initiale, égale à la distance entre les plaques (en m)
+    n_images : int
+        Nombre d'instants
+
+    Returns
+    -------
+    dict
+        'temps' (n_images,) en s, 'x' et 'y' (n_images, n_particules) en m, 'temps_vol' (n_particules,) en s
+        (NaN sans contact) et 'mq_u' (n_particules,) rapport m/|q| en u/e
+    """
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    mq = masses_charges[:, 0] * constants.u / (masses_charges[:, 1] * constants.e)
+    E = deviation.champ_electrique_v2(hauteur_initiale, potentiel)
+    temps_vol = deviation.calculer_impacts(mq, vitesse_initiale, angle_initial, hauteur_initiale, E)[2]
+    # Sans contact : le temps de traverser deux fois la hauteur selon x
+    temps = _instants(temps_vol, 2 * hauteur_initiale / (vitesse_initiale * np.sin(angle_initial)), n_images)
+    x, y = deviation.positions_au_temps(mq, vitesse_initiale, angle_initial, hauteur_initiale, E, temps)
+    return {'temps' : temps, 'x' : x, 'y' : y, 'temps_vol' : temps_vol, 'mq_u' : np.abs(masses_charges[:, 0] / masses_charges[:, 1])}
+
+
+def precalculer_vol_magnetique(masses_charges_particules : list[tuple[float, float]], vitesse_initiale : float, Bz : float,
+                               x_detecteur : float, n_images : int = 300, detecteurs_symetriques : bool = False) -> dict :
+    """
+    Positions de chaque particule de la partie magnétique à n_images instants régulièrement espacés, calculées en une fois
+
+    Parameters
+    ----------
+    masses_charges_particules : list of tuple of float
+        Masse (en u), Charge (en e) de chaque particule
+    vitesse_initiale : float
+        Vitesse initiale selon y (en m/s)
+    Bz : float
+        Valeur du champ magnétique d'axe z (en T)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    n_images : int
+        Nombre d'instants
+    detecteurs_symetriques : bool
+        True pour un détecteur de chaque côté de l'axe, en ±x_detecteur (voir partie_electroaimant.detecteur_du_cote)
+
+    Returns
+    -------
+    dict
+        Voir precalculer_vol_electrique
+    """
+    masses_charges = np.asarray(masses_charges_particules, dtype=float).reshape(-1, 2)
+    mq = masses_charges[:, 0] * constants.u / (masses_charges[:, 1] * constants.e)
+    if detecteurs_symetriques : x_detecteur = partie_electroaimant.detecteur_du_cote(mq, Bz, x_detecteur)
+    temps_vol = partie_electroaimant.calculer_impacts(mq, vitesse_initiale, Bz, x_detecteur)[1]
+    # Sans contact : le temps du plus long demi-tour
+    temps = _instants(temps_vol, np.pi * np.max(np.abs(mq * vitesse_initiale / Bz)) / vitesse_initiale, n_images)
+    x, y = partie_electroaimant.positions_au_temps(mq, vitesse_initiale, Bz, x_detecteur, temps)
+    return {'temps' : temps, 'x' : x, 'y' : y, 'temps_vol' : temps_vol, 'mq_u' : masses_charges[:, 0] / np.abs(masses_charges[:, 1])}
+
+
+class animation_vol :
+    def __init__(self, ax, trajets : dict, duree : float = 5.0, fps : int = 30, boucle : bool = True, couleurs = None) -> None :
+        """
+        Lecture animée du vol des particules à partir des positions précalculées (precalculer_vol_electrique ou
+        precalculer_vol_magnetique) : le temps physique est ramené à duree secondes de lecture. Chaque image
+        restaure le fond mémorisé (tracé statique) puis ne redessine que les marqueurs et l'horloge (blitting).
+        L'image affichée dépend du temps écoulé : une image en retard est sautée, la lecture ne ralentit pas.
+
+        Parameters
+        ----------
+        ax : matplotlib.axes.Axes
+            Axe sur lequel le tracé statique est déjà fait
+        trajets : dict
+            Positions précalculées
+        duree : float
+            Durée de lecture de tout le vol (en s)
+        fps : int
+            Nombre d'images par seconde visé
+        boucle : bool
+            True pour recommencer à la fin
+        couleurs : array_like
+            Couleur de chaque particule (par défaut selon m/q)
+        """
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.trajets = trajets
+        self.duree = duree
+        self.boucle = boucle
+        self.n_images = len(trajets['temps'])
+        if couleurs is None :
+            mq_u = trajets['mq_u']
+            couleurs = plt.cm.viridis((mq_u - mq_u.min()) / (np.ptp(mq_u) or 1))
+        self.marqueurs = ax.scatter(trajets['x'][0], trajets['y'][0], c=couleurs, s=30, edgecolors='black', linewidths=0.5, zorder=5, animated=True)
+        self.horloge = ax.text(0.02, 0.02, '', transform=ax.transAxes, fontsize=9, zorder=5, animated=True,
+                               bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
+        self.fond = None
+        self.debut = None
+        self.image = 0
+        self.minuteur = self.canvas.new_timer(interval=max(1, int(1000 / fps)))
+        self.minuteur.add_callback(self._avancer)
+        self._connexion = self.canvas.mpl_connect('draw_event', self._capturer_fond)
+
+    def _capturer_fond(self, event=None) -> None :
+        """Mémorise le fond après chaque dessin complet (redimensionnement, zoom...) et y redessine l'image courante"""
+        self.fond = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._dessiner()
+
+    def _dessiner(self) -> None :
+        self.ax.draw_artist(self.marqueurs)
+        self.ax.draw_artist(self.horloge)
+
+    def _avancer(self) -> None :
+        if self.fond is None : return
+        image = int((time.perf_counter() - self.debut) / self.duree * self.n_images)
+        if image >= self.n_images :
+            if not self.boucle :
+                image = self.n_images - 1
+                self.minuteur.stop()
+            else :
+                image %= self.n_images
+        self.image = image
+        self.marqueurs.set_offsets(np.column_stack((self.trajets['x'][image], self.trajets['y'][image])))
+        self.horloge.set_text(f"t = {self.trajets['temps'][image] * 1e6:.3f} µs")
+        self.canvas.restore_region(self.fond)
+        self._dessiner()
+        self.canvas.blit(self.ax.bbox)
+
+    def demarrer(self) -> None :
+        """Lance la lecture depuis t = 0"""
+        self.debut = time.perf_counter()
+        self.canvas.draw() # Dessin complet : déclenche _capturer_fond
+        self.minuteur.start()
+
+    def arreter(self) -> None :
+        """Arrête la lecture et retire les marqueurs de l'axe"""
+        self.minuteur.stop()
+        self.canvas.mpl_disconnect(self._connexion)
+        for artiste in (self.marqueurs, self.horloge) :
+            if artiste.axes is not None : artiste.remove()
+
+
+'''
+Exemple : vol de 300 ions dans la partie électrique (le temps de vol croît comme la racine de la masse)
+'''
+if __name__ == '__main__' :
+    masses_charges = [(m, 1) for m in np.linspace(1, 300, 300)]
+    fig, ax = plt.subplots(figsize=(10, 8))
+    deviation.tracer_ensemble_trajectoires(masses_charges, 1e5, -2000, np.pi / 6, 0.05, create_plot=False, ax=ax)
+    t0 = time.perf_counter()
+    trajets = precalculer_vol_electrique(masses_charges, 1e5, -2000, np.pi / 6, 0.05)
+    print(f"Précalcul de {trajets['x'].size} positions : {time.perf_counter() - t0:.4f} s")
+    animation = animation_vol(ax, trajets, duree=5)
+    animation.demarrer()
+    plt.show()
@@ -0,0 +1,310 @@
+import os, sys, json, time, shutil, hashlib, inspect, tempfile, functools
+import numpy as np
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+for pth in [path_partie_bleue, path_partie_verte]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+
+# Dossier par défaut, modifiable par la variable d'environnement SIMS_CACHE
+DOSSIER_DEFAUT = os.environ.get("SIMS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "sims"))
+TAILLE_MAX_DEFAUT = 2 * 1024**3 # 2 Go
+
+# Fichiers sources dont dépendent les résultats : toute modification invalide le cache
+FICHIERS_CODE = [
+    os.path.join(path_partie_bleue, "deviation.py"),
+    os.path.join(path_partie_bleue, "incertitude.py"),
+    os.path.join(path_partie_verte, "partie_electroaimant.py"),
+]
+
+_ABSENT = object() # Résultat absent du cache (un résultat None enregistré reste un succès)
+
+
+def version_code(fichiers : list[str] = None) -> str :
+    """
+    Empreinte du code de calcul (contenu des fichiers sources)
+
+    Parameters
+    ----------
+    fichiers : list of str
+        Fichiers à prendre en compte (par défaut FICHIERS_CODE)
+
+    Returns
+    -------
+    str
+        Empreinte hexadécimale
+    """
+    empreinte = hashlib.sha1()
+    for fichier in fichiers or FICHIERS_CODE :
+        if os.path.exists(fichier) :
+            with open(fichier, 'rb') as f :
+                empreinte.update(f.read())
+    return empreinte.hexdigest()[:16]
+
+
+def empreinte_fonction(fonction) -> str :
+    """
+    Empreinte du code d'une fonction mise en cache : contenu du fichier qui la définit (ce qui couvre aussi les fonctions
+    auxiliaires du même module), ou à défaut son code source. Elle complète version_code, limité aux fichiers de calcul communs.
+
+    Parameters
+    ----------
+    fonction : callable
+        Fonction mise en cache
+
+    Returns
+    -------
+    str
+        Empreinte hexadécimale (vide si le code n'est pas accessible)
+    """
+    try :
+        fichier = inspect.getsourcefile(fonction)
+    except TypeError :
+        fichier = None
+    if fichier and os.path.exists(fichier) : return version_code([fichier])
+    try :
+        return hashlib.sha1(inspect.getsource(fonction).encode()).hexdigest()[:16]
+    except (OSError, TypeError) :
+        return ''
+
+
+def _forme_canonique(objet) :
+    """
+    Description sérialisable et déterministe d'un paramètre, utilisée pour le hachage :
+    les tableaux sont résumés par leur type, leur forme et le hachage de leur contenu
+    """
+    if isinstance(objet, np.ndarray) :
+        return ['ndarray', objet.dtype.str, list(objet.shape), hashlib.sha1(np.ascontiguousarray(objet).tobytes()).hexdigest()]
+    if isinstance(objet, np.generic) : return objet.item()
+    if isinstance(objet, (list, tuple)) : return [_forme_canonique(o) for o in objet]
+    if isinstance(objet, dict) : return {str(cle) : _forme_canonique(valeur) for cle, valeur in sorted(objet.items(), key=lambda e : str(e[0]))}
+    if objet is None or isinstance(objet, (bool, int, float, str)) : return objet
+    if callable(objet) : return f"{getattr(objet, '__module__', '')}.{getattr(objet, '__qualname__', repr(objet))}"
+    if hasattr(objet, '__dict__') : return [type(objet).__name__, _forme_canonique(vars(objet))]
+    raise TypeError(f"Paramètre non hachable pour le cache : {type(objet).__name__}")
+
+
+def cle_parametres(nom : str, *args, version : str = None, **kwargs) -> str :
+    """
+    Clé d'un calcul : hachage de son nom, de ses paramètres physiques et de la version du code
+
+    Parameters
+    ----------
+    nom : str
+        Nom du calcul
+    *args, **kwargs
+        Paramètres du calcul
+    version : str
+        Version du code (par défaut version_code())
+
+    Returns
+    -------
+    str
+        Clé hexadécimale
+    """
+    description = json.dumps([nom, version or version_code(), _forme_canonique(list(args)), _forme_canonique(kwargs)], sort_keys=True)
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+class cache_disque :
+    def __init__(self, dossier : str = None, taille_max : int = TAILLE_MAX_DEFAUT, fichiers_code : list[str] = None) -> None :
+        """
+        Cache de résultats sur disque adressé par le contenu : chaque entrée est un dossier nommé par la clé
+        du calcul, contenant un fichier .npy par tableau (relu par np.load avec mmap_mode, sans copie) et
+        un fichier structure.json décrivant le résultat (tableau, tuple, dict ou scalaire).
+        Au-delà de taille_max, les entrées les moins récemment utilisées sont supprimées.
+
+        Parameters
+        ----------
+        dossier : str
+            Dossier du cache (par défaut DOSSIER_DEFAUT)
+        taille_max : int
+            Taille maximale du cache (en octets)
+        fichiers_code : list of str
+            Fichiers sources dont la modification invalide le cache (par défaut FICHIERS_CODE)
+        """
+        self.dossier = dossier or DOSSIER_DEFAUT
+        self.taille_max = taille_max
+        self.version = version_code(fichiers_code)
+        self.succes, self.echecs = 0, 0
+        os.makedirs(self.dossier, exist_ok=True)
+
+    def _chemin(self, cle : str) -> str :
+        return os.path.join(self.dossier, cle)
+
+    def __contains__(self, cle : str) -> bool :
+        return os.path.exists(os.path.join(self._chemin(cle), "structure.json"))
+
+    def lire(self, cle : str, mmap_mode : str = 'r', defaut = None) :
+        """
+        Parameters
+        ----------
+        cle : str
+            Clé de l'entrée
+        mmap_mode : str
+            Mode de projection en mémoire des tableaux (None pour les charger en mémoire)
+        defaut : object
+            Valeur renvoyée si l'entrée est absente
+
+        Returns
+        -------
+        object
+            Résultat enregistré (tableaux en lecture seule si mmap_mode = 'r'), defaut si absent
+        """
+        chemin = self._chemin(cle)
+        try :
+            with open(os.path.join(chemin, "structure.json")) as f :
+                structure = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) :
+            self.echecs += 1
+            return defaut
+
+        def reconstruire(s) :
+            if s['type'] == 'tableau' : return np.load(os.path.join(chemin, s['fichier']), mmap_mode=mmap_mode)
+            if s['type'] == 'scalaire' : return s['valeur']
+            if s['type'] in ('tuple', 'liste') :
+                elements = [reconstruire(e) for e in s['elements']]
+                return tuple(elements) if s['type'] == 'tuple' else elements
+            return {cle : reconstruire(e) for cle, e in s['elements'].items()}
+
+        resultat = reconstruire(structure)
+        os.utime(chemin) # Date d'utilisation pour l'éviction LRU
+        self.succes += 1
+        return resultat
+
+    def ecrire(self, cle : str, resultat) -> None :
+        """
+        Enregistre un résultat (tableau, scalaire, ou tuple/liste/dict de ceux-ci) puis applique la limite de taille.
+        L'écriture se fait dans un dossier temporaire renommé à la fin : une entrée n'est jamais lue à moitié écrite.
+
+        Parameters
+        ----------
+        cle : str
+            Clé de l'entrée
+        resultat : object
+            Résultat à enregistrer
+        """
+        temporaire = tempfile.mkdtemp(dir=self.dossier, prefix=".ecriture_")
+        compteur = [0]
+
+        def decrire(r) :
+            if isinstance(r, (np.ndarray, np.generic)) and np.ndim(r) > 0 :
+                fichier = f"{compteur[0]}.npy"
+                compteur[0] += 1
+                np.save(os.path.join(temporaire, fichier), np.asarray(r))
+                return {'type' : 'tableau', 'fichier' : fichier}
+            if isinstance(r, (tuple, list)) : return {'type' : 'tuple' if isinstance(r, tuple) else 'liste', 'elements' : [decrire(e) for e in r]}
+            if isinstance(r, dict) : return {'type' : 'dict', 'elements' : {str(k) : decrire(v) for k, v in r.items()}}
+            if isinstance(r, np.generic) : r = r.item()
+            if r is None or isinstance(r, (bool, int, float, str)) : return {'type' : 'scalaire', 'valeur' : r}
+            raise TypeError(f"Résultat non enregistrable dans le cache : {type(r).__name__}")
+
+        try :
+            with open(os.path.join(temporaire, "structure.json"), 'w') as f :
+                json.dump(decrire(resultat), f)
+            if cle in self : shutil.rmtree(self._chemin(cle), ignore_errors=True)
+            os.replace(temporaire, self._chemin(cle))
+        except BaseException :
+            shutil.rmtree(temporaire, ignore_errors=True)
+            raise
+        self.limiter_taille()
+
+    def entrees(self) -> list[tuple[str, int, float]] :
+        """
+        Returns
+        -------
+        list of tuple (str, int, float)
+            (clé, taille en octets, date de dernière utilisation) de chaque entrée, de la plus ancienne à la plus récente
+        """
+        resultat = []
+        for nom in os.listdir(self.dossier) :
+            chemin = self._chemin(nom)
+            if nom.startswith('.') or not os.path.isdir(chemin) : continue
+            taille = sum(e.stat().st_size for e in os.scandir(chemin) if e.is_file())
+            resultat.append((nom, taille, os.stat(chemin).st_mtime))
+        return sorted(resultat, key=lambda e : e[2])
+
+    def taille(self) -> int :
+        """Taille totale du cache (en octets)"""
+        return sum(t for _, t, _ in self.entrees())
+
+    def limiter_taille(self) -> None :
+        """Supprime les entrées les moins récemment utilisées jusqu'à repasser sous taille_max"""
+        entrees = self.entrees()
+        total = sum(t for _, t, _ in entrees)
+        for cle, taille, _ in entrees :
+            if total <= self.taille_max : break
+            shutil.rmtree(self._chemin(cle), ignore_errors=True)
+            total -= taille
+
+    def vider(self) -> None :
+        """Supprime toutes les entrées"""
+        for cle, _, _ in self.entrees() :
+            shutil.rmtree(self._chemin(cle), ignore_errors=True)
+
+    def appeler(self, fonction, *args, **kwargs) :
+        """
+        Renvoie le résultat de fonction(*args, **kwargs), lu dans le cache s'il y est, calculé et enregistré sinon
+
+        Parameters
+        ----------
+        fonction : callable
+            Calcul déterministe (les tirages aléatoires doivent dépendre d'une graine passée en paramètre)
+        *args, **kwargs
+            Paramètres du calcul
+
+        Returns
+        -------
+        object
+            Résultat du calcul
+        """
+        cle = cle_parametres(f"{fonction.__module__}.{fonction.__qualname__}", *args, version=self.version + empreinte_fonction(fonction), **kwargs)
+        resultat = self.lire(cle, defaut=_ABSENT)
+        if resultat is _ABSENT :
+            resultat = fonction(*args, **kwargs)
+            self.ecrire(cle, resultat)
+        return resultat
+
+    def memoiser(self, fonction) :
+        """
+        Décorateur : les appels de la fonction passent par le cache
+
+        Parameters
+        ----------
+        fonction : callable
+            Calcul déterministe
+
+        Returns
+        -------
+        callable
+            Fonction dont les résultats sont mis en cache
+        """
+        @functools.wraps(fonction)
+        def fonction_en_cache(*args, **kwargs) :
+            return self.appeler(fonction, *args, **kwargs)
+        return fonction_en_cache
+
+
+'''
+Exemple : Monte Carlo sur xs, recalculé puis relu depuis le cache
+'''
+if __name__ == '__main__' :
+    import deviation # type: ignore
+
+    cache = cache_disque(os.path.join(tempfile.gettempdir(), "sims_cache_exemple"), taille_max=200 * 1024**2)
+    cache.vider()
+
+    def monte_carlo(n, graine) :
+        rng = np.random.default_rng(graine)
+        masses = rng.uniform(1, 200, n)
+        return deviation.calculer_faisceau(masses, 1, rng.normal(1e5, 1e3, n), np.pi / 6, 0.05, -1e5)
+
+    for essai in range(2) :
+        t0 = time.perf_counter()
+        resultat = cache.appeler(monte_carlo, 2_000_000, graine=0)
+        print(f"Essai {essai + 1} : {time.perf_counter() - t0:.3f} s, xs moyen {np.nanmean(resultat['xs']):.5f} m")
+    print(f"Taille du cache : {cache.taille() / 1024**2:.1f} Mo, succès {cache.succes}, échecs {cache.echecs}")
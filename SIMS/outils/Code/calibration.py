@@ -0,0 +1,430 @@
+import os, sys, json, math, time, hashlib, inspect, itertools
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+for pth in [path_partie_bleue, path_partie_verte]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation # type: ignore
+import partie_electroaimant # type: ignore
+
+
+# À incrémenter si le contenu ou le format des tables change : les tables enregistrées deviennent alors périmées
+VERSION_TABLES = 1
+
+
+def empreinte_parametres(nom : str, parametres : dict) -> str :
+    """
+    Empreinte d'une table : hachage du type de table, de ses paramètres (géométrie et domaine) et de VERSION_TABLES
+
+    Parameters
+    ----------
+    nom : str
+        Type de table
+    parametres : dict
+        Paramètres de construction de la table
+
+    Returns
+    -------
+    str
+        Empreinte hexadécimale
+    """
+    description = json.dumps({'nom' : nom, 'version' : VERSION_TABLES, 'parametres' : parametres}, sort_keys=True, default=float)
+    return hashlib.sha1(description.encode()).hexdigest()[:16]
+
+
+class table_calibration :
+    def __init__(self, nom : str, axes : list[tuple[float, float, int]], echelles : list[str], valeurs : np.ndarray, parametres : dict, erreurs : np.ndarray = None) -> None :
+        """
+        Table de calibration sur une grille régulière (en échelle linéaire ou logarithmique selon chaque axe),
+        interrogée par interpolation multilinéaire vectorisée
+
+        Parameters
+        ----------
+        nom : str
+            Type de table ('champ_magnetique' ou 'point_contact')
+        axes : list of tuple (float, float, int)
+            (minimum, maximum, nombre de points) de chaque axe
+        echelles : list of str
+            'lin' ou 'log' pour chaque axe (grille régulière en x ou en log(x))
+        valeurs : numpy.ndarray
+            Valeurs aux noeuds de la grille (NaN si non défini)
+        parametres : dict
+            Paramètres de construction, servent à détecter une table périmée
+        erreurs : numpy.ndarray
+            Erreur d'interpolation estimée de chaque cellule (même unité que les valeurs)
+        """
+        self.nom = nom
+        self.axes = [(float(debut), float(fin), int(n)) for debut, fin, n in axes]
+        self.echelles = list(echelles)
+        self.valeurs = np.asarray(valeurs, dtype=np.float32)
+        self.parametres = dict(parametres)
+        self.erreurs = None if erreurs is None else np.asarray(erreurs, dtype=np.float32)
+        self.empreinte = empreinte_parametres(nom, self.parametres)
+
+        self._coins = list(itertools.product((0, 1), repeat=len(self.axes)))
+
+        # Passage en coordonnées d'indices : u = (t(x) - t0) / pas, sans recherche dichotomique
+        self._origines, self._pas = [], []
+        for (debut, fin, n), echelle in zip(self.axes, self.echelles) :
+            t0, t1 = (math.log(debut), math.log(fin)) if echelle == 'log' else (debut, fin)
+            self._origines.append(t0)
+            self._pas.append((t1 - t0) / (n - 1))
+
+    def noeuds(self, i : int) -> np.ndarray :
+        """
+        Parameters
+        ----------
+        i : int
+            Numéro de l'axe
+
+        Returns
+        -------
+        numpy.ndarray
+            Abscisses des noeuds de l'axe i
+        """
+        debut, fin, n = self.axes[i]
+        return np.geomspace(debut, fin, n) if self.echelles[i] == 'log' else np.linspace(debut, fin, n)
+
+    @property
+    def erreur_max(self) -> float :
+        """Plus grande erreur d'interpolation estimée sur la table"""
+        return float(np.nanmax(self.erreurs)) if self.erreurs is not None else np.nan
+
+    def interpoler(self, *points, avec_erreur : bool = False) :
+        """
+        Interpolation multilinéaire (scalaires ou tableaux, diffusés entre eux)
+
+        Parameters
+        ----------
+        *points : float or array_like
+            Coordonnées selon chaque axe
+        avec_erreur : bool
+            Si True, renvoie aussi l'erreur estimée de la cellule contenant chaque point
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Valeurs interpolées, NaN hors du domaine de la table
+        (float or numpy.ndarray)
+            Erreur estimée, si avec_erreur
+        """
+        if len(points) != len(self.axes) : raise ValueError(f"La table {self.nom} attend {len(self.axes)} coordonnées.")
+        if all(isinstance(p, (int, float)) or np.ndim(p) == 0 for p in points) : return self._interpoler_scalaire(points, avec_erreur)
+        points = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in points])
+        indices, poids, dedans = [], [], np.ones(points[0].shape, dtype=bool)
+        for p, echelle, t0, pas, (_, _, n) in zip(points, self.echelles, self._origines, self._pas, self.axes) :
+            with np.errstate(invalid='ignore', divide='ignore') :
+                u = ((np.log(p) if echelle == 'log' else p) - t0) / pas
+            dedans &= (u >= 0) & (u <= n - 1)
+            u = np.clip(np.nan_to_num(u), 0, n - 1)
+            i = np.minimum(u.astype(np.intp), n - 2)
+            indices.append(i)
+            poids.append(u - i)
+
+        resultat = np.zeros(points[0].shape)
+        for coin in np.ndindex(*(2,) * len(self.axes)) :
+            w = np.ones(points[0].shape)
+            for decalage, f in zip(coin, poids) :
+                w = w * (f if decalage else 1 - f)
+            resultat += w * self.valeurs[tuple(i + decalage for i, decalage in zip(indices, coin))]
+        resultat = np.where(dedans, resultat, np.nan)[()]
+
+        if not avec_erreur : return resultat
+        erreur = np.where(dedans, self.erreurs[tuple(indices)], np.nan)[()] if self.erreurs is not None else np.full(np.shape(resultat), np.nan)[()]
+        return resultat, erreur
+
+    def _interpoler_scalaire(self, points, avec_erreur : bool) :
+        """Même calcul que interpoler pour un seul point, sans passer par des tableaux (requêtes unitaires en temps réel)"""
+        indices, poids = [], []
+        for p, echelle, t0, pas, (_, _, n) in zip(points, self.echelles, self._origines, self._pas, self.axes) :
+            p = float(p)
+            if echelle == 'log' and not p > 0 : return (math.nan, math.nan) if avec_erreur else math.nan
+            u = ((math.log(p) if echelle == 'log' else p) - t0) / pas
+            if not 0 <= u <= n - 1 : return (math.nan, math.nan) if avec_erreur else math.nan
+            i = min(int(u), n - 2)
+            indices.append(i)
+            poids.append(u - i)
+        resultat = 0.0
+        for coin in self._coins :
+            w = 1.0
+            for decalage, f in zip(coin, poids) :
+                w *= f if decalage else 1 - f
+            resultat += w * self.valeurs.item(*[i + decalage for i, decalage in zip(indices, coin)])
+        if not avec_erreur : return resultat
+        return resultat, self.erreurs.item(*indices) if self.erreurs is not None else math.nan
+
+    def est_perimee(self, **parametres) -> bool :
+        """
+        Parameters
+        ----------
+        **parametres
+            Paramètres de construction actuels (géométrie, domaine)
+
+        Returns
+        -------
+        bool
+            True si la table a été construite avec d'autres paramètres ou une autre version
+        """
+        return empreinte_parametres(self.nom, parametres) != self.empreinte
+
+    def sauvegarder(self, chemin : str) -> None :
+        """
+        Enregistre la table au format .npz compressé (valeurs en float32, axes décrits par (minimum, maximum, nombre de points))
+
+        Parameters
+        ----------
+        chemin : str
+            Fichier de destination
+        """
+        donnees = {'valeurs' : self.valeurs, 'axes' : np.array(self.axes, dtype=float)}
+        if self.erreurs is not None : donnees['erreurs'] = self.erreurs
+        entete = {'nom' : self.nom, 'echelles' : self.echelles, 'parametres' : self.parametres, 'empreinte' : self.empreinte, 'version' : VERSION_TABLES}
+        np.savez_compressed(chemin, entete=np.array(json.dumps(entete, default=float)), **donnees)
+
+    @staticmethod
+    def charger(chemin : str) -> 'table_calibration' :
+        """
+        Parameters
+        ----------
+        chemin : str
+            Fichier .npz écrit par sauvegarder
+
+        Returns
+        -------
+        table_calibration
+            Table chargée (son empreinte est recalculée : une table d'une version antérieure est détectée périmée)
+        """
+        with np.load(chemin) as donnees :
+            entete = json.loads(str(donnees['entete']))
+            erreurs = donnees['erreurs'] if 'erreurs' in donnees else None
+            return table_calibration(entete['nom'], [tuple(a) for a in donnees['axes']], entete['echelles'], donnees['valeurs'], entete['parametres'], erreurs)
+
+
+def _estimer_erreurs(table : table_calibration, fonction) -> np.ndarray :
+    """
+    Estimation prudente de l'erreur d'interpolation de chaque cellule. On prend le plus grand de :
+    - l'erreur mesurée au centre de la cellule par comparaison avec le calcul exact ;
+    - la borne classique de l'interpolation multilinéaire, somme sur les axes de max|Δ²| / 8,
+      avec les différences secondes des valeurs aux noeuds (en coordonnées d'indices).
+    On ajoute l'arrondi du stockage en float32, puis chaque cellule reçoit le maximum sur ses voisines
+    pour rester majorant près des zones de forte courbure (bord de la zone de contact).
+    """
+    centres = []
+    for i, echelle in enumerate(table.echelles) :
+        x = table.noeuds(i)
+        centres.append(np.sqrt(x[:-1] * x[1:]) if echelle == 'log' else 0.5 * (x[:-1] + x[1:]))
+    grilles = np.meshgrid(*centres, indexing='ij')
+    with np.errstate(invalid='ignore') :
+        erreurs = np.abs(table.interpoler(*grilles) - fonction(*grilles))
+
+    valeurs = table.valeurs.astype(float)
+    cellules = lambda a : [a[tuple(slice(d, d + n - 1) for d, n in zip(coin, a.shape))] for coin in itertools.product((0, 1), repeat=a.ndim)]
+    courbure = np.zeros(erreurs.shape)
+    for axe in range(valeurs.ndim) :
+        d2 = np.pad(np.abs(np.diff(valeurs, 2, axis=axe)), [(1, 1) if i == axe else (0, 0) for i in range(valeurs.ndim)], mode='edge')
+        courbure += np.fmax.reduce(cellules(d2)) / 8
+    arrondi = np.finfo(np.float32).eps * np.fmax.reduce([np.abs(c) for c in cellules(valeurs)])
+    erreurs = np.fmax(erreurs, courbure) + arrondi
+
+    bornes = np.pad(erreurs, 1, mode='edge')
+    for decalage in itertools.product((0, 1, 2), repeat=erreurs.ndim) :
+        erreurs = np.fmax(erreurs, bornes[tuple(slice(d, d + n) for d, n in zip(decalage, erreurs.shape))])
+    return erreurs
+
+
+def construire_table_champ_magnetique(x_detecteur : float, y_detecteur : float, bornes_mq : tuple[float, float] = (1, 300), bornes_v0 : tuple[float, float] = (1e4, 1e6), n_mq : int = 512, n_v0 : int = 64) -> table_calibration :
+    """
+    Table du champ magnétique à appliquer pour qu'une particule de rapport m/q et de vitesse v0 atteigne le détecteur
+
+    Parameters
+    ----------
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    y_detecteur : float
+        Position en y visée sur le détecteur (m)
+    bornes_mq : tuple of float
+        Domaine du rapport masse/charge (en u/e)
+    bornes_v0 : tuple of float
+        Domaine de la vitesse initiale (en m/s)
+    n_mq : int
+        Nombre de points selon m/q (grille linéaire : Bz est bilinéaire en (m/q, v0), l'interpolation est exacte)
+    n_v0 : int
+        Nombre de points selon v0 (grille linéaire)
+
+    Returns
+    -------
+    table_calibration
+        Table Bz(m/q en u/e, v0 en m/s) en T
+    """
+    parametres = dict(x_detecteur=x_detecteur, y_detecteur=y_detecteur, bornes_mq=list(bornes_mq), bornes_v0=list(bornes_v0), n_mq=n_mq, n_v0=n_v0)
+    fonction = lambda mq, v0 : partie_electroaimant.calculer_champ_magnetique(mq * constants.u / constants.e, v0, x_detecteur, y_detecteur)
+    axes = [(*bornes_mq, n_mq), (*bornes_v0, n_v0)]
+    table = table_calibration('champ_magnetique', axes, ['lin', 'lin'], np.zeros((n_mq, n_v0)), parametres)
+    table.valeurs = fonction(*np.meshgrid(table.noeuds(0), table.noeuds(1), indexing='ij')).astype(np.float32)
+    table.erreurs = _estimer_erreurs(table, fonction).astype(np.float32)
+    return table
+
+
+def construire_table_point_contact(vitesse_initiale : float, angle_initial : float, hauteur_initiale : float, bornes_mq : tuple[float, float] = (1, 300), bornes_potentiel : tuple[float, float] = (-5000, 5000), n_mq : int = 512, n_potentiel : int = 512) -> table_calibration :
+    """
+    Table du point de contact xs dans la partie électrique en fonction du rapport m/q et du potentiel entre les plaques
+
+    Parameters
+    ----------
+    vitesse_initiale : float
+        Vitesse initiale (en m/s)
+    angle_initial : float
+        Angle initial entre v0 et l'axe y (en radians)
+    hauteur_initiale : float
+        Hauteur initiale, égale à la distance entre les plaques (en m)
+    bornes_mq : tuple of float
+        Domaine du rapport masse/charge pour une charge positive (en u/e)
+    bornes_potentiel : tuple of float
+        Domaine de la différence de potentiel (en V)
+    n_mq : int
+        Nombre de points selon m/q (grille logarithmique)
+    n_potentiel : int
+        Nombre de points selon le potentiel (grille linéaire)
+
+    Returns
+    -------
+    table_calibration
+        Table xs(m/q en u/e, potentiel en V) en m, NaN là où il n'y a pas de contact
+    """
+    parametres = dict(vitesse_initiale=vitesse_initiale, angle_initial=angle_initial, hauteur_initiale=hauteur_initiale, bornes_mq=list(bornes_mq), bornes_potentiel=list(bornes_potentiel), n_mq=n_mq, n_potentiel=n_potentiel)
+    def fonction(mq, potentiel) :
+        E = potentiel / hauteur_initiale
+        return deviation.calculer_impacts(mq * constants.u / constants.e, vitesse_initiale, angle_initial, hauteur_initiale, E)[0]
+    axes = [(*bornes_mq, n_mq), (*bornes_potentiel, n_potentiel)]
+    table = table_calibration('point_contact', axes, ['log', 'lin'], np.zeros((n_mq, n_potentiel)), parametres)
+    table.valeurs = fonction(*np.meshgrid(table.noeuds(0), table.noeuds(1), indexing='ij')).astype(np.float32)
+    table.erreurs = _estimer_erreurs(table, fonction).astype(np.float32)
+    return table
+
+
+_CONSTRUCTEURS = {'champ_magnetique' : construire_table_champ_magnetique, 'point_contact' : construire_table_point_contact}
+
+
+def charger_ou_construire(chemin : str, nom : str, **parametres) -> table_calibration :
+    """
+    Charge la table enregistrée dans chemin, ou la (re)construit et l'enregistre si elle est absente ou périmée
+    (géométrie, domaine ou version des tables différents)
+
+    Parameters
+    ----------
+    chemin : str
+        Fichier .npz de la table
+    nom : str
+        Type de table ('champ_magnetique' ou 'point_contact')
+    **parametres
+        Paramètres du constructeur correspondant
+
+    Returns
+    -------
+    table_calibration
+        Table à jour
+    """
+    if nom not in _CONSTRUCTEURS : raise ValueError(f"Table inconnue : {nom} (choix : {', '.join(_CONSTRUCTEURS)})")
+    construire = _CONSTRUCTEURS[nom]
+    arguments = inspect.signature(construire).bind(**parametres)
+    arguments.apply_defaults()
+    attendus = {cle : list(valeur) if isinstance(valeur, tuple) else valeur for cle, valeur in arguments.arguments.items()}
+
+    if os.path.exists(chemin) :
+        table = table_calibration.charger(chemin)
+        if table.nom == nom and not table.est_perimee(**attendus) : return table
+    table = construire(**parametres)
+    table.sauvegarder(chemin)
+    return table
+
+
+def champ_magnetique_tabule(table : table_calibration, masses_u, charges_e, v0, avec_erreur : bool = False) :
+    """
+    Champ magnétique lu dans une table construite par construire_table_champ_magnetique
+
+    Parameters
+    ----------
+    table : table_calibration
+        Table 'champ_magnetique'
+    masses_u : float or array_like
+        Masses (en u)
+    charges_e : float or array_like
+        Charges (en e)
+    v0 : float or array_like
+        Vitesse initiale (en m/s)
+    avec_erreur : bool
+        Si True, renvoie aussi l'erreur estimée (en T)
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Champ magnétique (en T), négatif pour un anion, NaN hors du domaine de la table
+    """
+    signe = np.sign(charges_e) # Bz est proportionnel à m/q : la table est construite pour m/|q| et le signe de q retourne le champ
+    resultat = table.interpoler(np.asarray(masses_u, dtype=float) / np.abs(charges_e), v0, avec_erreur=avec_erreur)
+    return (signe * resultat[0], resultat[1]) if avec_erreur else signe * resultat
+
+
+def point_contact_tabule(table : table_calibration, masses_u, charges_e, potentiel, avec_erreur : bool = False) :
+    """
+    Point de contact lu dans une table construite par construire_table_point_contact.
+    xs ne dépend que de E / mq : une charge négative revient à changer le signe du potentiel.
+
+    Parameters
+    ----------
+    table : table_calibration
+        Table 'point_contact'
+    masses_u : float or array_like
+        Masses (en u)
+    charges_e : float or array_like
+        Charges signées (en e)
+    potentiel : float or array_like
+        Différence de potentiel entre les plaques (en V)
+    avec_erreur : bool
+        Si True, renvoie aussi l'erreur estimée (en m)
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Point de contact (en m), NaN hors du domaine de la table ou sans contact
+    """
+    return table.interpoler(np.asarray(masses_u, dtype=float) / np.abs(charges_e), np.sign(charges_e) * np.asarray(potentiel, dtype=float), avec_erreur=avec_erreur)
+
+
+'''
+Comparaison : fsolve / point_contact contre les tables
+'''
+if __name__ == '__main__' :
+    import tempfile
+
+    table_B = construire_table_champ_magnetique(0.2, 0.1)
+    table_xs = construire_table_point_contact(1e5, np.pi / 6, 0.05)
+    print(f"Erreur max : Bz {table_B.erreur_max:.2e} T, xs {table_xs.erreur_max:.2e} m")
+
+    masses = np.random.default_rng(0).uniform(1, 300, 1000)
+    t0 = time.perf_counter()
+    for m in masses : partie_electroaimant.particule((m, 1), 1e5).determiner_champ_magnetique(0.2, 0.1)
+    t_fsolve = (time.perf_counter() - t0) / len(masses)
+    t0 = time.perf_counter()
+    for m in masses : champ_magnetique_tabule(table_B, m, 1, 1e5)
+    t_table = (time.perf_counter() - t0) / len(masses)
+    print(f"Bz par requête : fsolve {t_fsolve * 1e6:.1f} µs, table {t_table * 1e6:.1f} µs")
+
+    t0 = time.perf_counter()
+    for m in masses : deviation.particule((m, 1), 1e5, np.pi / 6, 0.05).point_contact(-1000 / 0.05)
+    t_particule = (time.perf_counter() - t0) / len(masses)
+    t0 = time.perf_counter()
+    point_contact_tabule(table_xs, masses, 1, -1000)
+    print(f"xs par requête : particule {t_particule * 1e6:.1f} µs, table vectorisée {(time.perf_counter() - t0) / len(masses) * 1e6:.3f} µs")
+
+    with tempfile.TemporaryDirectory() as dossier :
+        chemin = os.path.join(dossier, "table_xs.npz")
+        charger_ou_construire(chemin, 'point_contact', vitesse_initiale=1e5, angle_initial=np.pi / 6, hauteur_initiale=0.05)
+        print(f"Taille sur disque : {os.path.getsize(chemin) / 1024:.0f} ko")
+        print("Périmée après changement de hauteur :", table_calibration.charger(chemin).est_perimee(vitesse_initiale=1e5, angle_initial=np.pi / 6, hauteur_initiale=0.06, bornes_mq=[1, 300], bornes_potentiel=[-5000, 5000], n_mq=512, n_potentiel=512))
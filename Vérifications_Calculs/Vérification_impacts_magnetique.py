@@ -0,0 +1,120 @@
+# Nous vérifions ici les calculs vectorisés de la partie magnétique (partie_electroaimant.calculer_impacts) :
+# - en mode classique, contre la formule y(x) calculée à la main (voir Vérification_champ_magnetique.py), contre
+#   l'équation de la trajectoire de la classe particule et contre la forme générale calculer_impacts_generaux ;
+# - la symétrie cation / anion : un anion dans -Bz suit la trajectoire du cation dans Bz, et un anion dans Bz
+#   en est le miroir (détecteur en -x) ;
+# - en mode relativiste, contre une intégration numérique de dp/dt = q v x B avec p = gamma m v.
+
+
+
+
+import sys, os
+import numpy as np
+import scipy.constants as constants
+from scipy.integrate import solve_ivp
+import matplotlib.pyplot as plt
+
+# --- Configuration des chemins ---
+folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+path_partie_verte = os.path.join(folder, "SIMS", "deviation_magnetique", "Code")
+path_faisceau = os.path.join(folder, "SIMS", "faisceau", "Code")
+sys.path.append(path_partie_verte)
+sys.path.append(path_faisceau)
+
+
+# --- Importations des modules de simulation ---
+try:
+    import partie_electroaimant # type: ignore
+    from ions import faisceau_ions # type: ignore
+except ImportError as e:
+    print(f"Erreur d'importation: {e}")
+    print("Impossible d'importer les modules de simulation.")
+    print(f"Vérifiez l'existence des fichiers .py dans:")
+    print(f"  '{path_partie_verte}'")
+    sys.exit(1)
+
+
+
+V_0 = 1e5
+B_z = 0.5
+x_detecteur = 0.05
+
+m_sur_q = np.linspace(1, 100, 500) # q = 1 : m/q est la masse en u
+mq = m_sur_q * constants.u / constants.e
+
+
+# --- 1. Formule calculée à la main ---
+R = mq * V_0 / B_z
+with np.errstate(invalid='ignore') :
+    y_main = R * np.sin(np.arccos(1 - x_detecteur / R))
+    t_main = R * np.arccos(1 - x_detecteur / R) / V_0
+
+y, temps_vol = partie_electroaimant.calculer_impacts(mq, V_0, B_z, x_detecteur)
+y_particule = np.array([partie_electroaimant.particule((m, 1), V_0).equation_trajectoire(x_detecteur, B_z) for m in m_sur_q])
+y_generaux, _, temps_generaux = partie_electroaimant.calculer_impacts_generaux(mq, V_0, B_z, x_detecteur)
+
+print(f"Classique : écart max sur y {np.nanmax(np.abs(y - y_main)):.2e} m, sur le temps de vol {np.nanmax(np.abs(temps_vol / t_main - 1)):.2e} (relatif), "
+      f"avec particule {np.nanmax(np.abs(y - y_particule)):.2e} m, avec calculer_impacts_generaux {np.nanmax(np.abs(y - y_generaux)):.2e} m, "
+      f"contacts identiques : {np.array_equal(np.isnan(y), np.isnan(y_main))}")
+
+
+# --- 2. Symétrie cation / anion ---
+y_anion, temps_anion = partie_electroaimant.calculer_impacts(-mq, V_0, -B_z, x_detecteur)
+y_miroir, temps_miroir = partie_electroaimant.calculer_impacts(-mq, V_0, B_z, -x_detecteur)
+print(f"Anion dans -Bz : écart max sur y {np.nanmax(np.abs(y_anion - y)):.2e} m, sur le temps {np.nanmax(np.abs(temps_anion - temps_vol)):.2e} s ; "
+      f"anion dans Bz, détecteur en -x : écart max sur y {np.nanmax(np.abs(y_miroir - y)):.2e} m")
+faisceau = faisceau_ions(m_sur_q, -1, 0.0, 0.0, 0.0, V_0)
+impacts = partie_electroaimant.calculer_faisceau_ions(faisceau, -B_z, x_detecteur)
+print(f"calculer_faisceau_ions (charge -1, champ -Bz) : écart max sur y {np.nanmax(np.abs(impacts['y_detecteur'] - y)):.2e} m")
+
+
+# --- 3. Mode relativiste : intégration numérique ---
+def impact_integre(mq_i, v_i, B_i, x_i) :
+    """Position y au détecteur par intégration de du/dt = (q/m) u x B / gamma (u = gamma v, gamma constant)"""
+    gamma = 1 / np.sqrt(1 - (v_i / constants.c)**2)
+    omega = B_i / (mq_i * gamma) # Pulsation cyclotron relativiste
+
+    def derivees(t, etat) :
+        return [etat[2], etat[3], omega * etat[3], -omega * etat[2]]
+
+    sol = lambda t, etat : etat[0] - x_i
+    sol.terminal = True
+    resultat = solve_ivp(derivees, (0, 10 * np.pi / abs(omega)), [0.0, 0.0, 0.0, v_i], events=sol, rtol=1e-11, atol=1e-15)
+    return resultat.y_events[0][0][1] if len(resultat.t_events[0]) else np.nan
+
+vitesses = np.logspace(5, 8, 30)
+mq_si = 28 * constants.u / constants.e
+B_fort = 200 # Champ assez fort pour que les ions rapides atteignent le détecteur
+y_relativiste = partie_electroaimant.calculer_impacts(mq_si, vitesses, B_fort, x_detecteur, relativiste=True)[0]
+y_classique = partie_electroaimant.calculer_impacts(mq_si, vitesses, B_fort, x_detecteur)[0]
+y_integre = np.array([impact_integre(mq_si, v, B_fort, x_detecteur) for v in vitesses])
+print(f"Relativiste : écart relatif max avec l'intégration {np.nanmax(np.abs(y_relativiste / y_integre - 1)):.2e}, "
+      f"écart relatif max du calcul classique {np.nanmax(np.abs(y_classique / y_integre - 1)):.2e}")
+y_auto = partie_electroaimant.calculer_impacts(-mq_si, vitesses, -B_fort, x_detecteur, relativiste='auto')[0]
+rapides = vitesses > partie_electroaimant.SEUIL_RELATIVISTE * constants.c
+print(f"Anion, mode 'auto' au-delà du seuil : écart relatif max avec le cation relativiste {np.nanmax(np.abs(y_auto[rapides] / y_relativiste[rapides] - 1)):.2e}")
+
+
+# Tracé
+fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+ax1.plot(m_sur_q, y_main, label="y calculé à la main")
+ax1.plot(m_sur_q, y, '--', label="calculer_impacts (cation, Bz)")
+ax1.plot(m_sur_q, y_anion, ':', label="calculer_impacts (anion, -Bz)")
+ax1.set_xlabel("$m/q$")
+ax1.set_ylabel("y au détecteur (m)")
+ax1.set_title("Position au détecteur en fonction de $m/q$")
+ax1.grid(True)
+ax1.legend()
+ax2.semilogx(vitesses, y_integre, label="Intégration numérique")
+ax2.semilogx(vitesses, y_relativiste, '--', label="calculer_impacts relativiste")
+ax2.semilogx(vitesses, y_classique, ':', label="calculer_impacts classique")
+ax2.set_xlabel("$v_0$ (m/s)")
+ax2.set_ylabel("y au détecteur (m)")
+ax2.set_title("Position au détecteur en fonction de la vitesse (Si+)")
+ax2.grid(True)
+ax2.legend()
+plt.tight_layout()
+plt.show()
+
+# Les courbes sont confondues et les écarts affichés sont au niveau des erreurs d'arrondi (de la tolérance de l'intégration
+# pour le mode relativiste) : les calculs vectorisés, la symétrie des anions et le mode relativiste sont donc corrects.